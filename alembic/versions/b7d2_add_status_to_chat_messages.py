@@ -0,0 +1,37 @@
+"""add status to chat_messages
+
+Revision ID: b7d2_add_status_to_chat_messages
+Revises: 9f1b_add_mime_and_thumbnail_to_reports
+Create Date: 2026-10-16 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2_add_status_to_chat_messages'
+down_revision = '9f1b_add_mime_and_thumbnail_to_reports'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Check if column exists before adding to avoid duplicate column error
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    columns = [col['name'] for col in inspector.get_columns('chat_messages')]
+    if 'status' not in columns:
+        # add_column does not emit CREATE TYPE (needed on PostgreSQL)
+        message_status = sa.Enum('streaming', 'completed', 'aborted', 'failed', name='messagestatus')
+        message_status.create(conn, checkfirst=True)
+        # Existing rows predate streaming/abort tracking and are complete
+        op.add_column('chat_messages', sa.Column(
+            'status',
+            message_status,
+            nullable=True,
+            server_default='completed',
+        ))
+
+
+def downgrade():
+    op.drop_column('chat_messages', 'status')
+    sa.Enum(name='messagestatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,27 @@
+"""add lab_results to reports
+
+Revision ID: c4e1_add_lab_results_to_reports
+Revises: b7d2_add_status_to_chat_messages
+Create Date: 2026-10-16 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c4e1_add_lab_results_to_reports'
+down_revision = 'b7d2_add_status_to_chat_messages'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Check if column exists before adding to avoid duplicate column error
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    columns = [col['name'] for col in inspector.get_columns('reports')]
+    if 'lab_results' not in columns:
+        op.add_column('reports', sa.Column('lab_results', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('reports', 'lab_results')
@@ -0,0 +1,30 @@
+"""add rolling context summary to chat_sessions
+
+Revision ID: d5f2_add_context_summary_to_chat_sessions
+Revises: c4e1_add_lab_results_to_reports
+Create Date: 2026-10-16 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd5f2_add_context_summary_to_chat_sessions'
+down_revision = 'c4e1_add_lab_results_to_reports'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Check if columns exist before adding to avoid duplicate column error
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    columns = [col['name'] for col in inspector.get_columns('chat_sessions')]
+    if 'context_summary' not in columns:
+        op.add_column('chat_sessions', sa.Column('context_summary', sa.Text(), nullable=True))
+    if 'context_summarized_through' not in columns:
+        op.add_column('chat_sessions', sa.Column('context_summarized_through', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('chat_sessions', 'context_summarized_through')
+    op.drop_column('chat_sessions', 'context_summary')
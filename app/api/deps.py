@@ -1,3 +1,7 @@
+import asyncio
+import contextlib
+
+from fastapi import Request
 from sqlalchemy.orm import Session
 from app.db import database
 
@@ -8,3 +12,41 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away while its request was still being processed."""
+
+
+@contextlib.asynccontextmanager
+async def cancel_on_disconnect(request: Request, interval: float = 0.5):
+    """
+    Cancel the enclosed block as soon as the client disconnects.
+
+    A watcher polls `request.is_disconnected()` every `interval` seconds and
+    cancels the request task, so whatever the block is awaiting (e.g. an
+    Ollama stream) is torn down. The cancellation is converted into
+    `ClientDisconnected` on exit, the same way `asyncio.timeout` converts
+    its cancellation into `TimeoutError`.
+    """
+    task = asyncio.current_task()
+    fired = False
+
+    async def _watch():
+        nonlocal fired
+        while True:
+            await asyncio.sleep(interval)
+            if await request.is_disconnected():
+                fired = True
+                task.cancel()
+                return
+
+    watcher = asyncio.ensure_future(_watch())
+    try:
+        yield
+    except asyncio.CancelledError:
+        if fired and task.uncancel() == 0:
+            raise ClientDisconnected() from None
+        raise
+    finally:
+        watcher.cancel()
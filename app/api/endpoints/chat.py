@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi import BackgroundTasks
+from fastapi import BackgroundTasks, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import logging
@@ -10,9 +10,12 @@ import asyncio
 import re
 
 from app.db import schemas, models
-from app.api.deps import get_db
-from app.services import chat_service, parser_service, summarizer_service, tts_service
+from app.api.deps import ClientDisconnected, cancel_on_disconnect, get_db
+from app.services import chat_service, conversation_memory, parser_service, summarizer_service, tts_service
+from app.services.extraction_cache import content_digest
+from app.services.lab_extractor import extract_lab_values
 from app.db.database import SessionLocal
+from app.services.ollama_admission import AdmissionRejected, get_admission, set_request_priority
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +27,10 @@ CHAT_UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
 AUDIO_DIR = MEDIA_DIR / "audio"
 AUDIO_DIR.mkdir(parents=True, exist_ok=True)
 
+# Document budget (estimated tokens) for free-chat questions about an upload;
+# longer documents are condensed with the summarizer's map-reduce pass
+CHAT_DOCUMENT_TOKENS = 1500
+
 async def _generate_and_attach_tts(message_id: int, text: str, audio_filename: str):
     """Background task to generate TTS audio and update the ChatMessage record.
 
@@ -65,6 +72,58 @@ async def _generate_and_attach_tts(message_id: int, text: str, audio_filename: s
         db.close()
 
 
+async def _restore_session_document(db: Session, session_id: int) -> bool:
+    """Make sure the session's latest document is cached as its chat prompt prefix.
+
+    The prefix is kept in memory, so after a restart (or for documents uploaded
+    for a doctor/patient summary) it is rebuilt from the stored report text.
+    Returns False when the session has no document.
+    """
+    if chat_service.has_session_document(session_id):
+        return True
+    report = (
+        db.query(models.Report)
+        .filter(models.Report.chat_session_id == session_id, models.Report.raw_text.isnot(None))
+        .order_by(models.Report.id.desc())
+        .first()
+    )
+    if report is None or not report.raw_text.strip():
+        return False
+    document_text = await summarizer_service.acondense_document(report.raw_text, max_tokens=CHAT_DOCUMENT_TOKENS)
+    chat_service.set_session_document(session_id, document_text)
+    return True
+
+
+async def _abort_assistant_message(db: Session, session_id: int, ai_message, partial: str):
+    """Persist an assistant reply whose client disconnected mid-generation as aborted.
+
+    The partial text is kept so the history shows where generation stopped;
+    open websockets for the session get a final delta flagged `aborted`.
+    """
+    if ai_message is None:
+        ai_message = models.ChatMessage(session_id=session_id, role="assistant", content="")
+    ai_message.content = re.sub(r'\*+', '', partial).strip()
+    ai_message.status = models.MessageStatus.aborted
+    db.add(ai_message)
+    db.commit()
+    db.refresh(ai_message)
+    logger.info("Client disconnected; aborted assistant message %s in session %s (%d chars)",
+                ai_message.id, session_id, len(ai_message.content))
+
+    try:
+        from app.api.ws import manager as ws_manager
+        await ws_manager.send_json_to_session(session_id, {
+            "type": "assistant_delta",
+            "message_id": ai_message.id,
+            "content": ai_message.content,
+            "final": True,
+            "aborted": True,
+        })
+    except Exception:
+        pass
+    return ai_message
+
+
 @router.post("/sessions", response_model=schemas.ChatSession)
 def create_chat_session(
     session_data: schemas.ChatSessionCreate,
@@ -108,6 +167,7 @@ def get_chat_session(session_id: int, db: Session = Depends(get_db)):
 @router.post("/sessions/{session_id}/messages", response_model=schemas.ChatMessage)
 async def send_chat_message(
     session_id: int,
+    request: Request,
     background_tasks: BackgroundTasks,
     content: str = Form(...),
     file: Optional[UploadFile] = File(None),
@@ -128,11 +188,17 @@ async def send_chat_message(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chat session not found"
         )
+
+    # Chat is the interactive lane: it preempts report/batch work and is shed
+    # with a 503 (Retry-After) before any parsing if its queue is full
+    set_request_priority("interactive")
+    get_admission().precheck("interactive")
     
     # Process file if uploaded
     file_context = ""
     image_path_for_vlm = None
     extracted_text = None
+    lab_results = None
     is_image = False
     
     if file and file.filename:
@@ -195,18 +261,35 @@ async def send_chat_message(
                 logger.info("Extracting text from uploaded document")
                 try:
                     # Offload heavy parsing to a thread to avoid blocking the event loop
+                    # Byte-identical uploads are served from the extraction cache
                     extracted_text = await asyncio.to_thread(
-                        parser_service.extract_data_from_file, str(file_save_path)
+                        parser_service.extract_data_from_file, str(file_save_path), content_digest(file_bytes)
                     )
                     new_report.raw_text = extracted_text
+                    new_report.lab_results = lab_results = [r.to_dict() for r in extract_lab_values(extracted_text)]
                     new_report.status = models.ReportStatus.completed
                     db.commit()
                 except Exception as pe:
                     logger.error(f"Extraction failed for {file.filename}: {pe}", exc_info=True)
                     new_report.status = models.ReportStatus.failed
                     db.commit()
-                file_context = f"\n\n[Document Content]\n{extracted_text[:2000]}"  # Limit to 2000 chars
+                document_text = extracted_text[:2000]
+                file_context = f"\n\n[Document Content]\n{document_text}"
+                if audience.lower() not in ('doctor', 'patient'):
+                    # Only free chat sends the document itself to the model; condense
+                    # long documents instead of cutting them off. It becomes the
+                    # session's cached prompt prefix, reused by follow-up questions
+                    document_text = await summarizer_service.acondense_document(
+                        extracted_text, max_tokens=CHAT_DOCUMENT_TOKENS
+                    )
+                    chat_service.set_session_document(session_id, document_text)
+                    file_context = ""
+                else:
+                    # The next free-chat question rebuilds the prefix from this report
+                    chat_service.clear_session_document(session_id)
                 is_image = False
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"Error processing file: {e}", exc_info=True)
             file_context = f"\n\n[Error: Could not process file {file.filename}]"
@@ -238,193 +321,224 @@ async def send_chat_message(
     
     logger.info(f"User message saved in session {session_id} (id={user_message.id})")
     
+    # If the client goes away, generation is cancelled all the way down to the
+    # Ollama request (freeing the backend), the message is marked aborted and
+    # no TTS is scheduled
+    ai_message = None
+    full_response = ""
     try:
-        # Generate AI response
-        gen_start = time.monotonic()
-        logger.info(f"Generating AI response for session {session_id} — audience={audience}")
-
-        # If a document was uploaded and audience explicitly requests doctor view, produce detailed report
-        if extracted_text and audience.lower() == 'doctor':
-            logger.info("Audience=doctor => generating structured detailed report.")
-            try:
-                ai_response_text = summarizer_service.generate_detailed_report_from_text(extracted_text, language='English')
-            except Exception as e:
-                logger.error(f"Detailed report generation failed: {e}", exc_info=True)
-                ai_response_text = "I encountered an error generating the detailed report. Please try again."
-        elif extracted_text and audience.lower() == 'patient':
-            logger.info("Audience=patient => generating concise patient summary.")
+        async with cancel_on_disconnect(request):
             try:
-                ai_response_text = summarizer_service.generate_patient_summary_from_text(extracted_text, language='English')
-            except Exception as e:
-                logger.error(f"Patient summary generation failed: {e}", exc_info=True)
-                ai_response_text = "I encountered an error generating the summary. Please try again."
-        # If summarizer produced a direct text (doctor/patient flows), stream that text instead
-        summarizer_text = None
-        if 'ai_response_text' in locals():
-            summarizer_text = re.sub(r'\*+', '', ai_response_text).strip()
-
-        # Use streaming for real-time token-by-token response in all cases
-        # Create an assistant message placeholder so clients can show a live message
-        ai_message = models.ChatMessage(
-            session_id=session_id,
-            role="assistant",
-            content=""
-        )
-        db.add(ai_message)
-        db.commit()
-        db.refresh(ai_message)
+                # Generate AI response
+                gen_start = time.monotonic()
+                logger.info(f"Generating AI response for session {session_id} — audience={audience}")
+
+                # If a document was uploaded, the audience picks the summarizer stream;
+                # both are streamed token by token as the model generates them
+                report_sections = None
+                summary_stream = None
+                if extracted_text and audience.lower() == 'doctor' and summarizer_service.clinician_report_mode() == 'sections':
+                    # Sections are generated concurrently and streamed as each one completes
+                    logger.info("Audience=doctor => streaming section-wise detailed report.")
+                    report_sections = summarizer_service.astream_detailed_report_sections(
+                        extracted_text, language='English', lab_results=lab_results
+                    )
+                elif extracted_text and audience.lower() == 'doctor':
+                    logger.info("Audience=doctor => streaming structured detailed report.")
+                    summary_stream = summarizer_service.astream_detailed_report_from_text(
+                        extracted_text, language='English', lab_results=lab_results
+                    )
+                elif extracted_text and audience.lower() == 'patient':
+                    logger.info("Audience=patient => streaming concise patient summary.")
+                    summary_stream = summarizer_service.astream_patient_summary_from_text(
+                        extracted_text, language='English', lab_results=lab_results
+                    )
 
-        # Notify any websocket clients that an assistant message is being streamed
-        try:
-            from app.api.ws import manager as ws_manager
-            init_payload = {
-                "type": "assistant_init",
-                "message_id": ai_message.id,
-                "content": "",
-                "seq": 0
-            }
-            await ws_manager.send_json_to_session(session_id, init_payload)
-        except Exception:
-            # Non-fatal: websocket may not be connected
-            pass
-
-        # Stream the response using Ollama's streaming API or a local summarizer streamer
-        try:
-            full_response = ""
-            seq = 0
-            token_count_since_commit = 0
-            last_commit = time.monotonic()
-            # Choose streaming source: summarizer_text yields local chunks, otherwise call model stream
-            async def _stream_from_text(text: str):
-                # Yield sentence/chunk based pieces so clients see progressive output
-                # Split on sentence boundaries but keep reasonably sized chunks
-                sentences = re.split(r'(?<=[\.!?])\s+', text)
-                for sent in sentences:
-                    if not sent:
-                        continue
-                    # Further chunk long sentences for smoother streaming
-                    max_chunk = 200
-                    for i in range(0, len(sent), max_chunk):
-                        piece = sent[i:i+max_chunk]
-                        # Small await to yield control and behave like an async stream
-                        await asyncio.sleep(0)
-                        yield piece
-
-            first_token_time = None
-            if summarizer_text:
-                stream_iter = _stream_from_text(summarizer_text)
-                logger.debug("Using local summarizer stream for session %s (approx %d chars)", session_id, len(summarizer_text))
-            else:
-                stream_iter = chat_service.generate_chat_response_streaming(
-                    full_message,  # Use full message with file context
-                    image_path=image_path_for_vlm  # Pass image directly to VLM
+                # Use streaming for real-time token-by-token response in all cases
+                # Create an assistant message placeholder so clients can show a live message
+                ai_message = models.ChatMessage(
+                    session_id=session_id,
+                    role="assistant",
+                    content="",
+                    status=models.MessageStatus.streaming
                 )
+                db.add(ai_message)
+                db.commit()
+                db.refresh(ai_message)
 
-            async for token in stream_iter:
-                if first_token_time is None:
-                    first_token_time = time.monotonic()
-                    ttfb = first_token_time - gen_start
-                    logger.info("First token session=%s message=%s TTFB=%.3fs", session_id, ai_message.id, ttfb)
-                full_response += token
-                token_count_since_commit += 1
-
-                # Send delta to websocket clients (real-time updates)
+                # Notify any websocket clients that an assistant message is being streamed
                 try:
                     from app.api.ws import manager as ws_manager
-                    seq += 1
-                    payload = {
-                        "type": "assistant_delta",
+                    init_payload = {
+                        "type": "assistant_init",
                         "message_id": ai_message.id,
-                        "content": full_response,
-                        "final": False,  # Will set to True after loop
-                        "seq": seq
+                        "content": "",
+                        "seq": 0
                     }
-                    await ws_manager.send_json_to_session(session_id, payload)
+                    await ws_manager.send_json_to_session(session_id, init_payload)
                 except Exception:
-                    # Ignore websocket errors; clients may poll instead
+                    # Non-fatal: websocket may not be connected
                     pass
 
-                # Occasionally persist progress so refreshed clients can poll and catch up
-                now = time.monotonic()
-                if token_count_since_commit >= 20 or (now - last_commit) > 1.0:
+                # Stream the response using Ollama's streaming API or a local summarizer streamer
+                try:
+                    full_response = ""
+                    seq = 0
+                    token_count_since_commit = 0
+                    last_commit = time.monotonic()
+                    first_token_time = None
+                    # Section-wise reports yield the whole report so far, not a delta
+                    snapshots = report_sections is not None
+                    if snapshots:
+                        stream_iter = report_sections
+                    elif summary_stream is not None:
+                        stream_iter = summary_stream
+                    else:
+                        # Earlier conversation (rolling summary + recent messages, within a
+                        # fixed token budget) and the session's document as a cached prefix,
+                        # when there are any
+                        chat_context = {}
+                        history = conversation_memory.load_chat_history(db, session_id, before_id=user_message.id)
+                        if history:
+                            chat_context["history"] = history
+                        if await _restore_session_document(db, session_id):
+                            chat_context["session_id"] = session_id
+                        stream_iter = chat_service.generate_chat_response_streaming(
+                            full_message,  # Use full message with file context
+                            image_path=image_path_for_vlm,  # Pass image directly to VLM
+                            **chat_context
+                        )
+
+                    async for token in stream_iter:
+                        if first_token_time is None:
+                            first_token_time = time.monotonic()
+                            ttfb = first_token_time - gen_start
+                            logger.info("First token session=%s message=%s TTFB=%.3fs", session_id, ai_message.id, ttfb)
+                        if snapshots:
+                            full_response = re.sub(r'\*+', '', token).strip()
+                        elif summary_stream is not None:
+                            full_response += re.sub(r'\*+', '', token)
+                        else:
+                            full_response += token
+                        token_count_since_commit += 1
+
+                        # Send delta to websocket clients (real-time updates)
+                        try:
+                            from app.api.ws import manager as ws_manager
+                            seq += 1
+                            payload = {
+                                "type": "assistant_delta",
+                                "message_id": ai_message.id,
+                                "content": full_response,
+                                "final": False,  # Will set to True after loop
+                                "seq": seq
+                            }
+                            await ws_manager.send_json_to_session(session_id, payload)
+                        except Exception:
+                            # Ignore websocket errors; clients may poll instead
+                            pass
+
+                        # Occasionally persist progress so refreshed clients can poll and catch up
+                        now = time.monotonic()
+                        if token_count_since_commit >= 20 or (now - last_commit) > 1.0:
+                            ai_message.content = full_response
+                            db.add(ai_message)
+                            db.commit()
+                            db.refresh(ai_message)
+                            token_count_since_commit = 0
+                            last_commit = now
+
+                    # Clean the response text by removing asterisks and extra whitespace
+                    full_response = re.sub(r'\*+', '', full_response).strip()
+                    # Update DB message content only once at the end
                     ai_message.content = full_response
+                    ai_message.status = models.MessageStatus.completed
                     db.add(ai_message)
                     db.commit()
                     db.refresh(ai_message)
-                    token_count_since_commit = 0
-                    last_commit = now
 
-            # Clean the response text by removing asterisks and extra whitespace
-            full_response = re.sub(r'\*+', '', full_response).strip()
-            # Update DB message content only once at the end
-            ai_message.content = full_response
-            db.add(ai_message)
-            db.commit()
-            db.refresh(ai_message)
-
-            # Send final delta
-            try:
-                from app.api.ws import manager as ws_manager
-                payload = {
-                    "type": "assistant_delta",
-                    "message_id": ai_message.id,
-                    "content": full_response,
-                    "final": True,
-                    "seq": seq + 1
-                }
-                await ws_manager.send_json_to_session(session_id, payload)
-            except Exception:
-                # Ignore websocket errors; clients may poll instead
-                pass
-
-            # Schedule background TTS generation now that final content is saved
-            try:
-                audio_filename = f"{uuid4().hex}_response.wav"
-                background_tasks.add_task(
-                    _generate_and_attach_tts,
-                    ai_message.id,
-                    ai_message.content,
-                    audio_filename,
-                )
-                logger.info(f"Scheduled background TTS for message {ai_message.id}")
-            except Exception as e:
-                logger.error(f"Failed to schedule background TTS: {e}", exc_info=True)
-            total_time = time.monotonic() - gen_start
-            stream_time = 0.0
-            if 'first_token_time' in locals() and first_token_time:
-                stream_time = time.monotonic() - first_token_time
-            logger.info(
-                "AI response complete session=%s message=%s total=%.3fs stream=%.3fs chars=%d",
-                session_id, ai_message.id, total_time, stream_time, len(full_response)
-            )
-            overall = time.monotonic() - req_start
-            logger.debug("chat.send finished session=%s overall=%.3fs", session_id, overall)
-            return ai_message
-
-        except Exception as e:
-            # Streaming failed — log with detail and return a helpful assistant error message
-            logger.exception("Streaming assistant response failed session=%s: %s", session_id, e)
-            ai_message.content = (
-                "I ran into an issue streaming the AI response. Please try again shortly."
-            )
-            db.add(ai_message)
-            db.commit()
-            db.refresh(ai_message)
-            return ai_message
+                    # Send final delta
+                    try:
+                        from app.api.ws import manager as ws_manager
+                        payload = {
+                            "type": "assistant_delta",
+                            "message_id": ai_message.id,
+                            "content": full_response,
+                            "final": True,
+                            "seq": seq + 1
+                        }
+                        await ws_manager.send_json_to_session(session_id, payload)
+                    except Exception:
+                        # Ignore websocket errors; clients may poll instead
+                        pass
+
+                    # Schedule background TTS generation now that final content is saved
+                    try:
+                        audio_filename = f"{uuid4().hex}_response.wav"
+                        background_tasks.add_task(
+                            _generate_and_attach_tts,
+                            ai_message.id,
+                            ai_message.content,
+                            audio_filename,
+                        )
+                        logger.info(f"Scheduled background TTS for message {ai_message.id}")
+                    except Exception as e:
+                        logger.error(f"Failed to schedule background TTS: {e}", exc_info=True)
+                    # Fold older turns into the session's rolling summary when due
+                    background_tasks.add_task(conversation_memory.refresh_conversation_summary, session_id)
+                    total_time = time.monotonic() - gen_start
+                    stream_time = 0.0
+                    if 'first_token_time' in locals() and first_token_time:
+                        stream_time = time.monotonic() - first_token_time
+                    logger.info(
+                        "AI response complete session=%s message=%s total=%.3fs stream=%.3fs chars=%d",
+                        session_id, ai_message.id, total_time, stream_time, len(full_response)
+                    )
+                    overall = time.monotonic() - req_start
+                    logger.debug("chat.send finished session=%s overall=%.3fs", session_id, overall)
+                    return ai_message
+
+                except AdmissionRejected as e:
+                    # Shed by admission control: say so (like free chat) instead of a generic failure
+                    logger.warning("Assistant response shed session=%s (%s queue full)", session_id, e.priority)
+                    ai_message.content = (
+                        f"The AI engine is busy right now. Please try again in {e.retry_after} seconds."
+                    )
+                    ai_message.status = models.MessageStatus.failed
+                    db.add(ai_message)
+                    db.commit()
+                    db.refresh(ai_message)
+                    return ai_message
+                except Exception as e:
+                    # Streaming failed — log with detail and return a helpful assistant error message
+                    logger.exception("Streaming assistant response failed session=%s: %s", session_id, e)
+                    ai_message.content = (
+                        "I ran into an issue streaming the AI response. Please try again shortly."
+                    )
+                    ai_message.status = models.MessageStatus.failed
+                    db.add(ai_message)
+                    db.commit()
+                    db.refresh(ai_message)
+                    return ai_message
         
-    except Exception as e:
-        logger.error(f"Error generating chat response session={session_id}: {e}", exc_info=True)
-        # Save error message
-        error_message = models.ChatMessage(
-            session_id=session_id,
-            role="assistant",
-            content="I apologize, but I encountered an error processing your request. Please try again."
-        )
-        db.add(error_message)
-        db.commit()
-        db.refresh(error_message)
-        return error_message
+            except AdmissionRejected:
+                # Answered with 503 + Retry-After by the app's exception handler
+                raise
+            except Exception as e:
+                logger.error(f"Error generating chat response session={session_id}: {e}", exc_info=True)
+                # Save error message
+                error_message = models.ChatMessage(
+                    session_id=session_id,
+                    role="assistant",
+                    content="I apologize, but I encountered an error processing your request. Please try again."
+                )
+                db.add(error_message)
+                db.commit()
+                db.refresh(error_message)
+                return error_message
 
+    except ClientDisconnected:
+        return await _abort_assistant_message(db, session_id, ai_message, full_response)
 
 @router.delete("/sessions/{session_id}")
 def delete_chat_session(session_id: int, db: Session = Depends(get_db)):
@@ -441,6 +555,7 @@ def delete_chat_session(session_id: int, db: Session = Depends(get_db)):
     
     db.delete(session)
     db.commit()
+    chat_service.clear_session_document(session_id)
     
     logger.info(f"Deleted chat session: {session_id}")
     return {"message": "Chat session deleted successfully"}
@@ -22,3 +22,78 @@ def ollama_health_check():
         ready = False
     status = 'ready' if ready else 'unavailable'
     return JSONResponse({"service": "ollama", "status": status})
+
+
+@router.get('/ollama/telemetry', summary='Per-caller LLM token and timing telemetry')
+def ollama_telemetry():
+    """Returns token counts, compute seconds, tokens/sec and TTFT histograms and model reloads per caller, plus num_ctx budgeting counts."""
+    from app.services.llm_budget import budget_stats
+    from app.services.llm_telemetry import get_telemetry
+    return JSONResponse({"service": "ollama", **get_telemetry().snapshot(), "context_budget": budget_stats()})
+
+
+@router.get('/ollama/warmer', summary='Ollama model warmer status')
+def ollama_warmer():
+    """Returns the warm-keeping schedule, ping counts and recent cold model loads."""
+    from app.services.ollama_warmer import get_warmer
+    return JSONResponse({"service": "ollama", "warmer": get_warmer().snapshot()})
+
+
+@router.get('/ollama/circuit', summary='Ollama circuit breaker state')
+def ollama_circuit():
+    """Returns the circuit breaker state and the last background health probe result."""
+    from app.services.ollama_health import get_breaker, get_prober
+    return JSONResponse({
+        "service": "ollama",
+        "circuit": get_breaker().snapshot(),
+        "prober": get_prober().snapshot(),
+    })
+
+
+@router.get('/ollama/backends', summary='Ollama backend routing statistics')
+def ollama_backends():
+    """Returns per-backend health, in-flight count and latency statistics, plus retry/hedge counters."""
+    from app.services.ollama_client import retry_stats
+    from app.services.ollama_router import get_router
+    return JSONResponse({
+        "service": "ollama",
+        "backends": get_router().snapshot(),
+        "retry_policy": retry_stats(),
+    })
+
+
+@router.get('/ollama/admission', summary='Ollama admission control statistics')
+def ollama_admission():
+    """Returns per-priority active/queued counts, shed requests and queue-wait times."""
+    from app.services.ollama_admission import get_admission
+    return JSONResponse({"service": "ollama", "admission": get_admission().stats()})
+
+
+@router.get('/llm-cache', summary='LLM response cache statistics')
+def llm_cache_stats():
+    """Returns hit/miss counters and tier sizes of the summarizer response cache."""
+    from app.services.llm_cache import get_response_cache
+    cache = get_response_cache()
+    if cache is None:
+        return JSONResponse({"service": "llm_cache", "status": "disabled"})
+    return JSONResponse({"service": "llm_cache", "status": "enabled", **cache.stats()})
+
+
+@router.get('/extraction-cache', summary='Document extraction cache statistics')
+def extraction_cache_stats():
+    """Returns hit/miss counters, evictions and size of the document extraction cache."""
+    from app.services.extraction_cache import get_extraction_cache
+    cache = get_extraction_cache()
+    if cache is None:
+        return JSONResponse({"service": "extraction_cache", "status": "disabled"})
+    return JSONResponse({"service": "extraction_cache", "status": "enabled", **cache.stats()})
+
+
+@router.get('/docling-pool', summary='Docling worker pool statistics')
+def docling_pool_stats():
+    """Returns worker counts, job outcomes (timeouts, crashes, recycles) and conversion times."""
+    from app.services.docling_pool import get_pool
+    pool = get_pool()
+    if pool is None:
+        return JSONResponse({"service": "docling_pool", "status": "disabled"})
+    return JSONResponse({"service": "docling_pool", "status": "enabled", **pool.stats()})
@@ -8,9 +8,12 @@ from pathlib import Path
 
 from app.db import schemas, models
 from app.api.deps import get_db
-from app.services import parser_service, summarizer_service, tts_service
+from app.services import batch_summarizer, parser_service, summarizer_service, tts_service
+from app.services.extraction_cache import content_digest
+from app.services.lab_extractor import extract_lab_values
 from app.utils.text_utils import sanitize_text
 from app.utils import events as events
+from app.services.ollama_admission import AdmissionRejected, get_admission, set_request_priority
 import asyncio
 import json
 from uuid import uuid4
@@ -26,6 +29,14 @@ REPORTS_DIR.mkdir(parents=True, exist_ok=True)
 AUDIO_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def _fail_shed_report(db: Session, report: models.Report, exc: AdmissionRejected) -> None:
+    """Mark a report shed mid-pipeline as failed; the caller re-raises for the 503."""
+    logger.warning(f"Report {report.id} shed by admission control ({exc.priority} queue full)")
+    report.status = models.ReportStatus.failed
+    report.summary_text = str(exc)
+    db.commit()
+
+
 @router.post("/upload-text", response_model=schemas.Report)
 async def upload_text_report(
     text_content: str = Form(...),
@@ -37,6 +48,9 @@ async def upload_text_report(
     Submits and PROCESSES a new text-based report synchronously.
     The user will wait for this endpoint to finish.
     """
+    set_request_priority("report")
+    get_admission().precheck("report")
+
     # 1. Create initial report in DB
     new_report = models.Report(
         language=language,
@@ -56,28 +70,31 @@ async def upload_text_report(
         events.create_queue(new_report.id)
         events.publish(new_report.id, {"status": "started", "stage": "created"})
 
-        # 2. Run Summarizer (offload blocking work to thread)
+        # 2. Run Summarizer (async LLM call; blocking TTS is offloaded to a thread)
         logger.info("Generating summary from text...")
         events.publish(new_report.id, {"status": "in-progress", "stage": "summarizing"})
 
         cleaned = sanitize_text(new_report.raw_text)
+        # Lab values are parsed deterministically and handed to the prompt precomputed
+        new_report.lab_results = [r.to_dict() for r in extract_lab_values(cleaned)]
 
-        def _run_text_pipeline(text, language, report_id):
-            # This runs in a background thread
+        async def _run_text_pipeline(text, language, report_id):
             events.publish(report_id, {"status": "in-progress", "stage": "summarize_start"})
-            summary = summarizer_service.generate_summary_from_text(text, language)
+            summary = await summarizer_service.agenerate_summary_from_text(text, language, new_report.lab_results)
             events.publish(report_id, {"status": "in-progress", "stage": "summarize_done"})
 
             # TTS
             events.publish(report_id, {"status": "in-progress", "stage": "tts_start"})
             audio_file_name = f"report_{report_id}.wav"
             audio_save_path = AUDIO_DIR / audio_file_name
-            tts_service.generate_speech(text=summary, language=language, output_file_path=str(audio_save_path))
+            await asyncio.to_thread(
+                tts_service.generate_speech, text=summary, language=language, output_file_path=str(audio_save_path)
+            )
             events.publish(report_id, {"status": "in-progress", "stage": "tts_done", "audio": str(audio_save_path)})
 
             return summary, audio_file_name
 
-        summary, audio_file_name = await asyncio.to_thread(_run_text_pipeline, cleaned, new_report.language, new_report.id)
+        summary, audio_file_name = await _run_text_pipeline(cleaned, new_report.language, new_report.id)
 
         # 4. Update report with results
         new_report.summary_text = summary
@@ -87,6 +104,11 @@ async def upload_text_report(
 
         logger.info(f"Text report {new_report.id} completed successfully")
 
+    except AdmissionRejected as e:
+        # Load shedding must reach the client as 503 + Retry-After, not a failed report
+        events.publish(new_report.id, {"status": "failed", "error": str(e)})
+        _fail_shed_report(db, new_report, e)
+        raise
     except Exception as e:
         # 5. Handle failure
         logger.error(f"Text report processing failed for report {new_report.id}: {e}", exc_info=True)
@@ -114,6 +136,9 @@ async def upload_files_report(
     For documents/PDFs, extracts text with Docling then summarizes.
     The user will wait for this endpoint to finish.
     """
+    # Uploads run in the report lane, behind interactive chat
+    set_request_priority("report")
+    get_admission().precheck("report")
 
     # 1. Save file and create initial report
     results: List[models.Report] = []
@@ -157,48 +182,64 @@ async def upload_files_report(
             events.create_queue(new_report.id)
             events.publish(new_report.id, {"status": "started", "stage": "created"})
 
-            def _process_file(path, is_img, language, report_id):
+            async def _process_file(path, is_img, language, report_id, digest):
                 logger.debug(f"Processing file {path} for report {report_id}, is_image={is_img}")
-                # Runs in thread
+                # LLM calls are awaited on the pooled async client; parsing and TTS run in threads
                 try:
                     events.publish(report_id, {"status": "in-progress", "stage": "processing_file"})
+                    lab_results = None
+                    cleaned = None
                     if is_img:
                         events.publish(report_id, {"status": "in-progress", "stage": "image_analysis_start"})
-                        summary = summarizer_service.generate_summary_from_image(str(path), language)
+                        summary = await summarizer_service.agenerate_summary_from_image(str(path), language)
                         events.publish(report_id, {"status": "in-progress", "stage": "image_analysis_done"})
                     else:
                         events.publish(report_id, {"status": "in-progress", "stage": "doc_extract_start"})
-                        extracted_results = parser_service.extract_data_from_file(str(path))
+                        # Byte-identical uploads are served from the extraction cache
+                        extracted_results = await asyncio.to_thread(parser_service.extract_data_from_file, str(path), digest)
                         events.publish(report_id, {"status": "in-progress", "stage": "doc_extract_done", "chars": len(extracted_results)})
                         cleaned = sanitize_text(extracted_results)
+                        lab_results = [r.to_dict() for r in extract_lab_values(cleaned)]
+                        events.publish(report_id, {"status": "in-progress", "stage": "lab_values", "count": len(lab_results)})
                         events.publish(report_id, {"status": "in-progress", "stage": "summarize_start"})
-                        summary = summarizer_service.generate_summary_from_text(cleaned, language)
+                        summary = await summarizer_service.agenerate_summary_from_text(cleaned, language, lab_results)
                         events.publish(report_id, {"status": "in-progress", "stage": "summarize_done"})
 
                     # TTS
                     events.publish(report_id, {"status": "in-progress", "stage": "tts_start"})
                     audio_file_name = f"report_{report_id}.wav"
                     audio_save_path = AUDIO_DIR / audio_file_name
-                    tts_service.generate_speech(text=summary, language=language, output_file_path=str(audio_save_path))
+                    await asyncio.to_thread(
+                        tts_service.generate_speech, text=summary, language=language, output_file_path=str(audio_save_path)
+                    )
                     events.publish(report_id, {"status": "in-progress", "stage": "tts_done", "audio": str(audio_save_path)})
 
-                    return {"summary": summary, "audio": audio_file_name}
+                    return {"summary": summary, "audio": audio_file_name, "lab_results": lab_results, "raw_text": cleaned}
                 except Exception as e:
                     events.publish(report_id, {"status": "failed", "error": str(e)})
                     raise
 
-            result = await asyncio.to_thread(_process_file, file_save_path, is_image, new_report.language, new_report.id)
+            result = await _process_file(
+                file_save_path, is_image, new_report.language, new_report.id, content_digest(file_content)
+            )
 
             summary = result["summary"]
             audio_file_name = result["audio"]
 
             # Update report with results
             new_report.summary_text = summary
+            # Kept so stored reports can be summarized again (e.g. /batch-summarize) without re-parsing
+            new_report.raw_text = result["raw_text"]
+            new_report.lab_results = result["lab_results"]
             new_report.audio_file_path = f"media/audio/{audio_file_name}"
             new_report.status = models.ReportStatus.completed
             events.publish(new_report.id, {"status": "completed", "stage": "done", "audio": new_report.audio_file_path})
             logger.info(f"File report {new_report.id} completed successfully")
 
+        except AdmissionRejected as e:
+            # Load shedding must reach the client as 503 + Retry-After, not a failed report
+            _fail_shed_report(db, new_report, e)
+            raise
         except Exception as e:
             # Handle failure
             logger.error(f"File report processing failed for report {new_report.id}: {e}", exc_info=True)
@@ -213,6 +254,80 @@ async def upload_files_report(
     return results
 
 
+async def _restore_raw_text(db: Session, report: models.Report) -> None:
+    """Fill in `raw_text` of a document report stored without it, from its uploaded file."""
+    if (report.raw_text or "").strip() or report.report_type != models.ReportType.text:
+        return
+    if not report.original_file_path or not Path(report.original_file_path).exists():
+        return
+    # Served from the extraction cache when the file was parsed at upload
+    extracted = await asyncio.to_thread(parser_service.extract_data_from_file, report.original_file_path)
+    if extracted.startswith("Error:"):
+        return
+    report.raw_text = sanitize_text(extracted)
+    if report.lab_results is None:
+        report.lab_results = [r.to_dict() for r in extract_lab_values(report.raw_text)]
+    db.commit()
+
+
+@router.post("/batch-summarize")
+async def batch_summarize(request: schemas.BatchSummaryRequest, db: Session = Depends(get_db)):
+    """
+    Summarizes many reports at once and streams one NDJSON line per item as it finishes.
+
+    Items are stored reports (`report_ids`, using their extracted text and lab
+    values, so nothing is re-parsed; document reports stored without text get
+    it from their file via the extraction cache) and/or raw `texts`. Work is spread over a
+    bounded worker pool in the batch admission lane, behind chat and uploads.
+    """
+    if request.audience not in batch_summarizer.AUDIENCES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"audience must be one of: {', '.join(batch_summarizer.AUDIENCES)}",
+        )
+    total = len(request.report_ids) + len(request.texts)
+    if total == 0:
+        raise HTTPException(status_code=422, detail="Provide report_ids and/or texts.")
+    if total > batch_summarizer.max_items():
+        raise HTTPException(status_code=413, detail=f"At most {batch_summarizer.max_items()} items per batch.")
+
+    set_request_priority("batch")
+    get_admission().precheck("batch")
+
+    # Load the stored reports up front; the stream itself does not touch the DB
+    reports = {
+        r.id: r for r in db.query(models.Report).filter(models.Report.id.in_(request.report_ids)).all()
+    }
+    for report in reports.values():
+        await _restore_raw_text(db, report)
+    items: List[batch_summarizer.BatchItem] = []
+    for report_id in request.report_ids:
+        report = reports.get(report_id)
+        if report is None:
+            error = "Report not found"
+        elif not (report.raw_text or "").strip():
+            error = "Report has no extracted text"
+        else:
+            error = None
+        items.append(batch_summarizer.BatchItem(
+            index=len(items),
+            text=report.raw_text if report is not None else None,
+            report_id=report_id,
+            lab_results=report.lab_results if report is not None else None,
+            error=error,
+        ))
+    for text in request.texts:
+        items.append(batch_summarizer.BatchItem(index=len(items), text=text))
+
+    async def ndjson_lines():
+        async for result in batch_summarizer.astream_batch_summaries(
+            items, request.audience, request.language, request.concurrency
+        ):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @router.get("/", response_model=List[schemas.Report])
 def get_reports(db: Session = Depends(get_db)):
     """Gets a list of all reports (no authentication)."""
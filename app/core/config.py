@@ -15,6 +15,14 @@ Environment Variables:
 - LOG_LEVEL: Logging verbosity - DEBUG, INFO, WARNING, ERROR (default: INFO)
 - LOG_SQL: Enable SQLAlchemy SQL query logging (default: False)
 - DEBUG: Enable debug mode for verbose service logs (default: False)
+- LLM_CACHE_ENABLED: Cache deterministic summarizer outputs (default: True)
+- LLM_CACHE_PATH: SQLite file for the persistent cache tier (default: ./cache/llm_responses.sqlite3)
+- LLM_CACHE_TTL_SECONDS: Lifetime of cached outputs (default: 7 days)
+- LLM_CACHE_MEMORY_ENTRIES: In-memory LRU capacity (default: 256)
+- LLM_CACHE_MAX_DISK_MB: Size budget of the SQLite tier (default: 64)
+- EXTRACTION_CACHE_ENABLED: Cache document extractions by file content (default: True)
+- EXTRACTION_CACHE_PATH: SQLite file of the extraction cache (default: ./cache/extractions.sqlite3)
+- EXTRACTION_CACHE_MAX_DISK_MB: Size budget of the extraction cache (default: 256)
 """
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -58,6 +66,32 @@ class Settings(BaseSettings):
     MODEL_NAME: str
     """Ollama model name for medical analysis and chat."""
 
+    # ========== LLM RESPONSE CACHE ==========
+    LLM_CACHE_ENABLED: bool = True
+    """If True, deterministic summarizer outputs are served from the response cache."""
+
+    LLM_CACHE_PATH: str = "./cache/llm_responses.sqlite3"
+    """SQLite file backing the persistent cache tier (empty string = memory only)."""
+
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    """Time-to-live for cached outputs in seconds."""
+
+    LLM_CACHE_MEMORY_ENTRIES: int = 256
+    """Maximum number of entries held in the in-memory LRU tier."""
+
+    LLM_CACHE_MAX_DISK_MB: int = 64
+    """Size budget for the SQLite tier; least recently used rows are evicted beyond it."""
+
+    # ========== DOCUMENT EXTRACTION CACHE ==========
+    EXTRACTION_CACHE_ENABLED: bool = True
+    """If True, byte-identical uploads reuse their earlier Docling/OCR extraction."""
+
+    EXTRACTION_CACHE_PATH: str = "./cache/extractions.sqlite3"
+    """SQLite file of the extraction cache (empty string = disabled)."""
+
+    EXTRACTION_CACHE_MAX_DISK_MB: int = 256
+    """Size budget of the extraction cache; least recently used entries are evicted beyond it."""
+
     # Pydantic configuration
     model_config = SettingsConfigDict(env_file=".env")
 
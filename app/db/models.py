@@ -12,7 +12,7 @@ Models:
 - ChatMessage: Individual messages within a chat session
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, ForeignKey, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -30,6 +30,14 @@ class ReportStatus(enum.Enum):
     failed = "failed"          # Processing failed
 
 
+class MessageStatus(enum.Enum):
+    """Lifecycle of an assistant chat message."""
+    streaming = "streaming"    # Tokens are still being generated
+    completed = "completed"    # Generation finished normally
+    aborted = "aborted"        # Client disconnected; generation was cancelled
+    failed = "failed"          # Generation failed
+
+
 class ReportType(enum.Enum):
     """Type of input document for the report."""
     text = "text"    # Plain text input
@@ -47,6 +55,7 @@ class Report(Base):
     Stores:
     - Original uploaded file information
     - Extracted text content
+    - Structured lab values
     - AI-generated summary
     - Text-to-speech audio output
     - Processing status and metadata
@@ -74,6 +83,9 @@ class Report(Base):
     summary_text = Column(Text, nullable=True)
     """AI-generated summary of the medical report."""
     
+    lab_results = Column(JSON, nullable=True)
+    """Lab values extracted and flagged deterministically (see app.services.lab_extractor)."""
+    
     # File management
     original_file_path = Column(String, nullable=True)
     """Path to uploaded file (relative to media directory)."""
@@ -114,6 +126,12 @@ class ChatSession(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     title = Column(String, default="New Conversation")
     """User-friendly title for the conversation."""
+
+    context_summary = Column(Text, nullable=True)
+    """Rolling summary of the earlier messages (see app.services.conversation_memory)."""
+
+    context_summarized_through = Column(Integer, nullable=True)
+    """Id of the last message folded into `context_summary`."""
     
     # Relationships
     messages = relationship(
@@ -154,6 +172,9 @@ class ChatMessage(Base):
     
     audio_file_path = Column(String, nullable=True)
     """Optional: Path to TTS audio file for assistant responses."""
+
+    status = Column(Enum(MessageStatus), default=MessageStatus.completed, nullable=True)
+    """Generation state of the message (user messages are always completed)."""
     
     # Relationships
     session = relationship("ChatSession", back_populates="messages")
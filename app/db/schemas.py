@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from app.db.models import ReportStatus, ReportType
+from app.db.models import MessageStatus, ReportStatus, ReportType
 from typing import List
 
 class Token(BaseModel):
@@ -10,6 +10,19 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: str | None = None
 
+class LabResult(BaseModel):
+    name: str
+    value: float | None = None
+    value_text: str
+    unit: str | None = None
+    reference_range: str | None = None
+    ref_low: float | None = None
+    ref_high: float | None = None
+    flag: str | None = None
+    deviation_pct: float | None = None
+    source: str = "text"
+
+
 class Report(BaseModel):
     id: int
     created_at: datetime
@@ -21,6 +34,7 @@ class Report(BaseModel):
     original_filename: str | None = None
     mime_type: str | None = None
     summary_text: str | None = None
+    lab_results: List[LabResult] | None = None
     audio_file_path: str | None = None
     chat_session_id: int | None = None
     thumbnail_path: str | None = None
@@ -29,6 +43,14 @@ class Report(BaseModel):
         from_attributes = True
 
 
+class BatchSummaryRequest(BaseModel):
+    report_ids: List[int] = []
+    texts: List[str] = []
+    audience: str = "patient"
+    language: str = "English"
+    concurrency: int | None = None
+
+
 class ChatMessageCreate(BaseModel):
     content: str
 
@@ -40,6 +62,7 @@ class ChatMessage(BaseModel):
     role: str
     content: str
     audio_file_path: str | None = None
+    status: MessageStatus | None = None
 
     class Config:
         from_attributes = True
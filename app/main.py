@@ -46,6 +46,7 @@ import logging
 import scripts.download_models as _download_models
 from app.db import models, database
 from app.core.config import settings
+from app.services.ollama_admission import AdmissionRejected
 
 # Note: api_router and page_router are imported INSIDE lifespan()
 # to avoid triggering heavy service imports too early during startup
@@ -222,6 +223,18 @@ async def _preload_models_background(app: FastAPI):
         logger.exception("❌ Failed to prepare AI models: %s", e)
 
 
+def _log_docling_ready(task: asyncio.Task) -> None:
+    """Report the outcome of the background Docling pool warm-up."""
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        logger.error("❌ Docling worker warm-up failed: %s", task.exception())
+    elif task.result():
+        logger.info("✅ Docling workers ready")
+    else:
+        logger.warning("⚠️  Docling workers did not all start; failed workers are respawned on demand")
+
+
 # ============================================================================
 # APPLICATION LIFESPAN (STARTUP/SHUTDOWN)
 # ============================================================================
@@ -238,10 +251,13 @@ async def lifespan(app: FastAPI):
     1. Initialize database tables
     2. Optionally run migrations (RUN_MIGRATIONS=1)
     3. Import and register API/page routers
-    4. Optionally preload AI models (PRELOAD_MODELS=1)
-    5. Configure logging levels
+    4. Verify and warm the Ollama model, start the warmer and health prober
+       and the Docling worker pool
+    5. Optionally preload AI models (PRELOAD_MODELS=1)
+    6. Configure logging levels
     
     Shutdown sequence:
+    - Stop the Ollama health prober, model warmer, Docling and OCR workers
     - Clean up resources (if needed)
     """
     # ========== STARTUP ==========
@@ -284,13 +300,43 @@ async def lifespan(app: FastAPI):
     
     # Always verify Ollama model on startup (quick check)
     logger.info("🔍 Verifying Ollama model availability...")
-    await _verify_ollama_model()
+    model_available = await _verify_ollama_model()
+
+    # Load the model(s) before reporting ready so the first chat does not pay
+    # a cold load, then keep them warm on a business-hours schedule
+    from app.services.ollama_warmer import get_warmer
+    ollama_warmer = get_warmer()
+    app.state.ollama_warm = False
+    if model_available and os.environ.get("OLLAMA_WARM_ON_STARTUP", "1") == "1":
+        logger.info("🔥 Warming Ollama model(s): %s", ollama_warmer.models)
+        app.state.ollama_warm = await ollama_warmer.warm_all()
+    ollama_warmer.start()
+
+    # Background health prober feeds the Ollama circuit breaker, so request
+    # paths read an in-memory state instead of probing per message
+    from app.services.ollama_health import get_prober
+    ollama_prober = get_prober()
+    ollama_prober.start()
+
+    # Docling runs in worker processes; start them now so they initialize
+    # their converters before the first upload. Background startup tasks are
+    # kept on app.state so they are not garbage-collected and their outcome
+    # is observed
+    app.state.startup_tasks = []
+    docling_ready = None
+    from app.services.docling_pool import get_pool
+    docling = get_pool()
+    if docling is not None:
+        docling.start()
+        docling_ready = asyncio.create_task(asyncio.to_thread(docling.wait_ready))
+        docling_ready.add_done_callback(_log_docling_ready)
+        app.state.startup_tasks.append(docling_ready)
     
     # Optionally preload AI models in background
     preload = os.environ.get("PRELOAD_MODELS", "0")
     if preload == "1":
         try:
-            asyncio.create_task(_preload_models_background(app))
+            app.state.startup_tasks.append(asyncio.create_task(_preload_models_background(app)))
             logger.info("🔄 AI model preload scheduled (non-blocking)")
         except Exception as e:
             logger.warning("⚠️  Could not schedule model preload: %s", e)
@@ -311,6 +357,17 @@ async def lifespan(app: FastAPI):
     
     # ========== SHUTDOWN ==========
     logger.info("🛑 FastAPI shutting down...")
+    await ollama_prober.stop()
+    await ollama_warmer.stop()
+    if docling is not None:
+        await asyncio.to_thread(docling.shutdown)
+    # Preloading may still be running; the Docling warm-up returns once the pool is shut down
+    for task in app.state.startup_tasks:
+        if not task.done() and task is not docling_ready:
+            task.cancel()
+    await asyncio.gather(*app.state.startup_tasks, return_exceptions=True)
+    from app.services import ocr_service
+    await asyncio.to_thread(ocr_service.shutdown)
 
 
 # ============================================================================
@@ -336,6 +393,7 @@ def healthcheck():
     Returns:
         - service: Application name
         - ready: Whether AI models are loaded and ready
+        - ollama_warm: Whether the startup warm-up loaded every model
         - db: Database connectivity status
     """
     db_ok = True
@@ -349,6 +407,7 @@ def healthcheck():
     return {
         "service": "med-analyzer",
         "ready": getattr(app.state, "models_ready", False),
+        "ollama_warm": getattr(app.state, "ollama_warm", False),
         "db": db_ok,
     }
 
@@ -419,6 +478,22 @@ async def generic_exception_handler(request: Request, exc: Exception):
     )
 
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """
+    Load shedding: the LLM queue for this request's priority is full.
+
+    Answers 503 with a Retry-After estimate instead of queueing unboundedly.
+    """
+    logger.warning("🚦 %s %s shed (%s queue full)", request.method, request.url.path, exc.priority)
+    return Response(
+        content=json.dumps({"detail": str(exc), "retry_after": exc.retry_after}),
+        status_code=503,
+        media_type="application/json",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # ============================================================================
 # STATIC FILE SERVING (WEB UI)
 # ============================================================================
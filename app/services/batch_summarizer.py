@@ -0,0 +1,134 @@
+"""
+Batch Summarization
+
+Summarizes many documents with bounded fan-out:
+- A fixed pool of workers (at most BATCH_SUMMARY_CONCURRENCY) pulls items
+  from a queue, so a batch of hundreds never creates hundreds of
+  generations at once
+- All model calls run in the `batch` admission lane, behind chat and
+  report uploads (see app.services.ollama_admission)
+- Results are yielded as each item finishes, not in submission order; every
+  result carries the item's `index` so clients can match it up
+- A failed item is reported in its result and does not stop the batch;
+  closing the result stream cancels the outstanding work
+
+Environment Variables:
+- BATCH_SUMMARY_CONCURRENCY: Maximum concurrent items per batch (default: 4)
+- BATCH_SUMMARY_MAX_ITEMS: Maximum items accepted per batch (default: 100)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.services import summarizer_service
+from app.services.lab_extractor import extract_lab_values
+from app.services.ollama_admission import priority_scope
+from app.utils.text_utils import sanitize_text
+
+logger = logging.getLogger(__name__)
+
+# Audience -> summarizer coroutine (text, language, lab_results)
+AUDIENCES = {
+    "summary": summarizer_service.agenerate_summary_from_text,
+    "patient": summarizer_service.agenerate_patient_summary_from_text,
+    "doctor": summarizer_service.agenerate_detailed_report_from_text,
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+def max_concurrency() -> int:
+    return _env_int('BATCH_SUMMARY_CONCURRENCY', 4)
+
+
+def max_items() -> int:
+    return _env_int('BATCH_SUMMARY_MAX_ITEMS', 100)
+
+
+@dataclass
+class BatchItem:
+    """One document of a batch."""
+
+    index: int
+    text: Optional[str]
+    report_id: Optional[int] = None
+    lab_results: Optional[List[Dict[str, Any]]] = None
+    error: Optional[str] = None
+    """Set when the item cannot be summarized (e.g. unknown report); reported as is."""
+
+
+async def _summarize_item(item: BatchItem, audience: str, language: str) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"index": item.index, "report_id": item.report_id, "audience": audience}
+    if item.error:
+        return {**result, "status": "failed", "error": item.error}
+    started = time.monotonic()
+    try:
+        text = sanitize_text(item.text)
+        lab_results = item.lab_results
+        if lab_results is None:
+            lab_results = [r.to_dict() for r in extract_lab_values(text)]
+        summary = await AUDIENCES[audience](text, language, lab_results)
+        return {**result, "status": "completed", "summary": summary,
+                "seconds": round(time.monotonic() - started, 3)}
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Batch item {item.index} failed: {e}", exc_info=True)
+        return {**result, "status": "failed", "error": str(e), "seconds": round(time.monotonic() - started, 3)}
+
+
+async def astream_batch_summaries(
+    items: List[BatchItem],
+    audience: str = "patient",
+    language: str = 'English',
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Summarize `items` on a bounded worker pool, yielding each result as it finishes.
+
+    Args:
+        items: Documents to summarize
+        audience: One of AUDIENCES
+        language: Output language
+        concurrency: Workers for this batch (capped at BATCH_SUMMARY_CONCURRENCY)
+
+    Yields:
+        {"index", "report_id", "audience", "status": "completed"|"failed",
+         "summary" or "error", "seconds"}
+    """
+    if audience not in AUDIENCES:
+        raise ValueError(f"Unknown audience: {audience}")
+    workers = max(1, min(concurrency or max_concurrency(), max_concurrency(), len(items) or 1))
+    logger.info(f"Batch summarization of {len(items)} items (audience={audience}, workers={workers})")
+
+    pending: asyncio.Queue = asyncio.Queue()
+    for item in items:
+        pending.put_nowait(item)
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def _worker():
+        while True:
+            try:
+                item = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await results.put(await _summarize_item(item, audience, language))
+
+    with priority_scope("batch"):
+        tasks = [asyncio.create_task(_worker()) for _ in range(workers)]
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
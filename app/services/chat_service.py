@@ -1,20 +1,38 @@
 """Medical Chat Service with Guardrails.
 
-Provides a thin service layer that builds prompts, calls the Ollama wrapper
-`chat_with_retries` and enforces medical safety guardrails on the assistant
+Provides a thin service layer that builds prompts, calls the async Ollama
+wrapper `achat` and enforces medical safety guardrails on the assistant
 output.
 
 This file intentionally keeps responsibilities small and pure: validate the
 user query, call the model (via the retry wrapper), and ensure the model's
-text does not include diagnoses or prescription recommendations.
+text does not include diagnoses or prescription recommendations. Output
+checks go through the shared compiled engine in app.services.guardrails,
+incrementally while streaming.
+
+Document Q&A keeps the session's document in a per-session prompt prefix
+(system prompt + document message) that is byte-identical on every turn, so
+Ollama's prompt cache can reuse its KV state for follow-up questions instead
+of evaluating the document again; the reuse rate is recorded in
+app.services.llm_telemetry.
+
+Environment Variables:
+- CHAT_PREFIX_SESSIONS: Sessions whose document prefix is kept (default: 256)
 """
 
-from typing import Any, Dict, List, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import contextlib
 import logging
+import os
 import re
-import ollama
+import threading
 
-from app.services.ollama_client import chat_with_retries, is_ollama_reachable
+from app.services.guardrails import GuardrailEngine
+from app.services.llm_budget import budget_options, estimate_prompt_tokens
+from app.services.llm_telemetry import get_telemetry
+from app.services.ollama_client import AdmissionRejected, achat, achat_stream, run_sync
+from app.services.ollama_health import get_breaker
 from app.core.config import settings
 
 
@@ -103,52 +121,174 @@ def validate_user_query(query: str) -> Tuple[bool, str]:
     return True, ""
 
 
+# Safe replacement for a response that hit an output guardrail, per category
+GUARDRAIL_RESPONSES: Dict[str, str] = {
+    "diagnosis": (
+        "I can help you understand what these medical findings suggest, "
+        "but I cannot provide a definitive diagnosis. Based on the information, "
+        "I recommend discussing these results with your healthcare provider who can "
+        "properly evaluate your complete medical history and provide an accurate diagnosis. "
+        "Would you like me to explain what these findings typically indicate?"
+    ),
+    "prescription": (
+        "I can explain how certain medications work and their general purposes, "
+        "but I cannot prescribe specific medications or dosages. "
+        "Your doctor will determine the appropriate medication and dosage based on "
+        "your individual health needs. Would you like me to explain what types of "
+        "treatments are commonly used for this condition instead?"
+    ),
+    "mental_health_diagnosis": (
+        "I cannot provide mental health diagnoses or psychiatric evaluations. "
+        "If you're experiencing mental health concerns, please consult "
+        "with a licensed mental health professional or psychiatrist."
+    ),
+    "jokes": "I apologize for the inappropriate response. Let me provide you with factual medical information instead.",
+}
+
+# Output policy: every category blocks, in the priority order of GUARDRAIL_RESPONSES
+CHAT_GUARDRAILS = GuardrailEngine(
+    {category: PROHIBITED_PATTERNS[category] for category in GUARDRAIL_RESPONSES},
+    blocking=GUARDRAIL_RESPONSES,
+)
+
+
 def apply_response_guardrails(response: str) -> str:
     """Filter AI response to enforce medical safety guardrails."""
-    response_lower = (response or "").lower()
+    hit = CHAT_GUARDRAILS.check(response or "")
+    if hit is None:
+        return response
+    logger.warning("Response contained %s language: %r", hit.category, hit.text)
+    return GUARDRAIL_RESPONSES[hit.category]
 
-    for pattern in PROHIBITED_PATTERNS["diagnosis"]:
-        if re.search(pattern, response_lower):
-            logger.warning("Response contained diagnosis language: %s", pattern)
-            return (
-                "I can help you understand what these medical findings suggest, "
-                "but I cannot provide a definitive diagnosis. Based on the information, "
-                "I recommend discussing these results with your healthcare provider who can "
-                "properly evaluate your complete medical history and provide an accurate diagnosis. "
-                "Would you like me to explain what these findings typically indicate?"
-            )
 
-    for pattern in PROHIBITED_PATTERNS["prescription"]:
-        if re.search(pattern, response_lower):
-            logger.warning("Response contained prescription language: %s", pattern)
-            return (
-                "I can explain how certain medications work and their general purposes, "
-                "but I cannot prescribe specific medications or dosages. "
-                "Your doctor will determine the appropriate medication and dosage based on "
-                "your individual health needs. Would you like me to explain what types of "
-                "treatments are commonly used for this condition instead?"
-            )
+SYSTEM_PROMPT = (
+    "You are MedAnalyzer Assistant, a professional medical information assistant specialized in helping patients understand their medical reports and test results."
+)
+CHAT_OPTIONS = {"temperature": 0.7, "top_p": 0.9, "num_predict": 300}
 
-    for pattern in PROHIBITED_PATTERNS["mental_health_diagnosis"]:
-        if re.search(pattern, response_lower):
-            logger.warning("Response contained mental health diagnosis: %s", pattern)
-            return (
-                "I cannot provide mental health diagnoses or psychiatric evaluations. "
-                "If you're experiencing mental health concerns, please consult "
-                "with a licensed mental health professional or psychiatrist."
-            )
 
-    for pattern in PROHIBITED_PATTERNS["jokes"]:
-        if re.search(pattern, response_lower):
-            logger.warning("Response contained humor: %s", pattern)
-            return "I apologize for the inappropriate response. Let me provide you with factual medical information instead."
 
-    return response
+class _DocumentPrefix:
+    __slots__ = ("message", "tokens", "uses", "num_ctx")
+
+    def __init__(self, message: Dict[str, str]):
+        self.message = message
+        self.tokens = estimate_prompt_tokens([{"role": "system", "content": SYSTEM_PROMPT}, message])
+        self.uses = 0
+        self.num_ctx: Optional[int] = None
+        """Context window the session's prompts are pinned to."""
+
 
-async def generate_chat_response_streaming(user_message: str, image_path: str = None):
+# Per-session document prefixes, most recently used last
+_document_prefixes: "OrderedDict[int, _DocumentPrefix]" = OrderedDict()
+_prefix_lock = threading.Lock()
+
+
+def _prefix_sessions() -> int:
+    try:
+        return max(1, int(os.environ.get('CHAT_PREFIX_SESSIONS', 256)))
+    except ValueError:
+        return 256
+
+
+def set_session_document(session_id: int, document_text: str) -> None:
+    """Make `document_text` the document that every later turn of the session is asked about."""
+    message = {"role": "system", "content": f"Medical document shared in this conversation:\n{document_text}"}
+    with _prefix_lock:
+        current = _document_prefixes.get(session_id)
+        # Keep the entry (and its use count) when the text is unchanged
+        if current is None or current.message != message:
+            _document_prefixes[session_id] = _DocumentPrefix(message)
+        _document_prefixes.move_to_end(session_id)
+        while len(_document_prefixes) > _prefix_sessions():
+            _document_prefixes.popitem(last=False)
+
+
+def has_session_document(session_id: int) -> bool:
+    with _prefix_lock:
+        return session_id in _document_prefixes
+
+
+def clear_session_document(session_id: int) -> None:
+    with _prefix_lock:
+        _document_prefixes.pop(session_id, None)
+
+
+def _document_prefix(session_id: Optional[int]) -> Optional[_DocumentPrefix]:
+    if session_id is None:
+        return None
+    with _prefix_lock:
+        prefix = _document_prefixes.get(session_id)
+        if prefix is not None:
+            _document_prefixes.move_to_end(session_id)
+        return prefix
+
+
+def _build_messages(
+    user_message: str,
+    image_path: Optional[str],
+    history: Optional[List[Dict[str, str]]],
+    prefix: Optional[_DocumentPrefix],
+) -> List[Dict[str, Any]]:
+    # Stable parts first (system prompt, document), so the prompt prefix is
+    # byte-identical across turns and Ollama's prompt cache can reuse it
+    messages: List[Dict[str, Any]] = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if prefix is not None:
+        messages.append(prefix.message)
+    messages.extend(history or [])
+    if image_path:
+        messages.append({"role": "user", "content": user_message, "images": [image_path]})
+    else:
+        messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+def _chat_options(messages: List[Dict[str, Any]], prefix: Optional[_DocumentPrefix]) -> Dict[str, Any]:
+    options = dict(CHAT_OPTIONS)
+    # A different num_ctx restarts the model runner and drops the cached
+    # prefix, so a session keeps its window unless the prompt outgrows it
+    if prefix is not None and prefix.num_ctx:
+        if estimate_prompt_tokens(messages) + options["num_predict"] <= prefix.num_ctx:
+            options["num_ctx"] = prefix.num_ctx
+    options = budget_options(messages, options, "chat")
+    if prefix is not None:
+        prefix.num_ctx = max(prefix.num_ctx or 0, options["num_ctx"])
+    return options
+
+
+def _record_prefix_reuse(resp: Any, messages: List[Dict[str, Any]], prefix: Optional[_DocumentPrefix]) -> None:
+    """Record whether the generation reused the cached prefix (the first completed one cannot)."""
+    if prefix is None:
+        return
+    with _prefix_lock:
+        first_use = prefix.uses == 0
+        prefix.uses += 1
+    get_telemetry().record_prefix_reuse(
+        "chat", resp, prompt_tokens=estimate_prompt_tokens(messages), prefix_tokens=prefix.tokens, first_use=first_use
+    )
+
+
+async def generate_chat_response_streaming(
+    user_message: str,
+    image_path: str = None,
+    history: Optional[List[Dict[str, str]]] = None,
+    session_id: Optional[int] = None,
+):
     """Generate a chat response using Ollama streaming API, yielding tokens in real-time.
 
-    Applies guardrails after full response is received.
+    `history` is the earlier conversation placed between the system prompt
+    and the message (see app.services.conversation_memory.load_chat_history);
+    with `session_id`, the session's document (`set_session_document`) is
+    sent as a cached prefix before it.
+
+    Tokens are read from the pooled async client (`achat_stream`), so a slow
+    generation only suspends this coroutine and never stalls the event loop
+    for other websockets, SSE streams or health checks. Backend availability
+    comes from the in-memory circuit breaker, not a per-message probe.
+
+    Guardrails run incrementally on the stream (`CHAT_GUARDRAILS.scanner()`):
+    the last few characters are held back until checked, and a blocking match
+    stops the Ollama generation and yields the safe replacement instead.
     """
     logger.info("Generating streaming chat response for message: %.100s...", user_message)
 
@@ -162,58 +302,58 @@ async def generate_chat_response_streaming(user_message: str, image_path: str =
         yield err
         return
 
-    system_prompt = (
-        "You are MedAnalyzer Assistant, a professional medical information assistant specialized in helping patients understand their medical reports and test results."
-    )
-
-    messages: List[Dict[str, Any]] = [{"role": "system", "content": system_prompt}]
-
-    if image_path:
-        messages.append({"role": "user", "content": user_message, "images": [image_path]})
-    else:
-        messages.append({"role": "user", "content": user_message})
+    prefix = _document_prefix(session_id)
+    messages = _build_messages(user_message, image_path, history, prefix)
 
     try:
-        # Preflight check: ensure model backend is reachable to avoid streaming exceptions
-        if not is_ollama_reachable(timeout=0.8):
+        # Preflight: read the circuit breaker (in-memory, kept current by real
+        # calls and the background health prober) instead of probing per message
+        if not get_breaker().allow_request():
             logger.warning("Ollama not reachable for streaming; returning friendly notice")
             yield "The AI engine is temporarily unavailable for streaming responses. Please try again shortly."
             return
 
         logger.info("Calling Ollama streaming chat...")
-        # Use ollama.chat with stream=True
-        stream = ollama.chat(
+        stream = achat_stream(
             model=settings.MODEL_NAME,
             messages=messages,
-            options={"temperature": 0.7, "top_p": 0.9, "num_predict": 300},
-            stream=True
+            options=_chat_options(messages, prefix),
+            caller="chat",
         )
 
-        full_response = ""
+        scanner = CHAT_GUARDRAILS.scanner()
         chunk_buffer = ""
         chunk_size = 10  # Yield every 10 tokens or at sentence end
-        for chunk in stream:
-            token = chunk['message']['content']
-            full_response += token
-            chunk_buffer += token
-
-            # Yield chunk if buffer reaches size or ends with sentence punctuation
-            if len(chunk_buffer.split()) >= chunk_size or chunk_buffer.strip().endswith(('.', '!', '?')):
-                yield chunk_buffer
-                chunk_buffer = ""
-
-        # Yield any remaining buffer
-        if chunk_buffer:
-            yield chunk_buffer
-
-        # After streaming, apply guardrails to full response
-        validated = apply_response_guardrails(full_response)
-        if validated != full_response:
-            # If guardrails modified the response, yield the difference or handle accordingly
-            yield validated[len(full_response):]
+        # Leaving the block closes the stream, which cancels the Ollama request
+        async with contextlib.aclosing(stream):
+            async for chunk in stream:
+                if chunk.get('done'):
+                    _record_prefix_reuse(chunk, messages, prefix)
+                safe, hit = scanner.feed(chunk['message']['content'])
+                if hit is not None:
+                    logger.warning("Stopping generation: response contained %s language", hit.category)
+                    yield (chunk_buffer + "\n\n" if scanner.text else "") + GUARDRAIL_RESPONSES[hit.category]
+                    return
+                chunk_buffer += safe
+
+                # Yield chunk if buffer reaches size or ends with sentence punctuation
+                if len(chunk_buffer.split()) >= chunk_size or chunk_buffer.strip().endswith(('.', '!', '?')):
+                    yield chunk_buffer
+                    chunk_buffer = ""
+
+        # Release the held-back tail, then check matches longer than the carry window
+        rest, hit = scanner.finish()
+        if hit is not None:
+            logger.warning("Response contained %s language", hit.category)
+            yield ("\n\n" if chunk_buffer else "") + GUARDRAIL_RESPONSES[hit.category]
+            return
+        if chunk_buffer + rest:
+            yield chunk_buffer + rest
 
         logger.info("Streaming chat response completed and validated")
 
+    except AdmissionRejected as e:
+        yield f"The AI engine is busy right now. Please try again in {e.retry_after} seconds."
     except Exception as e:
         logger.exception("Streaming chat response generation failed: %s", e)
         lowered = str(e).lower()
@@ -223,10 +363,16 @@ async def generate_chat_response_streaming(user_message: str, image_path: str =
             yield "I ran into an issue generating the streamed response. Please try again or rephrase your question."
 
 
-def generate_chat_response(user_message: str, image_path: str = None) -> str:
-    """Generate a chat response using Ollama (via chat_with_retries) and apply guardrails.
+async def agenerate_chat_response(
+    user_message: str,
+    image_path: str = None,
+    history: Optional[List[Dict[str, str]]] = None,
+    session_id: Optional[int] = None,
+) -> str:
+    """Generate a chat response using Ollama (via the pooled `achat`) and apply guardrails.
 
-    conversation_history: list of {"role": "user|assistant", "content": str}
+    history: earlier conversation, list of {"role": "system|user|assistant", "content": str}
+    session_id: send the session's document as a cached prefix (see `set_session_document`)
     """
     logger.info("Generating chat response for message: %.100s...", user_message)
 
@@ -237,33 +383,28 @@ def generate_chat_response(user_message: str, image_path: str = None) -> str:
     if not is_valid:
         return err
 
-    system_prompt = (
-        "You are MedAnalyzer Assistant, a professional medical information assistant specialized in helping patients understand their medical reports and test results."
-    )
-
-    messages: List[Dict[str, Any]] = [{"role": "system", "content": system_prompt}]
+    prefix = _document_prefix(session_id)
+    messages = _build_messages(user_message, image_path, history, prefix)
 
-    if image_path:
-        messages.append({"role": "user", "content": user_message, "images": [image_path]})
-    else:
-        messages.append({"role": "user", "content": user_message})
-
-    # Preflight: if the model backend is unreachable, provide a clear user message instead of a generic error
+    # Preflight: if the circuit breaker is open, provide a clear user message instead of a generic error
     try:
-        if not is_ollama_reachable(timeout=0.8):
+        if not get_breaker().allow_request():
             logger.warning("Ollama server not reachable; returning friendly message")
             return (
                 "The AI engine is temporarily unavailable. Please try again soon. "
                 "If this keeps happening, ensure the model server is running."
             )
 
-        logger.info("Calling Ollama via chat_with_retries...")
-        resp = chat_with_retries(
+        logger.info("Calling Ollama via achat...")
+        resp = await achat(
             model=settings.MODEL_NAME,
             messages=messages,
-            options={"temperature": 0.7, "top_p": 0.9, "num_predict": 300},
+            options=_chat_options(messages, prefix),
+            caller="chat",
         )
 
+        _record_prefix_reuse(resp, messages, prefix)
+
         # Expect the client to return a structure with ['message']['content'] like ollama.chat
         raw_response = resp["message"].content
 
@@ -275,9 +416,21 @@ def generate_chat_response(user_message: str, image_path: str = None) -> str:
         logger.info("Chat response validated and ready")
         return validated
 
+    except AdmissionRejected as e:
+        return f"The AI engine is busy right now. Please try again in {e.retry_after} seconds."
     except Exception as e:
         logger.exception("Chat response generation failed")
         lowered = str(e).lower()
         if "failed to connect" in lowered or "connectionerror" in lowered:
             return "I couldn't reach the AI engine. Please retry in a moment."
         return "I ran into an issue processing that. Please try again or rephrase your question."
+
+
+def generate_chat_response(
+    user_message: str,
+    image_path: str = None,
+    history: Optional[List[Dict[str, str]]] = None,
+    session_id: Optional[int] = None,
+) -> str:
+    """Synchronous wrapper around `agenerate_chat_response`."""
+    return run_sync(agenerate_chat_response(user_message, image_path, history, session_id))
@@ -0,0 +1,172 @@
+"""
+Rolling Conversation Memory
+
+Gives free chat the session history without the prompt growing with the
+session length:
+- Each ChatSession keeps a rolling summary of its older messages
+  (`context_summary`) and the id of the last message folded into it
+  (`context_summarized_through`)
+- The prompt history is that summary plus the messages after it, newest
+  first until the token budget is used up (`assemble_context`)
+- After a reply, `refresh_conversation_summary` runs as a background task:
+  once N turns have accumulated beyond the last K messages, they are folded
+  into the summary by one short model call (the previous summary is
+  updated, not rebuilt from the whole session)
+
+So the history holds at most the summary plus K + 2N - 1 messages, and its
+token budget caps even that.
+
+Environment Variables:
+- CHAT_MEMORY_RECENT_MESSAGES: Messages always kept verbatim, K (default: 6)
+- CHAT_MEMORY_SUMMARY_TURNS: Turns folded into the summary per refresh, N (default: 3)
+- CHAT_MEMORY_TOKENS: Token budget for summary + history (default: 1024)
+"""
+
+import logging
+import os
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.db import models
+from app.db.database import SessionLocal
+from app.services import summarizer_service
+from app.services.llm_budget import estimate_prompt_tokens
+from app.services.ollama_admission import priority_scope
+
+logger = logging.getLogger(__name__)
+
+# Sessions whose summary is being refreshed right now (one refresh at a time)
+_refreshing: set = set()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+def recent_messages() -> int:
+    return _env_int('CHAT_MEMORY_RECENT_MESSAGES', 6)
+
+
+def summary_turns() -> int:
+    return max(1, _env_int('CHAT_MEMORY_SUMMARY_TURNS', 3))
+
+
+def context_tokens() -> int:
+    return _env_int('CHAT_MEMORY_TOKENS', 1024)
+
+
+def assemble_context(summary: Optional[str], messages: List[Dict[str, str]],
+                     max_tokens: Optional[int] = None) -> List[Dict[str, str]]:
+    """
+    Build the prompt history from the rolling summary and the newer messages.
+
+    The summary is always included; messages are added newest first while
+    they fit in `max_tokens` (default: CHAT_MEMORY_TOKENS), so the oldest
+    are dropped first.
+
+    Example:
+        >>> assemble_context("Asked about LDL.", [{"role": "user", "content": "And HDL?"}])[0]["role"]
+        'system'
+    """
+    budget = context_tokens() if max_tokens is None else max_tokens
+    history: List[Dict[str, str]] = []
+    if summary:
+        history.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+        budget -= estimate_prompt_tokens(history)
+
+    recent: List[Dict[str, str]] = []
+    for message in reversed(messages):
+        cost = estimate_prompt_tokens([message])
+        if cost > budget:
+            break
+        budget -= cost
+        recent.append(message)
+    return history + recent[::-1]
+
+
+def _unsummarized_messages(db: Session, session: models.ChatSession,
+                           before_id: Optional[int] = None) -> List[models.ChatMessage]:
+    query = db.query(models.ChatMessage).filter(
+        models.ChatMessage.session_id == session.id,
+        models.ChatMessage.content != "",
+        # Replies still streaming or that failed are not part of the conversation
+        (models.ChatMessage.status.is_(None)) | models.ChatMessage.status.notin_(
+            [models.MessageStatus.streaming, models.MessageStatus.failed]
+        ),
+    )
+    if session.context_summarized_through is not None:
+        query = query.filter(models.ChatMessage.id > session.context_summarized_through)
+    if before_id is not None:
+        query = query.filter(models.ChatMessage.id < before_id)
+    return query.order_by(models.ChatMessage.id).all()
+
+
+def load_chat_history(db: Session, session_id: int, before_id: Optional[int] = None) -> List[Dict[str, str]]:
+    """
+    Return the prompt history for a chat session (see `assemble_context`).
+
+    Args:
+        db: Database session
+        session_id: ChatSession id
+        before_id: Only messages older than this one (the message being answered)
+    """
+    session = db.query(models.ChatSession).filter(models.ChatSession.id == session_id).first()
+    if session is None:
+        return []
+    messages = [
+        {"role": m.role, "content": m.content} for m in _unsummarized_messages(db, session, before_id)
+    ]
+    history = assemble_context(session.context_summary, messages)
+    logger.debug("Chat history for session %s: summary=%s, %d/%d messages",
+                 session_id, bool(session.context_summary), len(history) - bool(session.context_summary),
+                 len(messages))
+    return history
+
+
+async def refresh_conversation_summary(session_id: int, session_factory: Callable[[], Session] = SessionLocal) -> bool:
+    """
+    Fold older messages into the session's rolling summary when N turns are due.
+
+    Meant to run as a background task after each reply; it returns quickly
+    (without a model call) when there is nothing to fold yet. The model call
+    runs in the batch admission lane, not in the lane of the chat request
+    that scheduled it.
+
+    Returns:
+        True if the summary was updated
+    """
+    if session_id in _refreshing:
+        return False
+    _refreshing.add(session_id)
+    db = session_factory()
+    try:
+        session = db.query(models.ChatSession).filter(models.ChatSession.id == session_id).first()
+        if session is None:
+            return False
+        pending = _unsummarized_messages(db, session)
+        fold = pending[:max(0, len(pending) - recent_messages())]
+        if len(fold) < 2 * summary_turns():
+            return False
+
+        with priority_scope("batch"):
+            summary = await summarizer_service.asummarize_chat_context(
+                [{"role": m.role, "content": m.content} for m in fold],
+                previous_summary=session.context_summary,
+            )
+        if not summary.strip():
+            return False
+        session.context_summary = summary.strip()
+        session.context_summarized_through = fold[-1].id
+        db.commit()
+        logger.info("Folded %d messages into the context summary of session %s", len(fold), session_id)
+        return True
+    except Exception as e:
+        logger.error(f"Context summary refresh failed for session {session_id}: {e}", exc_info=True)
+        return False
+    finally:
+        db.close()
+        _refreshing.discard(session_id)
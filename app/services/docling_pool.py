@@ -0,0 +1,407 @@
+"""
+Docling Worker Pool
+
+Runs Docling conversions in a pool of pre-initialized worker processes
+instead of one shared `DocumentConverter` in the API process:
+- Each worker builds its own converter once at startup and then serves jobs,
+  so uploads neither pay the initialization nor contend on the GIL or on a
+  converter shared between threads
+- Concurrency is bounded by the number of workers; callers (running in
+  `asyncio.to_thread`) wait for an idle worker
+- The API process only sends a file path and receives the markdown (plus the
+  serialized Docling document for the extraction cache)
+- A job that exceeds its timeout gets its worker killed; a worker that
+  crashes (segfault, OOM kill) fails only its own job. Either way a fresh
+  worker replaces it
+- Workers are recycled after a number of jobs, so memory bloated by a
+  pathological PDF is returned to the OS
+
+Environment Variables:
+- DOCLING_POOL_WORKERS: Worker processes, 0 converts in-process (default: 2)
+- DOCLING_POOL_TIMEOUT: Seconds per conversion before the worker is killed (default: 300)
+- DOCLING_POOL_MAX_JOBS: Jobs per worker before it is recycled (default: 50)
+- DOCLING_POOL_START_TIMEOUT: Seconds a worker may take to initialize (default: 600)
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How often blocked waits re-check whether the pool was shut down
+_POLL_INTERVAL = 0.5
+
+# (markdown, serialized DoclingDocument or None)
+Conversion = Tuple[str, Optional[str]]
+
+
+class ConversionFailed(Exception):
+    """Docling rejected the document (docling's ConversionError, raised in a worker)."""
+
+
+class DoclingPoolError(RuntimeError):
+    """A conversion could not be run to completion by the pool."""
+
+
+class DoclingJobTimeout(DoclingPoolError):
+    """The conversion exceeded its timeout; the worker was killed."""
+
+
+class DoclingWorkerCrashed(DoclingPoolError):
+    """The worker process died during the conversion."""
+
+
+class DoclingJobError(DoclingPoolError):
+    """Docling raised inside a healthy worker (a problem of the document, not of the pool)."""
+
+
+def _docling_initializer() -> Callable[[str], Conversion]:
+    """Build the converter inside a worker; returns the per-job convert function."""
+    from docling.exceptions import ConversionError
+
+    from app.services import parser_service
+
+    converter = parser_service.get_converter()
+
+    def convert(path: str) -> Conversion:
+        try:
+            document = converter.convert(path).document
+        except ConversionError as e:
+            raise ConversionFailed(str(e)) from e
+        return parser_service.export_document(document)
+
+    return convert
+
+
+def _worker_main(conn, initializer: Callable[[], Callable[[str], Conversion]]) -> None:
+    """Worker process loop: initialize, then convert paths until told to stop."""
+    # Ctrl+C reaches the whole process group; the parent decides when we stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        convert = initializer()
+    except Exception as e:
+        conn.send(("failed", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", os.getpid()))
+    while True:
+        try:
+            path = conn.recv()
+        except EOFError:
+            return
+        if path is None:
+            return
+        try:
+            conn.send(("ok", convert(path)))
+        except ConversionFailed as e:
+            conn.send(("conversion_error", str(e)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+@dataclass
+class _Worker:
+    process: Any
+    conn: Any
+    jobs: int = 0
+    ready: bool = False
+
+
+class DoclingPool:
+    """
+    Fixed-size pool of Docling worker processes.
+
+    `convert` is blocking and thread-safe; call it from `asyncio.to_thread`.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        timeout: float = 300.0,
+        max_jobs: int = 50,
+        start_timeout: float = 600.0,
+        initializer: Callable[[], Callable[[str], Conversion]] = _docling_initializer,
+        context: str = "spawn",
+    ):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_jobs = max(1, max_jobs)
+        self.start_timeout = start_timeout
+        self._initializer = initializer
+        self._ctx = multiprocessing.get_context(context)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self._waiting = 0
+        self._counters = {"jobs": 0, "failed": 0, "timeouts": 0, "crashes": 0, "recycled": 0, "spawned": 0}
+        self._job_seconds: deque = deque(maxlen=256)
+
+    # ----- lifecycle -----
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main, args=(child_conn, self._initializer), name="docling-worker", daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self._count("spawned")
+        return _Worker(process=process, conn=parent_conn)
+
+    def start(self) -> None:
+        """Spawn the workers; each starts initializing its converter right away."""
+        with self._lock:
+            if self._started or self._closed:
+                return
+            self._started = True
+        for _ in range(self.workers):
+            self._idle.put(self._spawn())
+        logger.info(f"Docling pool started ({self.workers} workers)")
+
+    def wait_ready(self) -> bool:
+        """Block until every worker has initialized; False if any failed."""
+        self.start()
+        checked, ok = [], True
+        try:
+            for _ in range(self.workers):
+                worker = self._take_idle()
+                try:
+                    self._handshake(worker)
+                except DoclingPoolError as e:
+                    ok = False
+                    if not self._closed:
+                        logger.error(f"Docling worker failed to start: {e}")
+                    worker = self._replace(worker, kill=True)
+                checked.append(worker)
+        except DoclingPoolError:
+            # Shut down while waiting
+            ok = False
+        for worker in checked:
+            if worker is not None:
+                self._release(worker)
+        if ok:
+            logger.info("Docling pool ready")
+        return ok
+
+    def shutdown(self) -> None:
+        """Stop idle workers; busy ones are stopped when their job returns."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._stop(worker, kill=not worker.ready, wait=True)
+        logger.info("Docling pool shut down")
+
+    def _stop(self, worker: _Worker, kill: bool = False, wait: bool = False) -> None:
+        if kill:
+            worker.process.kill()
+        else:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        worker.conn.close()
+        if wait:
+            self._reap(worker)
+        else:
+            threading.Thread(target=self._reap, args=(worker,), name="docling-reaper", daemon=True).start()
+
+    @staticmethod
+    def _reap(worker: _Worker) -> None:
+        worker.process.join(10)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join(1)
+
+    def _replace(self, worker: _Worker, kill: bool = False) -> Optional[_Worker]:
+        """Stop `worker` and spawn its successor (None once the pool is shut down)."""
+        self._stop(worker, kill=kill)
+        if self._closed:
+            return None
+        return self._spawn()
+
+    def _release(self, worker: _Worker) -> None:
+        if self._closed:
+            self._stop(worker)
+        else:
+            self._idle.put(worker)
+
+    # ----- jobs -----
+
+    def _take_idle(self) -> _Worker:
+        """Wait for an idle worker; gives up once the pool is shut down."""
+        while True:
+            if self._closed:
+                raise DoclingPoolError("Docling pool is shut down")
+            try:
+                return self._idle.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+    def _handshake(self, worker: _Worker) -> None:
+        if worker.ready:
+            return
+        deadline = time.monotonic() + self.start_timeout
+        try:
+            while not worker.conn.poll(_POLL_INTERVAL):
+                if self._closed:
+                    raise DoclingPoolError("Docling pool is shut down")
+                if time.monotonic() >= deadline:
+                    raise DoclingPoolError(f"worker did not initialize within {self.start_timeout:.0f}s")
+            status, payload = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            raise DoclingWorkerCrashed(f"worker died during initialization (exit code {worker.process.exitcode})") from e
+        if status != "ready":
+            raise DoclingPoolError(f"worker initialization failed: {payload}")
+        worker.ready = True
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            self._waiting += 1
+        try:
+            worker = self._take_idle()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        try:
+            self._handshake(worker)
+        except DoclingPoolError:
+            successor = self._replace(worker, kill=True)
+            if successor is not None:
+                self._idle.put(successor)
+            raise
+        return worker
+
+    def _run(self, worker: _Worker, path: str, timeout: float) -> Tuple[str, Any]:
+        try:
+            worker.conn.send(path)
+            if not worker.conn.poll(timeout):
+                self._count("timeouts")
+                raise DoclingJobTimeout(f"Docling conversion exceeded {timeout:.0f}s: {path}")
+            return worker.conn.recv()
+        except (EOFError, OSError) as e:
+            worker.process.join(1)
+            self._count("crashes")
+            raise DoclingWorkerCrashed(
+                f"Docling worker {worker.process.pid} died (exit code {worker.process.exitcode}): {path}"
+            ) from e
+
+    def convert(self, path: str, timeout: Optional[float] = None) -> Conversion:
+        """
+        Convert one document in a worker process.
+
+        Args:
+            path: Path of the document (must be readable by the workers)
+            timeout: Seconds before the worker is killed (default: pool timeout)
+
+        Returns:
+            (markdown, serialized DoclingDocument or None)
+
+        Raises:
+            ConversionFailed: Docling rejected the document
+            DoclingJobError: Docling raised another error on the document
+            DoclingJobTimeout / DoclingWorkerCrashed / DoclingPoolError
+        """
+        if self._closed:
+            raise DoclingPoolError("Docling pool is shut down")
+        self.start()
+        worker = self._checkout()
+        started = time.monotonic()
+        try:
+            status, payload = self._run(worker, path, timeout or self.timeout)
+        except DoclingPoolError:
+            self._count("failed")
+            successor = self._replace(worker, kill=True)
+            if successor is not None:
+                self._idle.put(successor)
+            raise
+
+        worker.jobs += 1
+        with self._lock:
+            self._counters["jobs"] += 1
+            self._job_seconds.append(time.monotonic() - started)
+        if worker.jobs >= self.max_jobs:
+            self._count("recycled")
+            successor = self._replace(worker)
+            if successor is not None:
+                self._idle.put(successor)
+        else:
+            self._release(worker)
+
+        if status == "ok":
+            return payload
+        self._count("failed")
+        if status == "conversion_error":
+            raise ConversionFailed(payload)
+        raise DoclingJobError(payload)
+
+    # ----- stats -----
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return worker counts, job outcomes and conversion times."""
+        with self._lock:
+            counters = dict(self._counters)
+            waiting = self._waiting
+            seconds = sorted(self._job_seconds)
+        idle = self._idle.qsize()
+        return {
+            "workers": self.workers,
+            "idle": idle,
+            "busy": max(0, self.workers - idle) if self._started and not self._closed else 0,
+            "waiting": waiting,
+            "timeout": self.timeout,
+            "max_jobs_per_worker": self.max_jobs,
+            **counters,
+            "avg_seconds": round(sum(seconds) / len(seconds), 3) if seconds else None,
+            "p95_seconds": round(seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))], 3) if seconds else None,
+        }
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return cast(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+_pool: Optional[DoclingPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[DoclingPool]:
+    """
+    Return the process-wide Docling pool, built from the environment.
+
+    Returns:
+        The shared DoclingPool (not yet started), or None when
+        DOCLING_POOL_WORKERS is 0 and conversions run in-process
+    """
+    global _pool
+    workers = _env_number("DOCLING_POOL_WORKERS", 2)
+    if workers <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DoclingPool(
+                    workers=workers,
+                    timeout=_env_number("DOCLING_POOL_TIMEOUT", 300.0, float),
+                    max_jobs=_env_number("DOCLING_POOL_MAX_JOBS", 50),
+                    start_timeout=_env_number("DOCLING_POOL_START_TIMEOUT", 600.0, float),
+                )
+    return _pool
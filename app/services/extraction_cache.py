@@ -0,0 +1,238 @@
+"""
+Persistent Document Extraction Cache
+
+Content-addressed cache for `parser_service.extract_data_from_file`. Entries
+are keyed on a SHA-256 of the file bytes plus the parser version and
+extraction options, so a byte-identical upload (again, or shared between the
+chat and report flows) skips the Docling -> sanitize -> OCR chain.
+
+Each entry stores:
+- The exported markdown (what the services consume)
+- The serialized Docling document (zlib-compressed JSON), so other exports
+  can be produced later without reparsing
+- Which tier produced it (docling / sanitized / ocr)
+
+Entries never expire (same bytes + same parser = same output); the SQLite
+file is bounded by size and the least recently used rows are evicted first.
+Hit/miss counters are exposed via `stats()`.
+
+Configuration (see app.core.config.Settings):
+- EXTRACTION_CACHE_ENABLED, EXTRACTION_CACHE_PATH, EXTRACTION_CACHE_MAX_DISK_MB
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_READ_CHUNK = 1024 * 1024
+
+
+def content_digest(data: bytes) -> str:
+    """Hex SHA-256 of file contents already in memory."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """Hex SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_READ_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_key(digest: str, parser_version: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Build the cache key for one file under one parser configuration.
+
+    Args:
+        digest: SHA-256 of the file bytes (`content_digest` / `file_digest`)
+        parser_version: Bumped whenever the extraction pipeline changes its output
+        options: Extraction options that affect the output (OCR DPI, ...)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {"file": digest, "parser": parser_version, "options": options or {}},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedExtraction:
+    """One cached extraction result."""
+
+    markdown: str
+    method: str
+    """Tier that produced the text: 'docling', 'sanitized' or 'ocr'."""
+    document_json: Optional[str] = None
+    """Serialized DoclingDocument (None for OCR results)."""
+
+
+class ExtractionCache:
+    """
+    SQLite-backed, size-bounded cache of document extractions.
+
+    All methods are thread-safe. Disk errors are logged and treated as a
+    miss so the cache can never break an upload.
+    """
+
+    def __init__(self, path: str, max_disk_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._init_disk()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def _init_disk(self) -> None:
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS extractions ("
+                    " key TEXT PRIMARY KEY,"
+                    " markdown TEXT NOT NULL,"
+                    " document BLOB,"
+                    " method TEXT NOT NULL,"
+                    " size INTEGER NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " accessed_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_extractions_accessed ON extractions (accessed_at)")
+        except Exception as e:
+            logger.warning("Extraction cache disabled (%s): %s", self.path, e)
+            self.path = None
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def get(self, key: str) -> Optional[CachedExtraction]:
+        """Return the cached extraction for `key`, or None on miss."""
+        entry = None
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT markdown, document, method FROM extractions WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        conn.execute("UPDATE extractions SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                        markdown, document, method = row
+                        entry = CachedExtraction(
+                            markdown=markdown,
+                            method=method,
+                            document_json=zlib.decompress(document).decode("utf-8") if document else None,
+                        )
+            except Exception as e:
+                logger.warning("Extraction cache read failed: %s", e)
+        self._count("hits" if entry is not None else "misses")
+        return entry
+
+    def set(self, key: str, entry: CachedExtraction) -> None:
+        """Store `entry`, evicting least recently used rows beyond the size budget."""
+        if not self.path:
+            return
+        document = zlib.compress(entry.document_json.encode("utf-8")) if entry.document_json else None
+        size = len(entry.markdown.encode("utf-8")) + len(document or b"")
+        if size > self.max_disk_bytes:
+            return
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO extractions (key, markdown, document, method, size, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, entry.markdown, document, entry.method, size, now, now),
+                )
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+                evicted = 0
+                if total > self.max_disk_bytes:
+                    for old_key, old_size in conn.execute(
+                        "SELECT key, size FROM extractions WHERE key != ? ORDER BY accessed_at ASC", (key,)
+                    ).fetchall():
+                        if total <= self.max_disk_bytes:
+                            break
+                        conn.execute("DELETE FROM extractions WHERE key = ?", (old_key,))
+                        total -= old_size
+                        evicted += 1
+            self._count("stores")
+            self._count("evictions", evicted)
+        except Exception as e:
+            logger.warning("Extraction cache write failed: %s", e)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM extractions")
+            except Exception as e:
+                logger.warning("Extraction cache clear failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the size of the cache file."""
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        entries = disk_bytes = 0
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    entries, disk_bytes = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions"
+                    ).fetchone()
+            except Exception as e:
+                logger.warning("Extraction cache stats failed: %s", e)
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "disk_bytes": disk_bytes,
+            "max_disk_bytes": self.max_disk_bytes,
+        }
+
+
+_cache: Optional[ExtractionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """
+    Lazily build the process-wide extraction cache from settings.
+
+    Returns:
+        The shared ExtractionCache, or None when EXTRACTION_CACHE_ENABLED is False
+    """
+    global _cache
+    from app.core.config import settings
+
+    if not settings.EXTRACTION_CACHE_ENABLED or not settings.EXTRACTION_CACHE_PATH:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExtractionCache(
+                    path=settings.EXTRACTION_CACHE_PATH,
+                    max_disk_bytes=settings.EXTRACTION_CACHE_MAX_DISK_MB * 1024 * 1024,
+                )
+                logger.info("Extraction cache initialized (path=%s)", _cache.path)
+    return _cache
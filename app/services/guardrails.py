@@ -0,0 +1,174 @@
+"""
+Output Guardrail Engine
+
+Shared safety matcher for model output (chat and summarizer):
+- All patterns of a policy are compiled into ONE alternation with a named
+  group per category, so a check is a single regex pass instead of one
+  `re.search` per pattern
+- Matching is case-insensitive by lowercasing the text once and the patterns
+  at compile time, which is several times faster than `re.IGNORECASE`
+- `GuardrailScanner` runs the same matcher incrementally over streamed
+  chunks. It holds back a small carry-over window (the last `carry_chars`
+  characters of the current sentence) so a pattern split across chunks is
+  still seen before its text is released to the client, and rescans only at
+  sentence ends or after `SCAN_CHARS` new characters, so each character is
+  matched a few times at most
+- Categories marked blocking trip the scanner as soon as they match, letting
+  the caller stop the Ollama generation instead of producing the rest
+
+Categories are listed in priority order: when a full-text check finds
+several, the earliest category wins.
+
+Environment Variables:
+- GUARDRAIL_CARRY_CHARS: Characters held back while streaming (default: 64)
+"""
+
+import logging
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# New characters collected before the streamed buffer is scanned again
+SCAN_CHARS = 32
+
+# Completed sentences are released without waiting for the carry window
+_SENTENCE_END = re.compile(r"[.!?\n](?=\s|$)")
+
+
+class GuardrailMatch(NamedTuple):
+    """One guardrail hit."""
+
+    category: str
+    text: str
+    """The matched output text."""
+    blocking: bool
+
+
+def _carry_chars() -> int:
+    try:
+        return max(0, int(os.environ.get('GUARDRAIL_CARRY_CHARS', 64)))
+    except ValueError:
+        return 64
+
+
+def _fold_case(pattern: str) -> str:
+    """Lowercase a regex's literal characters, leaving escapes (\\B, \\S, ...) intact."""
+    folded = []
+    escaped = False
+    for ch in pattern:
+        folded.append(ch if escaped else ch.lower())
+        escaped = not escaped and ch == "\\"
+    return "".join(folded)
+
+
+class GuardrailEngine:
+    """
+    A guardrail policy compiled into a single combined matcher.
+
+    Args:
+        rules: Category -> regex patterns (matched case-insensitively), in priority order
+        blocking: Categories that should stop a streamed generation
+        carry_chars: Streaming carry-over window (default: GUARDRAIL_CARRY_CHARS)
+
+    Example:
+        >>> engine = GuardrailEngine({"jokes": [r"\\bpunchline\\b"]}, blocking=["jokes"])
+        >>> engine.check("And the punchline is...").category
+        'jokes'
+    """
+
+    def __init__(
+        self,
+        rules: Dict[str, Sequence[str]],
+        blocking: Iterable[str] = (),
+        carry_chars: Optional[int] = None,
+    ):
+        self.categories: List[str] = [c for c, patterns in rules.items() if patterns]
+        self.blocking = frozenset(blocking)
+        self.carry_chars = _carry_chars() if carry_chars is None else carry_chars
+        self._priority = {c: i for i, c in enumerate(self.categories)}
+        combined = "|".join(
+            f"(?P<{category}>{'|'.join(f'(?:{_fold_case(p)})' for p in rules[category])})"
+            for category in self.categories
+        )
+        self._pattern = re.compile(combined or r"(?!)")
+
+    def _match(self, m: "re.Match[str]") -> GuardrailMatch:
+        # The outer named group closes last, so lastgroup is the category
+        return GuardrailMatch(m.lastgroup, m.group(0), m.lastgroup in self.blocking)
+
+    def check(self, text: str) -> Optional[GuardrailMatch]:
+        """Return the highest-priority hit in `text`, or None."""
+        best = None
+        for m in self._pattern.finditer((text or "").lower()):
+            hit = self._match(m)
+            if best is None or self._priority[hit.category] < self._priority[best.category]:
+                best = hit
+                if self._priority[hit.category] == 0:
+                    break
+        return best
+
+    def scanner(self) -> "GuardrailScanner":
+        """Start an incremental scan over one streamed response."""
+        return GuardrailScanner(self)
+
+
+class GuardrailScanner:
+    """
+    Incremental guardrail check over a stream of text chunks.
+
+    `feed` returns the text that is safe to release and, once a blocking
+    category matched, that hit (after which nothing more is released). The
+    most recent `carry_chars` characters of an unfinished sentence are held
+    back, so every match shorter than the window is caught before any of it
+    reaches the client; release happens at sentence ends or in batches of at
+    least `SCAN_CHARS` characters.
+    `finish` releases the held-back tail and checks the whole response, which
+    also catches matches longer than the window.
+    """
+
+    def __init__(self, engine: GuardrailEngine):
+        self.engine = engine
+        self.tripped: Optional[GuardrailMatch] = None
+        self._released: List[str] = []
+        self._pending = ""
+
+    def feed(self, chunk: str) -> Tuple[str, Optional[GuardrailMatch]]:
+        if self.tripped is not None:
+            return "", self.tripped
+        self._pending += chunk
+        sentence_end = 0
+        for m in _SENTENCE_END.finditer(self._pending):
+            sentence_end = m.end()
+        release = max(len(self._pending) - self.engine.carry_chars, sentence_end)
+        if release < SCAN_CHARS and not _SENTENCE_END.search(chunk):
+            return "", None
+        lowered = self._pending.lower()
+        for m in self.engine._pattern.finditer(lowered):
+            # A match touching the end of the buffer may still grow (e.g. "have" -> "haven't")
+            if m.end() == len(lowered):
+                continue
+            hit = self.engine._match(m)
+            if hit.blocking:
+                self.tripped = hit
+                logger.warning("Guardrail tripped mid-stream (%s): %r", hit.category, hit.text)
+                return "", hit
+        if release <= 0:
+            return "", None
+        out, self._pending = self._pending[:release], self._pending[release:]
+        self._released.append(out)
+        return out, None
+
+    def finish(self) -> Tuple[str, Optional[GuardrailMatch]]:
+        """Release the held-back tail and return the verdict for the whole response."""
+        if self.tripped is not None:
+            return "", self.tripped
+        rest, self._pending = self._pending, ""
+        self._released.append(rest)
+        return rest, self.engine.check(self.text)
+
+    @property
+    def text(self) -> str:
+        """Everything released so far."""
+        return "".join(self._released)
@@ -0,0 +1,279 @@
+"""
+Structured Lab-Value Extraction
+
+Pulls laboratory results out of parsed documents deterministically, before
+any LLM sees them:
+- Docling markdown tables are read by header (test / result / unit /
+  reference range / flag columns, in any order)
+- Free OCR text is matched line by line ("Hemoglobin 13.8 g/dL 13.0-17.0")
+- Reference ranges are parsed into numeric bounds ("13-17", "< 130", "> 40")
+- Every record is flagged low / high / normal in one vectorized numpy pass,
+  with the percentage deviation from the violated bound
+
+The records are stored on `Report.lab_results` and handed to the summarizer
+prompts precomputed, so the model no longer has to re-extract and re-check
+every value in its output.
+"""
+
+import logging
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Header keywords identifying table columns (matched case-insensitively)
+_COLUMN_KEYWORDS = {
+    "name": ("test", "parameter", "analyte", "investigation", "component", "name", "examination"),
+    "value": ("result", "value", "observed", "reading"),
+    "unit": ("unit",),
+    "range": ("reference", "range", "normal", "interval", "ref"),
+    "flag": ("flag", "status", "remark"),
+}
+
+_NUMBER = r"\d+(?:[.,]\d+)?"
+_RANGE_RE = re.compile(
+    rf"(?P<low>{_NUMBER})\s*(?:-|–|—|to)\s*(?P<high>{_NUMBER})"
+    rf"|(?P<op>[<>≤≥]=?|up to|upto|below|above)\s*(?P<bound>{_NUMBER})",
+    re.IGNORECASE,
+)
+_VALUE_RE = re.compile(rf"^(?P<qualifier>[<>≤≥]=?)?\s*(?P<number>{_NUMBER})\s*(?P<rest>.*)$")
+_FLAG_RE = re.compile(r"^(?:H|L|HH|LL|HIGH|LOW|\*)$", re.IGNORECASE)
+_SEPARATOR_RE = re.compile(r"^\|?\s*:?-{3,}:?\s*(?:\|\s*:?-{3,}:?\s*)*\|?\s*$")
+
+# One result per OCR line: name, value, optional unit and flag, optional reference range
+_LINE_RE = re.compile(
+    r"^\s*[-•*]?\s*(?P<name>[A-Za-z][A-Za-z0-9 ,/()%.'\-]*?[A-Za-z)%])\s*[:=]?\s+"
+    rf"(?P<value>[<>≤≥]?\s*{_NUMBER})\s*"
+    r"(?P<unit>(?:10\^\d+/[A-Za-zµμ]+|[A-Za-zµμ%][\w/^µμ%.*]*))?\s*"
+    r"(?P<flag>\b(?:H|L|HIGH|LOW)\b)?\s*"
+    r"(?:[(\[]?\s*(?:ref(?:erence)?\.?(?:\s*range)?|normal(?:\s*range)?|range)?\s*[:=]?\s*"
+    rf"(?P<range>{_NUMBER}\s*(?:-|–|—|to)\s*{_NUMBER}|(?:[<>≤≥]=?|up to)\s*{_NUMBER})\s*[)\]]?)?\s*"
+    # Many printed reports put the flag after the reference range
+    r"(?P<trailing_flag>\b(?:H|L|HIGH|LOW)\b)?\s*$",
+    re.IGNORECASE,
+)
+# Units that mark a free-text line as a lab result even without a reference range
+_LAB_UNIT_RE = re.compile(
+    r"/|%|^(?:fl|pg|mmhg|meq|iu|u|g|mg|ng|µg|ug|mmol|µmol|umol|mosm|ratio|sec|s)$", re.IGNORECASE
+)
+
+
+@dataclass
+class LabRecord:
+    """One laboratory result as read from the document."""
+
+    name: str
+    value: Optional[float]
+    """Numeric result; None for censored ("< 0.5") or non-numeric results."""
+    value_text: str
+    unit: Optional[str] = None
+    reference_range: Optional[str] = None
+    ref_low: Optional[float] = None
+    ref_high: Optional[float] = None
+    flag: Optional[str] = None
+    """'low', 'high' or 'normal'; None when it cannot be determined."""
+    deviation_pct: Optional[float] = None
+    """Distance from the violated bound in percent of that bound."""
+    source: str = "text"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _to_float(text: str) -> float:
+    return float(text.replace(",", "."))
+
+
+def parse_reference_range(text: Optional[str]) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Parse a reference range into (low, high) bounds.
+
+    Example:
+        >>> parse_reference_range("13.0 - 17.0 g/dL")
+        (13.0, 17.0)
+        >>> parse_reference_range("< 130")
+        (None, 130.0)
+    """
+    match = _RANGE_RE.search(text or "")
+    if not match:
+        return None, None
+    if match.group("low") is not None:
+        return _to_float(match.group("low")), _to_float(match.group("high"))
+    bound = _to_float(match.group("bound"))
+    if match.group("op").lower() in ("<", "<=", "≤", "up to", "upto", "below"):
+        return None, bound
+    return bound, None
+
+
+def _reported_flag(text: Optional[str]) -> Optional[str]:
+    text = (text or "").strip().lower()
+    if text in ("h", "hh", "high", "*"):
+        return "high"
+    if text in ("l", "ll", "low"):
+        return "low"
+    return None
+
+
+def _make_record(name: str, value_text: str, unit: Optional[str], range_text: Optional[str],
+                 flag_text: Optional[str], source: str) -> Optional[LabRecord]:
+    match = _VALUE_RE.match(value_text.strip())
+    if not match or not name.strip():
+        return None
+    rest = match.group("rest").strip()
+    # "13.8 g/dL H" in a single result cell
+    if rest and not flag_text and _FLAG_RE.match(rest.split()[-1]):
+        flag_text = rest.split()[-1]
+        rest = " ".join(rest.split()[:-1])
+    if rest and not unit:
+        unit = rest
+    low, high = parse_reference_range(range_text)
+    return LabRecord(
+        name=" ".join(name.split()).strip(" :-"),
+        value=None if match.group("qualifier") else _to_float(match.group("number")),
+        value_text=" ".join(value_text.split()),
+        unit=(unit.strip() or None) if unit else None,
+        reference_range=" ".join(range_text.split()) if range_text else None,
+        ref_low=low,
+        ref_high=high,
+        flag=_reported_flag(flag_text),
+        source=source,
+    )
+
+
+def _split_row(line: str) -> List[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def _map_columns(header: List[str]) -> Dict[str, int]:
+    columns: Dict[str, int] = {}
+    for index, cell in enumerate(header):
+        label = cell.lower()
+        for field, keywords in _COLUMN_KEYWORDS.items():
+            if field not in columns and any(k in label for k in keywords):
+                columns[field] = index
+                break
+    if "name" not in columns and "value" in columns and columns["value"] != 0:
+        columns["name"] = 0
+    return columns
+
+
+def _extract_tables(lines: List[str]) -> Tuple[List[LabRecord], set]:
+    records: List[LabRecord] = []
+    consumed = set()
+    i = 0
+    while i < len(lines) - 1:
+        if "|" in lines[i] and _SEPARATOR_RE.match(lines[i + 1].strip()):
+            columns = _map_columns(_split_row(lines[i]))
+            start = i
+            i += 2
+            while i < len(lines) and "|" in lines[i]:
+                cells = _split_row(lines[i])
+                if "name" in columns and "value" in columns and len(cells) > max(columns.values()):
+                    name, value, unit, range_text, flag = (
+                        cells[columns[f]] if f in columns else None for f in ("name", "value", "unit", "range", "flag")
+                    )
+                    record = _make_record(name, value, unit, range_text, flag, "table")
+                    if record is not None:
+                        records.append(record)
+                i += 1
+            consumed.update(range(start, i))
+        else:
+            i += 1
+    return records, consumed
+
+
+def _extract_lines(lines: Iterable[str]) -> List[LabRecord]:
+    records = []
+    for line in lines:
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        unit, range_text = match.group("unit"), match.group("range")
+        if not range_text and not (unit and _LAB_UNIT_RE.search(unit)):
+            continue
+        record = _make_record(match.group("name"), match.group("value"), unit, range_text,
+                              match.group("flag") or match.group("trailing_flag"), "text")
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def flag_lab_values(records: List[LabRecord]) -> List[LabRecord]:
+    """
+    Compute `flag` and `deviation_pct` for all records in one vectorized pass.
+
+    A record is flagged against its numeric reference bounds; when it has no
+    usable bounds, a flag printed in the source (H/L) is kept.
+    """
+    if not records:
+        return records
+    values = np.array([np.nan if r.value is None else r.value for r in records], dtype=float)
+    low = np.array([np.nan if r.ref_low is None else r.ref_low for r in records], dtype=float)
+    high = np.array([np.nan if r.ref_high is None else r.ref_high for r in records], dtype=float)
+
+    # NaN compares False, so missing values/bounds never flag
+    below = values < low
+    above = values > high
+    checkable = ~np.isnan(values) & ~(np.isnan(low) & np.isnan(high))
+    flags = np.select([below, above, checkable], ["low", "high", "normal"], default="")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deviation = np.where(below, (low - values) / low, np.where(above, (values - high) / high, 0.0)) * 100
+    deviation = np.where(np.isfinite(deviation), np.round(deviation, 1), np.nan)
+
+    for record, flag, dev, ok in zip(records, flags.tolist(), deviation.tolist(), checkable.tolist()):
+        if ok:
+            record.flag = flag
+            record.deviation_pct = dev if flag != "normal" and dev == dev else None
+    return records
+
+
+def extract_lab_values(text: Optional[str]) -> List[LabRecord]:
+    """
+    Extract and flag the lab results in a parsed document.
+
+    Markdown tables are read first; the remaining lines are matched as free
+    text. Repeated results (same test and value) are reported once.
+
+    Returns:
+        Flagged LabRecords in document order (empty when none are found)
+    """
+    if not text:
+        return []
+    lines = text.splitlines()
+    records, consumed = _extract_tables(lines)
+    records += _extract_lines(line for i, line in enumerate(lines) if i not in consumed)
+
+    unique: List[LabRecord] = []
+    seen = set()
+    for record in records:
+        key = (record.name.lower(), record.value_text)
+        if key not in seen:
+            seen.add(key)
+            unique.append(record)
+    flag_lab_values(unique)
+    logger.debug("Extracted %d lab values (%d flagged abnormal)",
+                 len(unique), sum(r.flag in ("low", "high") for r in unique))
+    return unique
+
+
+def lab_records_from_dicts(rows: Optional[List[Dict[str, Any]]]) -> List[LabRecord]:
+    """Rebuild LabRecords from their stored form (`Report.lab_results`)."""
+    return [LabRecord(**row) for row in rows or []]
+
+
+_FLAG_MARKERS = {"low": "↓ low", "high": "↑ high", "normal": "✓ normal"}
+
+
+def format_lab_table(records: List[LabRecord]) -> str:
+    """Render records as a compact markdown table (abnormal results first)."""
+    ordered = sorted(records, key=lambda r: r.flag not in ("low", "high"))
+    rows = ["| Test | Result | Unit | Reference | Flag |", "|---|---|---|---|---|"]
+    for r in ordered:
+        flag = _FLAG_MARKERS.get(r.flag or "", "?")
+        if r.deviation_pct:
+            flag += f" ({r.deviation_pct:g}%)"
+        rows.append(f"| {r.name} | {r.value_text} | {r.unit or ''} | {r.reference_range or ''} | {flag} |")
+    return "\n".join(rows)
@@ -0,0 +1,157 @@
+"""
+LLM Context and Output Budgeting
+
+Sizes each Ollama request to its input instead of relying on fixed limits:
+- Prompt tokens are estimated from the messages (`estimate_token_count`
+  with a safety margin, a small per-message overhead and a fixed cost per
+  attached image)
+- `num_ctx` is the smallest configured bucket that fits the prompt plus the
+  requested output, so short inputs do not allocate a large KV cache
+- `num_predict` is capped to what still fits in the largest bucket
+- Inputs that do not fit even the largest bucket are logged, since Ollama
+  would otherwise silently drop the start of the prompt
+
+The bucket list is deliberately short: Ollama restarts the model runner
+when `num_ctx` changes, so every distinct value can cost a model reload
+(visible as `model_reloads` in app.services.llm_telemetry).
+
+Environment Variables:
+- OLLAMA_CTX_BUCKETS: Comma-separated num_ctx sizes (default: 2048,4096,8192)
+- OLLAMA_TOKEN_MARGIN: Multiplier applied to the token estimate (default: 1.25)
+"""
+
+import logging
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from app.utils.text_utils import estimate_token_count
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CTX_BUCKETS = (2048, 4096, 8192)
+
+# Chat-template tokens around each message (role markers, turn delimiters)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Gemma 3 / MedGemma encode every image as a fixed block of soft tokens
+IMAGE_TOKENS = 256
+
+# Never cap the output below this; a shorter answer is rarely useful
+MIN_OUTPUT_TOKENS = 64
+
+_lock = threading.Lock()
+_stats: Dict[str, Any] = {"requests": 0, "capped": 0, "overflow": 0, "num_ctx": {}}
+
+
+def ctx_buckets() -> List[int]:
+    """Return the configured num_ctx buckets in ascending order."""
+    raw = os.environ.get('OLLAMA_CTX_BUCKETS', '')
+    try:
+        buckets = sorted({int(b) for b in raw.split(',') if b.strip()})
+    except ValueError:
+        logger.warning("Ignoring invalid OLLAMA_CTX_BUCKETS=%r", raw)
+        buckets = []
+    return buckets or list(DEFAULT_CTX_BUCKETS)
+
+
+def _margin() -> float:
+    try:
+        return float(os.environ.get('OLLAMA_TOKEN_MARGIN', 1.25))
+    except ValueError:
+        return 1.25
+
+
+def _message_field(message: Any, name: str) -> Any:
+    if isinstance(message, dict):
+        return message.get(name)
+    return getattr(message, name, None)
+
+
+def estimate_prompt_tokens(messages: Any) -> int:
+    """Estimate how many context tokens `messages` occupy once templated."""
+    tokens = 0.0
+    for message in messages or []:
+        tokens += estimate_token_count(_message_field(message, 'content') or '') * _margin()
+        tokens += MESSAGE_OVERHEAD_TOKENS
+        tokens += IMAGE_TOKENS * len(_message_field(message, 'images') or [])
+    return int(math.ceil(tokens))
+
+
+def budget_options(messages: Any, options: Optional[Dict[str, Any]], caller: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Return a copy of `options` with `num_ctx` sized to the input and
+    `num_predict` capped to fit.
+
+    An explicit `num_ctx` in `options` is kept as the window; otherwise the
+    smallest bucket holding prompt + requested output is chosen (the largest
+    bucket when none does).
+
+    Args:
+        messages: Chat messages about to be sent
+        options: Generation options; `num_predict` is the requested output budget
+        caller: Tag used in log messages (e.g. 'clinician_report')
+
+    Example:
+        >>> budget_options([{'role': 'user', 'content': 'Hi'}], {'num_predict': 200})
+        {'num_predict': 200, 'num_ctx': 2048}
+    """
+    budgeted = dict(options or {})
+    prompt_tokens = estimate_prompt_tokens(messages)
+    requested = budgeted.get('num_predict')
+    wanted_output = requested if isinstance(requested, int) and requested > 0 else MIN_OUTPUT_TOKENS
+
+    if 'num_ctx' in budgeted:
+        num_ctx = int(budgeted['num_ctx'])
+    else:
+        buckets = ctx_buckets()
+        num_ctx = next((b for b in buckets if b >= prompt_tokens + wanted_output), buckets[-1])
+        budgeted['num_ctx'] = num_ctx
+
+    overflow = prompt_tokens + MIN_OUTPUT_TOKENS > num_ctx
+    capped = False
+    if isinstance(requested, int) and requested > 0:
+        fitted = max(MIN_OUTPUT_TOKENS, num_ctx - prompt_tokens)
+        if fitted < requested:
+            budgeted['num_predict'] = fitted
+            capped = True
+
+    if overflow:
+        logger.warning(
+            "📏 %s prompt (~%d tokens) exceeds the %d-token context window; Ollama will truncate the input",
+            caller or "LLM", prompt_tokens, num_ctx
+        )
+    elif capped:
+        logger.info(
+            "📏 %s output capped to %d tokens (prompt ~%d tokens, num_ctx %d)",
+            caller or "LLM", budgeted['num_predict'], prompt_tokens, num_ctx
+        )
+
+    with _lock:
+        _stats["requests"] += 1
+        _stats["capped"] += int(capped)
+        _stats["overflow"] += int(overflow)
+        _stats["num_ctx"][num_ctx] = _stats["num_ctx"].get(num_ctx, 0) + 1
+    return budgeted
+
+
+def most_used_ctx() -> int:
+    """Return the num_ctx chosen most often so far (the largest bucket before any traffic)."""
+    with _lock:
+        counts = dict(_stats["num_ctx"])
+    if not counts:
+        return ctx_buckets()[-1]
+    return max(counts, key=lambda ctx: (counts[ctx], ctx))
+
+
+def budget_stats() -> Dict[str, Any]:
+    """Return how often each num_ctx was chosen and how many requests were capped or overflowed."""
+    with _lock:
+        return {
+            "buckets": ctx_buckets(),
+            "requests": _stats["requests"],
+            "capped": _stats["capped"],
+            "overflow": _stats["overflow"],
+            "num_ctx": {str(k): v for k, v in sorted(_stats["num_ctx"].items())},
+        }
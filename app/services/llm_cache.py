@@ -0,0 +1,275 @@
+"""
+Deterministic LLM Response Cache
+
+Content-addressed cache for low-temperature summarizer generations. Entries
+are keyed on a SHA-256 of (model, messages, options, version), so re-uploading
+the same report with the same prompt returns the stored output instead of
+paying for another generation.
+
+Tiers:
+1. In-memory LRU (per process, bounded by entry count)
+2. SQLite file on disk (shared across restarts/workers, bounded by size)
+
+Both tiers honour a TTL. Hit/miss counters are exposed via `stats()`.
+
+Configuration (see app.core.config.Settings):
+- LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS,
+  LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_MAX_DISK_MB
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(model: str, messages: Any, options: Optional[Dict[str, Any]], version: str = "") -> str:
+    """
+    Build a stable content-addressed key for a chat request.
+
+    Args:
+        model: Ollama model name
+        messages: Chat messages exactly as sent to the model
+        options: Generation options (temperature, num_predict, ...)
+        version: Extra discriminator, e.g. the guardrail version
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {"model": model, "messages": messages, "options": options or {}, "version": version},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + SQLite) cache of model outputs.
+
+    All methods are thread-safe. Disk errors are logged and treated as a
+    miss so the cache can never break a summarization.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        ttl_seconds: float = 7 * 24 * 3600,
+        memory_entries: int = 256,
+        max_disk_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        if self.path:
+            self._init_disk()
+
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def _init_disk(self) -> None:
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY,"
+                    " value TEXT NOT NULL,"
+                    " size INTEGER NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " accessed_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed ON responses (accessed_at)")
+        except Exception as e:
+            logger.warning("LLM cache disk tier disabled (%s): %s", self.path, e)
+            self.path = None
+
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+
+    def _disk_set(self, key: str, value: str, now: float) -> None:
+        size = len(value.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_disk_bytes:
+                return
+            # Evict least recently used rows until we are back under budget
+            evicted = 0
+            for old_key, old_size in conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+            ).fetchall():
+                if total <= self.max_disk_bytes:
+                    break
+                conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                total -= old_size
+                evicted += 1
+            with self._lock:
+                self._counters["evictions"] += evicted
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for `key`, or None on miss/expiry."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+        value = None
+        if self.path:
+            try:
+                value = self._disk_get(key, now)
+            except Exception as e:
+                logger.warning("LLM cache disk read failed: %s", e)
+
+        with self._lock:
+            if value is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["disk_hits"] += 1
+            self._remember(key, value, now)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store `value` in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self._counters["stores"] += 1
+        if self.path:
+            try:
+                self._disk_set(key, value, now)
+            except Exception as e:
+                logger.warning("LLM cache disk write failed: %s", e)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Async `get`; memory hits return immediately, disk lookups run in a thread."""
+        with self._lock:
+            entry = self._memory.get(key)
+            fresh = entry is not None and time.time() - entry[0] <= self.ttl_seconds
+        if fresh or not self.path:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        """Async `set`; the disk write runs in a thread."""
+        await asyncio.to_thread(self.set, key, value)
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM responses")
+            except Exception as e:
+                logger.warning("LLM cache disk clear failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes."""
+        with self._lock:
+            counters = dict(self._counters)
+            memory_size = len(self._memory)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        disk_entries = disk_bytes = 0
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    disk_entries, disk_bytes = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                    ).fetchone()
+            except Exception as e:
+                logger.warning("LLM cache disk stats failed: %s", e)
+        return {
+            **counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": memory_size,
+            "disk_entries": disk_entries,
+            "disk_bytes": disk_bytes,
+        }
+
+    def _remember(self, key: str, value: str, now: float) -> None:
+        # Caller holds self._lock
+        self._memory[key] = (now, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Lazily build the process-wide response cache from settings.
+
+    Returns:
+        The shared ResponseCache, or None when LLM_CACHE_ENABLED is False
+    """
+    global _cache
+    from app.core.config import settings
+
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    path=settings.LLM_CACHE_PATH or None,
+                    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+                    memory_entries=settings.LLM_CACHE_MEMORY_ENTRIES,
+                    max_disk_bytes=settings.LLM_CACHE_MAX_DISK_MB * 1024 * 1024,
+                )
+                logger.info("LLM response cache initialized (path=%s)", _cache.path)
+    return _cache
@@ -0,0 +1,250 @@
+"""
+Per-Call LLM Telemetry
+
+Ollama reports token counts and server-side timings on every response
+(`prompt_eval_count`, `eval_count`, `load_duration`, `prompt_eval_duration`,
+`eval_duration`, all durations in nanoseconds). This module keeps them,
+aggregated per caller tag, so we can see which prompt types cost the most:
+- Totals: calls, prompt/generated tokens, prompt-eval and generation seconds
+- Histograms: generation tokens/sec, time to first token (TTFT)
+- Model reloads: calls whose `load_duration` shows a cold model load, plus
+  a log of the most recent cold-load events (when, which model/host/caller)
+- Prefix reuse: for prompts that start with a cached per-session prefix
+  (chat document Q&A), how often Ollama's prompt cache skipped evaluating
+  it. Ollama only counts the tokens it actually evaluated in
+  `prompt_eval_count`, so a hit shows up as a count well below the prompt
+
+Caller tags used by the services: text_summary, patient_summary,
+clinician_report, vlm_image, context_summary, chat (anything else is
+accepted as-is; untagged calls are recorded as "other").
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+# A load_duration above this means Ollama actually loaded weights for the
+# call; a warm model still reports a few milliseconds.
+COLD_LOAD_THRESHOLD_S = 0.5
+
+TOKENS_PER_SEC_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+TTFT_MS_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+def _field(resp: Any, name: str) -> Optional[float]:
+    try:
+        value = resp.get(name)
+    except AttributeError:
+        value = getattr(resp, name, None)
+    return value if isinstance(value, (int, float)) else None
+
+
+class Histogram:
+    """Fixed-bucket histogram: a count per upper bound plus an overflow (+Inf) bucket."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{b:g}" for b in self.buckets] + ["le_inf"]
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 2) if self.count else None,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class _CallerStats:
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.eval_tokens = 0
+        self.prompt_eval_seconds = 0.0
+        self.eval_seconds = 0.0
+        self.load_seconds = 0.0
+        self.model_reloads = 0
+        self.tokens_per_sec = Histogram(TOKENS_PER_SEC_BUCKETS)
+        self.ttft_ms = Histogram(TTFT_MS_BUCKETS)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "eval_tokens": self.eval_tokens,
+            "prompt_eval_seconds": round(self.prompt_eval_seconds, 3),
+            "eval_seconds": round(self.eval_seconds, 3),
+            "compute_seconds": round(self.prompt_eval_seconds + self.eval_seconds, 3),
+            "load_seconds": round(self.load_seconds, 3),
+            "model_reloads": self.model_reloads,
+            "tokens_per_sec": self.tokens_per_sec.snapshot(),
+            "ttft_ms": self.ttft_ms.snapshot(),
+        }
+
+
+class _PrefixStats:
+    def __init__(self):
+        self.first_turns = 0
+        self.first_prompt_eval_seconds = 0.0
+        self.follow_ups = 0
+        self.hits = 0
+        self.reused_tokens = 0
+        self.follow_up_prompt_eval_seconds = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        def _avg_ms(seconds: float, count: int) -> Optional[float]:
+            return round(seconds * 1000 / count, 1) if count else None
+
+        return {
+            "first_turns": self.first_turns,
+            "follow_ups": self.follow_ups,
+            "hits": self.hits,
+            "reuse_rate": round(self.hits / self.follow_ups, 3) if self.follow_ups else None,
+            "reused_tokens": self.reused_tokens,
+            "avg_prompt_eval_ms_first": _avg_ms(self.first_prompt_eval_seconds, self.first_turns),
+            "avg_prompt_eval_ms_follow_up": _avg_ms(self.follow_up_prompt_eval_seconds, self.follow_ups),
+        }
+
+
+class LLMTelemetry:
+    """Thread-safe aggregation of per-call Ollama metrics keyed by caller tag."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callers: Dict[str, _CallerStats] = {}
+        self._prefixes: Dict[str, _PrefixStats] = {}
+        self._cold_loads: deque = deque(maxlen=50)
+
+    def record(
+        self,
+        caller: Optional[str],
+        resp: Any,
+        ttft: Optional[float] = None,
+        model: Optional[str] = None,
+        host: Optional[str] = None,
+    ) -> None:
+        """
+        Record one finished generation.
+
+        Args:
+            caller: Tag of the calling feature (e.g. "patient_summary")
+            resp: Final Ollama response (or the final `done` stream chunk)
+            ttft: Client-measured time to first token in seconds; when omitted
+                it is derived from load + prompt-eval durations
+            model, host: Where the call ran (kept with cold-load events)
+        """
+        prompt_tokens = _field(resp, "prompt_eval_count") or 0
+        eval_tokens = _field(resp, "eval_count") or 0
+        load_s = (_field(resp, "load_duration") or 0) / 1e9
+        prompt_s = (_field(resp, "prompt_eval_duration") or 0) / 1e9
+        eval_s = (_field(resp, "eval_duration") or 0) / 1e9
+        if ttft is None and (load_s or prompt_s):
+            ttft = load_s + prompt_s
+
+        with self._lock:
+            stats = self._callers.setdefault(caller or "other", _CallerStats())
+            stats.calls += 1
+            stats.prompt_tokens += int(prompt_tokens)
+            stats.eval_tokens += int(eval_tokens)
+            stats.prompt_eval_seconds += prompt_s
+            stats.eval_seconds += eval_s
+            stats.load_seconds += load_s
+            if load_s >= COLD_LOAD_THRESHOLD_S:
+                stats.model_reloads += 1
+                self._cold_loads.append({
+                    "at": time.time(),
+                    "caller": caller or "other",
+                    "model": model,
+                    "host": host,
+                    "load_ms": round(load_s * 1000, 1),
+                })
+            if eval_tokens and eval_s > 0:
+                stats.tokens_per_sec.observe(eval_tokens / eval_s)
+            if ttft is not None:
+                stats.ttft_ms.observe(ttft * 1000)
+
+    def record_prefix_reuse(
+        self,
+        caller: Optional[str],
+        resp: Any,
+        prompt_tokens: int,
+        prefix_tokens: int,
+        first_use: bool,
+    ) -> None:
+        """
+        Record whether Ollama reused the KV cache of a repeated prompt prefix.
+
+        Args:
+            caller: Tag of the calling feature (e.g. "chat")
+            resp: Final Ollama response (or the final `done` stream chunk)
+            prompt_tokens: Estimated tokens of the whole prompt
+            prefix_tokens: Estimated tokens of the cached prefix
+            first_use: True the first time the prefix is sent (nothing to reuse yet)
+        """
+        evaluated = _field(resp, "prompt_eval_count")
+        if evaluated is None:
+            return
+        prompt_s = (_field(resp, "prompt_eval_duration") or 0) / 1e9
+        # Token estimates are rough, so only most of the prefix skipped counts as a hit
+        reused = min(prefix_tokens, max(0, prompt_tokens - int(evaluated)))
+        with self._lock:
+            stats = self._prefixes.setdefault(caller or "other", _PrefixStats())
+            if first_use:
+                stats.first_turns += 1
+                stats.first_prompt_eval_seconds += prompt_s
+                return
+            stats.follow_ups += 1
+            stats.follow_up_prompt_eval_seconds += prompt_s
+            if reused >= prefix_tokens / 2:
+                stats.hits += 1
+                stats.reused_tokens += reused
+
+    def callers(self) -> List[str]:
+        with self._lock:
+            return sorted(self._callers)
+
+    def cold_loads(self) -> List[Dict[str, Any]]:
+        """Return the most recent cold model loads, oldest first."""
+        with self._lock:
+            return list(self._cold_loads)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return per-caller totals and histograms, most expensive caller first."""
+        with self._lock:
+            per_caller = {name: stats.snapshot() for name, stats in self._callers.items()}
+            prefixes = {name: stats.snapshot() for name, stats in self._prefixes.items()}
+            cold_loads = list(self._cold_loads)
+        ranked = sorted(per_caller.items(), key=lambda kv: kv[1]["compute_seconds"], reverse=True)
+        return {
+            "callers": dict(ranked),
+            "totals": {
+                "calls": sum(s["calls"] for s in per_caller.values()),
+                "compute_seconds": round(sum(s["compute_seconds"] for s in per_caller.values()), 3),
+                "model_reloads": sum(s["model_reloads"] for s in per_caller.values()),
+            },
+            "prefix_reuse": prefixes,
+            "recent_cold_loads": cold_loads,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._callers.clear()
+            self._prefixes.clear()
+            self._cold_loads.clear()
+
+
+_telemetry = LLMTelemetry()
+
+
+def get_telemetry() -> LLMTelemetry:
+    """Return the process-wide telemetry aggregator."""
+    return _telemetry
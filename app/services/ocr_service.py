@@ -0,0 +1,205 @@
+"""
+Page-Streaming OCR
+
+OCR fallback for scanned PDFs (see parser_service.ocr_pdf). Instead of
+rasterizing the whole document up front and reading the pages one after
+another, every page is a separate job:
+- A job rasterizes only its own page (pdf2image `first_page`/`last_page`)
+  and runs Tesseract on it, so a worker holds one page image at a time and
+  peak memory is bounded by the worker count, not the page count
+- Jobs run in parallel across a process pool; only the recognized text
+  comes back to the API process (single-page documents are read in-process)
+- Results come back in page order with per-page timings; a page that fails
+  yields empty text and its error instead of failing the document, and is
+  listed in `OcrResult.failed_pages`
+
+Tesseract parallelizes internally with OpenMP; workers pin it to one thread
+(OMP_THREAD_LIMIT=1) so the pool does not oversubscribe the CPU.
+
+Environment Variables:
+- OCR_WORKERS: Worker processes, 0 runs pages sequentially in-process (default: min(4, CPUs))
+- OCR_PAGE_TIMEOUT: Seconds allowed per page for rasterizing and for Tesseract (default: 120)
+
+Dependencies:
+    - pdf2image (poppler): For rasterizing single PDF pages
+    - pytesseract (Tesseract): For OCR text extraction
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from pdf2image import convert_from_path, pdfinfo_from_path
+import pytesseract
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OcrPage:
+    """Text of one page and how long it took."""
+
+    page: int
+    """1-based page number."""
+    text: str
+    rasterize_seconds: float = 0.0
+    ocr_seconds: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class OcrResult:
+    """Page-ordered OCR output of a document."""
+
+    pages: List[OcrPage] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def text(self) -> str:
+        return "\n".join(page.text for page in self.pages)
+
+    @property
+    def failed_pages(self) -> List[int]:
+        """Numbers of the pages that could not be read (their text is missing)."""
+        return [page.page for page in self.pages if page.error]
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return cast(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def max_workers() -> int:
+    return max(0, _env_number("OCR_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def page_timeout() -> float:
+    return _env_number("OCR_PAGE_TIMEOUT", 120.0, float)
+
+
+def page_count(path: str) -> int:
+    """Number of pages of a PDF (poppler's pdfinfo)."""
+    return int(pdfinfo_from_path(path)["Pages"])
+
+
+def ocr_page(path: str, page: int, dpi: int = 200, timeout: Optional[float] = None) -> OcrPage:
+    """
+    Rasterize and OCR a single page.
+
+    Runs inside a pool worker; only this page's image is ever in memory.
+    """
+    started = time.monotonic()
+    try:
+        images = convert_from_path(path, dpi=dpi, first_page=page, last_page=page, timeout=timeout)
+        rasterized = time.monotonic()
+        text = "\n".join(pytesseract.image_to_string(image, timeout=timeout or 0) for image in images)
+        for image in images:
+            image.close()
+        return OcrPage(
+            page=page,
+            text=text,
+            rasterize_seconds=round(rasterized - started, 3),
+            ocr_seconds=round(time.monotonic() - rasterized, 3),
+        )
+    except Exception as e:
+        return OcrPage(page=page, text="", ocr_seconds=round(time.monotonic() - started, 3),
+                       error=f"{type(e).__name__}: {e}")
+
+
+def _init_worker() -> None:
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    """Return the shared OCR process pool, rebuilt when the worker count changes."""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            _executor_workers = workers
+            logger.info(f"OCR pool started ({workers} workers)")
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown() -> None:
+    """Stop the OCR worker processes (they are started again on next use)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def ocr_pdf_pages(
+    path: str,
+    dpi: int = 200,
+    workers: Optional[int] = None,
+    page_fn: Callable[..., OcrPage] = ocr_page,
+) -> OcrResult:
+    """
+    OCR every page of a PDF, in parallel across the OCR process pool.
+
+    Args:
+        path: Path of the PDF
+        dpi: Rasterization resolution
+        workers: Worker processes (default: OCR_WORKERS); 0 runs in-process
+        page_fn: Per-page job, a picklable module-level function
+
+    Returns:
+        OcrResult with one OcrPage per page, in page order
+
+    Raises:
+        Errors from reading the page count, or BrokenProcessPool when a
+        worker process died (the pool is rebuilt on the next call)
+    """
+    started = time.monotonic()
+    pages = page_count(path)
+    workers = max_workers() if workers is None else workers
+    timeout = page_timeout()
+
+    if workers <= 0 or pages <= 1:
+        results = [page_fn(path, page, dpi, timeout) for page in range(1, pages + 1)]
+    else:
+        executor = _get_executor(workers)
+        try:
+            futures = [executor.submit(page_fn, path, page, dpi, timeout) for page in range(1, pages + 1)]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            _discard_executor(executor)
+            raise
+
+    result = OcrResult(pages=results, seconds=round(time.monotonic() - started, 3))
+    failed = result.failed_pages
+    slowest = max((page.rasterize_seconds + page.ocr_seconds for page in results), default=0.0)
+    logger.info(
+        f"OCR of {pages} pages took {result.seconds}s (workers={workers}, slowest page {slowest:.2f}s)"
+        + (f"; failed pages: {failed}" if failed else "")
+    )
+    return result
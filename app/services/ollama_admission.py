@@ -0,0 +1,287 @@
+"""
+Priority Admission Control for Ollama Requests
+
+Bounds how many generations run against Ollama at once and decides who goes
+next when the inference boxes are saturated:
+- Priority lanes: interactive (chat) > report (uploads) > batch (bulk work)
+- Per-class concurrency limits under a global ceiling, so a batch of uploads
+  can never take every slot away from chat
+- Bounded per-class queues; once a queue is full new requests are rejected
+  immediately with `AdmissionRejected` (served as HTTP 503 + Retry-After)
+- Queue-wait metrics per class
+
+The lane of a request is taken from a context variable set by the endpoint
+(`set_request_priority`) or a `priority_scope`, so service code does not need
+to thread it through every call.
+
+Environment Variables:
+- OLLAMA_MAX_CONCURRENCY: Total concurrent generations (default: 4 per backend)
+- OLLAMA_LIMIT_INTERACTIVE / OLLAMA_LIMIT_REPORT / OLLAMA_LIMIT_BATCH:
+  Per-class concurrency limits (default: 100% / 50% / 25% of the total)
+- OLLAMA_QUEUE_INTERACTIVE / OLLAMA_QUEUE_REPORT / OLLAMA_QUEUE_BATCH:
+  Per-class queue depth (default: 64 / 64 / 256)
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Highest priority first
+PRIORITIES = ("interactive", "report", "batch")
+
+LLM_PRIORITY = contextvars.ContextVar("llm_priority", default="report")
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request's priority queue is full (load shedding)."""
+
+    def __init__(self, priority: str, retry_after: int):
+        super().__init__(
+            f"The AI engine is busy ({priority} queue full). Please retry in {retry_after}s."
+        )
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+def set_request_priority(priority: str) -> None:
+    """Set the admission lane for the current request/task context."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {priority}")
+    LLM_PRIORITY.set(priority)
+
+
+@contextlib.contextmanager
+def priority_scope(priority: str) -> Iterator[None]:
+    """Run a block (and the tasks it spawns) in the given admission lane."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {priority}")
+    token = LLM_PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        LLM_PRIORITY.reset(token)
+
+
+def current_priority() -> str:
+    return LLM_PRIORITY.get()
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "enqueued_at", "granted")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """
+    Slot allocator with strict priority between lanes and FIFO within a lane.
+
+    State is guarded by a threading lock and waiters are woken through their
+    own event loop, so one controller can serve every loop in the process.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        class_limits: Optional[Dict[str, int]] = None,
+        queue_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.class_limits = {p: self.max_concurrency for p in PRIORITIES}
+        self.class_limits.update(class_limits or {})
+        self.queue_limits = {"interactive": 64, "report": 64, "batch": 256}
+        self.queue_limits.update(queue_limits or {})
+
+        self._lock = threading.Lock()
+        self._active = {p: 0 for p in PRIORITIES}
+        self._queues: Dict[str, Deque[_Waiter]] = {p: deque() for p in PRIORITIES}
+        self._admitted = {p: 0 for p in PRIORITIES}
+        self._rejected = {p: 0 for p in PRIORITIES}
+        self._waits: Dict[str, Deque[float]] = {p: deque(maxlen=512) for p in PRIORITIES}
+        self._max_wait = {p: 0.0 for p in PRIORITIES}
+        self._service_ewma: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # Slot accounting (caller holds self._lock)
+    # ------------------------------------------------------------------
+
+    def _can_run(self, priority: str) -> bool:
+        return (
+            sum(self._active.values()) < self.max_concurrency and
+            self._active[priority] < self.class_limits[priority]
+        )
+
+    def _record_admit(self, priority: str, waited: float) -> None:
+        self._active[priority] += 1
+        self._admitted[priority] += 1
+        self._waits[priority].append(waited)
+        self._max_wait[priority] = max(self._max_wait[priority], waited)
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and self._can_run(priority):
+                waiter = queue.popleft()
+                waiter.granted = True
+                self._record_admit(priority, now - waiter.enqueued_at)
+                try:
+                    waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+                except RuntimeError:
+                    # Waiter's loop is gone; hand the slot back
+                    waiter.granted = False
+                    self._active[priority] -= 1
+
+    def _retry_after(self, priority: str) -> int:
+        service = self._service_ewma or 10.0
+        backlog = len(self._queues[priority]) + 1
+        return int(min(120, max(1, math.ceil(backlog * service / max(1, self.class_limits[priority])))))
+
+    def _reject(self, priority: str) -> AdmissionRejected:
+        self._rejected[priority] += 1
+        retry_after = self._retry_after(priority)
+        logger.warning("🚦 Shedding %s LLM request: queue full (retry after %ss)", priority, retry_after)
+        return AdmissionRejected(priority, retry_after)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def precheck(self, priority: str) -> None:
+        """
+        Fail fast if a new `priority` request would be rejected right now.
+
+        Endpoints call this before doing any work so an overloaded server
+        answers 503 in microseconds instead of after parsing an upload.
+        """
+        with self._lock:
+            if not self._can_run(priority) and len(self._queues[priority]) >= self.queue_limits[priority]:
+                raise self._reject(priority)
+
+    async def acquire(self, priority: str) -> None:
+        """Wait for a slot in `priority`'s lane (raises AdmissionRejected if the queue is full)."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._can_run(priority) and not self._queues[priority]:
+                self._record_admit(priority, 0.0)
+                return
+            if len(self._queues[priority]) >= self.queue_limits[priority]:
+                raise self._reject(priority)
+            waiter = _Waiter(loop)
+            self._queues[priority].append(waiter)
+
+        try:
+            await waiter.future
+        except BaseException:
+            with self._lock:
+                if waiter.granted:
+                    self._active[priority] -= 1
+                    self._dispatch()
+                else:
+                    try:
+                        self._queues[priority].remove(waiter)
+                    except ValueError:
+                        pass
+            raise
+
+    def release(self, priority: str, service_time: Optional[float] = None) -> None:
+        """Return a slot and hand it to the highest-priority waiter."""
+        with self._lock:
+            self._active[priority] = max(0, self._active[priority] - 1)
+            if service_time is not None:
+                self._service_ewma = (
+                    service_time if self._service_ewma is None
+                    else 0.8 * self._service_ewma + 0.2 * service_time
+                )
+            self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Optional[str] = None):
+        """Async context manager holding one admission slot for the block."""
+        priority = priority or current_priority()
+        await self.acquire(priority)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(priority, time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-lane activity, queue depth, admission counts and queue-wait metrics."""
+        with self._lock:
+            lanes = {}
+            for p in PRIORITIES:
+                waits = sorted(self._waits[p])
+                lanes[p] = {
+                    "active": self._active[p],
+                    "queued": len(self._queues[p]),
+                    "limit": self.class_limits[p],
+                    "queue_limit": self.queue_limits[p],
+                    "admitted": self._admitted[p],
+                    "rejected": self._rejected[p],
+                    "wait_avg_ms": round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+                    "wait_p95_ms": round(1000 * waits[min(len(waits) - 1, int(0.95 * len(waits)))], 1) if waits else 0.0,
+                    "wait_max_ms": round(1000 * self._max_wait[p], 1),
+                }
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": sum(self._active.values()),
+                "service_ewma_ms": round(self._service_ewma * 1000, 1) if self._service_ewma else None,
+                "lanes": lanes,
+            }
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r (expected an integer)", name, os.environ.get(name))
+        return default
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission() -> AdmissionController:
+    """Lazily build the process-wide admission controller from the environment."""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                from app.services.ollama_router import get_router
+
+                total = _env_int('OLLAMA_MAX_CONCURRENCY', 4 * len(get_router().hosts()))
+                _controller = AdmissionController(
+                    total,
+                    class_limits={
+                        "interactive": _env_int('OLLAMA_LIMIT_INTERACTIVE', total),
+                        "report": _env_int('OLLAMA_LIMIT_REPORT', max(1, total // 2)),
+                        "batch": _env_int('OLLAMA_LIMIT_BATCH', max(1, total // 4)),
+                    },
+                    queue_limits={
+                        "interactive": _env_int('OLLAMA_QUEUE_INTERACTIVE', 64),
+                        "report": _env_int('OLLAMA_QUEUE_REPORT', 64),
+                        "batch": _env_int('OLLAMA_QUEUE_BATCH', 256),
+                    },
+                )
+                logger.info("Ollama admission control: %s", _controller.stats())
+    return _controller
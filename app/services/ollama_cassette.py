@@ -0,0 +1,245 @@
+"""
+Ollama Record/Replay Cassettes
+
+Captures real Ollama traffic once and serves it back later, so the full chat
+and report pipeline can be performance-tested offline with production-like
+outputs and timings:
+- record: every chat request/response pair (including the arrival time of
+  each streamed chunk) is appended to a cassette file
+- replay: requests are answered from the cassette with the original timing,
+  or scaled by OLLAMA_CASSETTE_SPEED (2 = twice as fast, 0 = instant)
+
+Cassettes are JSON Lines (gzip-compressed when the path ends in `.gz`), one
+exchange per line. Requests are matched on (model, messages, options,
+stream); image attachments are matched by file content, not path, so
+uploads stored under random names still replay. Repeated identical requests
+are replayed in recorded order, cycling when exhausted.
+
+The cassette wraps the clients returned by `ollama_client`, underneath
+routing, admission control and telemetry, so those layers behave exactly as
+with a live server.
+
+Environment Variables:
+- OLLAMA_CASSETTE_MODE: off | record | replay (default: off)
+- OLLAMA_CASSETTE_PATH: Cassette file (default: ./cache/ollama_cassette.jsonl.gz)
+- OLLAMA_CASSETTE_SPEED: Replay timing multiplier (default: 1.0)
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+import ollama
+
+from app.services.llm_cache import make_key
+
+logger = logging.getLogger(__name__)
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def _to_dict(resp: Any) -> Dict[str, Any]:
+    if hasattr(resp, "model_dump"):
+        return resp.model_dump(exclude_none=True)
+    return dict(resp)
+
+
+def _image_digest(image: Any) -> str:
+    if isinstance(image, str) and os.path.isfile(image):
+        with open(image, "rb") as f:
+            return "sha256:" + hashlib.sha256(f.read()).hexdigest()
+    return "sha256:" + hashlib.sha256(str(image).encode("utf-8")).hexdigest()
+
+
+def _normalize_messages(messages: Any) -> List[Dict[str, Any]]:
+    normalized = []
+    for message in messages or []:
+        m = _to_dict(message)
+        if m.get("images"):
+            m["images"] = [_image_digest(i) for i in m["images"]]
+        normalized.append(m)
+    return normalized
+
+
+class Cassette:
+    """A set of recorded exchanges backed by one JSON Lines file."""
+
+    def __init__(self, path: str, mode: str, speed: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._exchanges: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self.counters = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "replay":
+            self._load()
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Ollama cassette not found: {self.path}")
+        with self._open("r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._exchanges[entry["key"]].append(entry)
+        logger.info("📼 Loaded %d recorded Ollama exchanges from %s",
+                    sum(len(v) for v in self._exchanges.values()), self.path)
+
+    @staticmethod
+    def key(model: str, messages: Any, options: Any, stream: bool) -> str:
+        return make_key(model, _normalize_messages(messages), _to_dict(options or {}), f"stream={stream}")
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False, default=str)
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._open("a") as f:
+                f.write(line + "\n")
+            self.counters["recorded"] += 1
+
+    def next(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            queue = self._exchanges.get(key)
+            if not queue:
+                self.counters["misses"] += 1
+                raise CassetteMiss(f"No recorded Ollama exchange for request {key[:12]}")
+            entry = queue.popleft()
+            queue.append(entry)
+            self.counters["replayed"] += 1
+            return entry
+
+    async def _pause(self, seconds: float) -> None:
+        if self.speed > 0 and seconds > 0:
+            await asyncio.sleep(seconds / self.speed)
+
+    def wrap_async(self, client: Any) -> "CassetteAsyncClient":
+        return CassetteAsyncClient(self, client)
+
+    def wrap_sync(self, client: Any) -> "CassetteSyncClient":
+        return CassetteSyncClient(self, client)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "path": self.path, "speed": self.speed, **self.counters}
+
+
+class CassetteAsyncClient:
+    """Stand-in for `ollama.AsyncClient` that records to / replays from a cassette."""
+
+    def __init__(self, cassette: Cassette, inner: Any):
+        self.cassette = cassette
+        self.inner = inner
+
+    async def chat(self, model: str = '', messages: Any = None, *, options: Any = None, stream: bool = False, **kwargs):
+        key = Cassette.key(model, messages, options, stream)
+        if self.cassette.mode == "replay":
+            entry = self.cassette.next(key)
+            if stream:
+                return self._replay_stream(entry)
+            await self.cassette._pause(entry["latency"])
+            return ollama.ChatResponse.model_validate(entry["response"])
+
+        started = time.monotonic()
+        result = await self.inner.chat(model=model, messages=messages, options=options, stream=stream, **kwargs)
+        if stream:
+            return self._record_stream(key, model, result, started)
+        self.cassette.record({
+            "key": key, "model": model, "stream": False,
+            "latency": round(time.monotonic() - started, 4), "response": _to_dict(result),
+        })
+        return result
+
+    async def _record_stream(self, key: str, model: str, stream: AsyncIterator[Any], started: float):
+        chunks = []
+        last = started
+        async for chunk in stream:
+            now = time.monotonic()
+            chunks.append([round(now - last, 4), _to_dict(chunk)])
+            last = now
+            yield chunk
+        self.cassette.record({
+            "key": key, "model": model, "stream": True,
+            "latency": round(last - started, 4), "chunks": chunks,
+        })
+
+    async def _replay_stream(self, entry: Dict[str, Any]):
+        for gap, chunk in entry["chunks"]:
+            await self.cassette._pause(gap)
+            yield ollama.ChatResponse.model_validate(chunk)
+
+    def __getattr__(self, name: str) -> Any:
+        # list(), pull(), close() ... go to the real client
+        return getattr(self.inner, name)
+
+
+class CassetteSyncClient:
+    """Stand-in for `ollama.Client` (non-streaming chat only, as used by `chat_with_retries`)."""
+
+    def __init__(self, cassette: Cassette, inner: Any):
+        self.cassette = cassette
+        self.inner = inner
+
+    def chat(self, model: str = '', messages: Any = None, *, options: Any = None, **kwargs):
+        key = Cassette.key(model, messages, options, False)
+        if self.cassette.mode == "replay":
+            entry = self.cassette.next(key)
+            if self.cassette.speed > 0:
+                time.sleep(entry["latency"] / self.cassette.speed)
+            return ollama.ChatResponse.model_validate(entry["response"])
+
+        started = time.monotonic()
+        result = self.inner.chat(model=model, messages=messages, options=options, **kwargs)
+        self.cassette.record({
+            "key": key, "model": model, "stream": False,
+            "latency": round(time.monotonic() - started, 4), "response": _to_dict(result),
+        })
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+
+_cassette: Optional[Cassette] = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """
+    Lazily build the process-wide cassette from the environment.
+
+    Returns:
+        The active Cassette, or None when OLLAMA_CASSETTE_MODE is off
+    """
+    global _cassette, _cassette_loaded
+    if not _cassette_loaded:
+        with _cassette_lock:
+            if not _cassette_loaded:
+                mode = os.environ.get('OLLAMA_CASSETTE_MODE', 'off').strip().lower()
+                if mode not in ('', 'off'):
+                    _cassette = Cassette(
+                        os.environ.get('OLLAMA_CASSETTE_PATH', './cache/ollama_cassette.jsonl.gz'),
+                        mode,
+                        speed=float(os.environ.get('OLLAMA_CASSETTE_SPEED', 1.0)),
+                    )
+                    logger.warning("📼 Ollama cassette %s mode: %s", mode, _cassette.path)
+                _cassette_loaded = True
+    return _cassette
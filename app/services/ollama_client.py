@@ -2,23 +2,68 @@
 Ollama Client Wrapper with Retry Logic
 
 This module provides a resilient interface to the Ollama LLM server with:
-- Automatic retry on connection failures
-- Exponential backoff
+- Automatic retry on backend failures (connection errors, timeouts, 5xx)
+- Decorrelated-jitter backoff, so retries from many callers spread out
+- Per-call deadlines bounding the total time spent across attempts
+- Optional hedging of non-streaming async calls when several backends are
+  configured: a call slower than its caller's recent p95 is duplicated on a
+  second backend and the slower of the two is cancelled
 - Health check functionality
+- Native asyncio client (`achat` / `achat_stream`) backed by a shared
+  keep-alive HTTP connection pool, so in-flight LLM calls do not occupy
+  worker threads
+- Single-flight coalescing: identical concurrent requests share one
+  generation (and its streamed tokens)
+- Multi-backend routing via `app.services.ollama_router` (OLLAMA_HOSTS)
+- Priority admission control and load shedding for async calls via
+  `app.services.ollama_admission` (interactive > report > batch)
+- Every call outcome feeds the circuit breaker in `app.services.ollama_health`
+- Token counts and timings of every call are recorded per caller tag in
+  `app.services.llm_telemetry`
+- Optional record/replay of all traffic via `app.services.ollama_cassette`
+  (OLLAMA_CASSETTE_MODE)
 
 Environment Variables:
 - OLLAMA_HOST: Ollama server URL (default: http://localhost:11434)
 - OLLAMA_URL: Alternative to OLLAMA_HOST
+- OLLAMA_HOSTS: Comma-separated list of backends to balance across
+  (see app.services.ollama_router)
+- OLLAMA_MAX_CONNECTIONS: Size of the pooled HTTP connection pool (default: 200)
+- OLLAMA_KEEPALIVE_CONNECTIONS: Idle keep-alive connections retained (default: 50)
+- OLLAMA_TIMEOUT: Read timeout in seconds for a single request (default: 600)
+- OLLAMA_KEEP_ALIVE: keep_alive sent with every request so the model stays
+  resident between calls (default: 30m; see app.services.ollama_warmer).
+  The router assumes a model stays loaded this long after its last use
+- OLLAMA_DEADLINE: Default per-call deadline in seconds across all attempts;
+  for streams it bounds the wait for the first chunk, 0 disables (default: 600)
+- OLLAMA_BACKOFF_CAP: Upper bound of a single retry delay in seconds (default: 10)
+- OLLAMA_HEDGE: Hedge non-streaming async calls across backends, 0/1 (default: 0)
+- OLLAMA_HEDGE_MIN_DELAY: Lower bound of the hedge delay in seconds (default: 0.5)
 """
 
+import asyncio
+import contextlib
 import time
 import logging
 import os
-from typing import Any, Dict
+import random
+import re
+import threading
+import weakref
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
+import httpx
 import ollama
 from requests import exceptions as req_exceptions
 
+from app.services.llm_cache import make_key
+from app.services.ollama_admission import AdmissionRejected, get_admission
+from app.services.ollama_health import get_breaker
+from app.services.llm_telemetry import get_telemetry
+from app.services.ollama_cassette import get_cassette
+from app.services.ollama_router import get_router
+
 logger = logging.getLogger(__name__)
 
 
@@ -40,6 +85,267 @@ def _get_ollama_base_url() -> str:
     )
 
 
+def _env_number(name: str, default: float) -> float:
+    """Read a numeric tuning knob from the environment, ignoring bad values."""
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r (expected a number)", name, raw)
+        return default
+
+
+def keep_alive() -> Any:
+    """Return the keep_alive value sent with every request (duration string or seconds)."""
+    raw = os.environ.get('OLLAMA_KEEP_ALIVE', '30m').strip()
+    try:
+        return int(raw)
+    except ValueError:
+        return raw
+
+
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def keep_alive_seconds() -> float:
+    """
+    Return `keep_alive()` in seconds, as Ollama interprets it.
+
+    Accepts plain seconds and Go duration strings ("30m", "1h30m", "90s");
+    a negative value keeps the model loaded forever (inf). An unparsable
+    value falls back to Ollama's own default of 5 minutes.
+    """
+    value = keep_alive()
+    if isinstance(value, int):
+        seconds = float(value)
+    else:
+        parts = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value.lstrip("+-"))
+        if not parts or "".join(n + u for n, u in parts) != value.lstrip("+-"):
+            logger.warning("Cannot parse OLLAMA_KEEP_ALIVE=%r; assuming 5m", value)
+            return 300.0
+        seconds = sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+        if value.startswith("-"):
+            seconds = -seconds
+    return float("inf") if seconds < 0 else seconds
+
+
+def _resolve_deadline(deadline: Optional[float]) -> Optional[float]:
+    """Return the per-call deadline in seconds (None = unbounded); None means OLLAMA_DEADLINE."""
+    if deadline is None:
+        deadline = _env_number('OLLAMA_DEADLINE', 600.0)
+    return deadline if deadline > 0 else None
+
+
+def _is_connection_error(e: Exception) -> bool:
+    """Return True if the exception means the server could not be reached."""
+    msg = str(e).lower()
+    return (
+        'failed to connect' in msg or
+        'connectionerror' in msg or
+        isinstance(e, (ConnectionError, httpx.ConnectError, req_exceptions.ConnectionError))
+    )
+
+
+def _is_backend_failure(e: BaseException) -> bool:
+    """Return True if the error reflects on the backend's health (not the request)."""
+    if isinstance(e, ollama.ResponseError):
+        return e.status_code >= 500
+    return _is_connection_error(e) or isinstance(e, (httpx.TransportError, TimeoutError))
+
+
+# ============================================================================
+# POOLED ASYNC CLIENT
+# ============================================================================
+
+def _record_failure(e: BaseException) -> None:
+    """Count backend-side failures (not bad requests) against the circuit breaker."""
+    if _is_backend_failure(e):
+        get_breaker().record_failure(e)
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    """httpx settings shared by the pooled sync and async clients."""
+    max_connections = int(_env_number('OLLAMA_MAX_CONNECTIONS', 200))
+    return {
+        "timeout": httpx.Timeout(_env_number('OLLAMA_TIMEOUT', 600.0), connect=5.0),
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(
+                max_connections, int(_env_number('OLLAMA_KEEPALIVE_CONNECTIONS', 50))
+            ),
+            keepalive_expiry=60.0,
+        ),
+    }
+
+
+# ============================================================================
+# RETRY POLICY, DEADLINES AND HEDGING
+# ============================================================================
+
+# A caller needs this many recent latencies before its p95 is trusted as a
+# hedge delay; until then its calls are never hedged.
+HEDGE_MIN_SAMPLES = 20
+
+_policy_lock = threading.Lock()
+_policy_counters = {"retries": 0, "deadline_exceeded": 0, "hedged": 0, "hedge_wins": 0}
+_caller_latencies: Dict[str, deque] = {}
+
+
+class _Backoff:
+    """
+    Decorrelated-jitter backoff: each delay is drawn uniformly between the
+    base and three times the previous delay, capped at OLLAMA_BACKOFF_CAP.
+    """
+
+    def __init__(self, base: float, cap: Optional[float] = None):
+        self.base = base
+        self.cap = cap if cap is not None else _env_number('OLLAMA_BACKOFF_CAP', 10.0)
+        self._previous = base
+
+    def next(self) -> float:
+        if self.base <= 0:
+            return 0.0
+        self._previous = min(self.cap, random.uniform(self.base, self._previous * 3))
+        return self._previous
+
+
+def _count(name: str) -> None:
+    with _policy_lock:
+        _policy_counters[name] += 1
+
+
+def _expiry(deadline: Optional[float]) -> Optional[float]:
+    return time.monotonic() + deadline if deadline is not None else None
+
+
+def _remaining(expires: Optional[float]) -> Optional[float]:
+    """Seconds left before `expires` (None = unbounded); raises TimeoutError once it has passed."""
+    if expires is None:
+        return None
+    remaining = expires - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("Ollama call deadline exceeded")
+    return remaining
+
+
+def _next_delay(e: BaseException, attempt: int, retries: int, backoff: _Backoff, expires: Optional[float]) -> Optional[float]:
+    """Return how long to wait before retrying after `e`, or None to give up."""
+    if not _is_backend_failure(e) or attempt > retries:
+        return None
+    delay = backoff.next()
+    if expires is not None and time.monotonic() + delay >= expires:
+        return None
+    return delay
+
+
+def _observe_latency(caller: Optional[str], seconds: float) -> None:
+    with _policy_lock:
+        _caller_latencies.setdefault(caller or "other", deque(maxlen=200)).append(seconds)
+
+
+def _hedge_delay(caller: Optional[str]) -> Optional[float]:
+    """Return the caller's recent p95 latency (floored at OLLAMA_HEDGE_MIN_DELAY), None if unknown."""
+    with _policy_lock:
+        samples = sorted(_caller_latencies.get(caller or "other", ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    return max(_env_number('OLLAMA_HEDGE_MIN_DELAY', 0.5), p95)
+
+
+def _hedging_enabled(hedge: Optional[bool]) -> bool:
+    if hedge is None:
+        hedge = os.environ.get('OLLAMA_HEDGE', '0').strip().lower() in ('1', 'true', 'yes')
+    return hedge and len(get_router().hosts()) > 1
+
+
+def retry_stats() -> Dict[str, Any]:
+    """Return retry/deadline/hedge counters and the current hedge delay per caller."""
+    with _policy_lock:
+        counters = dict(_policy_counters)
+        callers = list(_caller_latencies)
+    delays = {caller: _hedge_delay(caller) for caller in callers}
+    return {
+        **counters,
+        "hedge_delay_s": {c: round(d, 3) if d is not None else None for c, d in sorted(delays.items())},
+    }
+
+
+# One AsyncClient per (event loop, backend): httpx connections are bound to the
+# loop that opened them, so each pool is shared by every coroutine running on
+# that loop (in production that is the single uvicorn loop).
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, ollama.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_sync_clients: Dict[str, ollama.Client] = {}
+_sync_clients_lock = threading.Lock()
+
+
+def get_async_client(host: Optional[str] = None) -> ollama.AsyncClient:
+    """
+    Return the pooled Ollama AsyncClient for `host` on the running event loop.
+
+    The client keeps HTTP connections alive between calls, so concurrent
+    requests reuse sockets instead of paying a TCP handshake each time.
+    When a cassette is active the client is wrapped to record or replay.
+
+    Args:
+        host: Backend base URL (default: OLLAMA_HOST / OLLAMA_URL)
+
+    Raises:
+        RuntimeError: If called outside of a running event loop
+    """
+    host = (host or _get_ollama_base_url()).rstrip('/')
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(host)
+    if client is None:
+        client = ollama.AsyncClient(host=host, **_client_kwargs())
+        clients[host] = client
+        logger.debug("Created pooled Ollama AsyncClient for %s", host)
+    cassette = get_cassette()
+    return cassette.wrap_async(client) if cassette is not None else client
+
+
+def _get_sync_client(host: str) -> ollama.Client:
+    """Return the pooled (thread-safe) synchronous client for `host`."""
+    with _sync_clients_lock:
+        client = _sync_clients.get(host)
+        if client is None:
+            client = ollama.Client(host=host, **_client_kwargs())
+            _sync_clients[host] = client
+    cassette = get_cassette()
+    return cassette.wrap_sync(client) if cassette is not None else client
+
+
+async def aclose_async_client() -> None:
+    """Close the pooled AsyncClients bound to the running event loop (if any)."""
+    clients = _async_clients.pop(asyncio.get_running_loop(), None) or {}
+    for client in clients.values():
+        await client.close()
+
+
+def run_sync(coro):
+    """
+    Drive an async Ollama coroutine to completion from synchronous code.
+
+    Intended for worker threads and scripts that have no running event loop.
+    The pooled client opened on the temporary loop is closed before returning.
+
+    Example:
+        >>> resp = run_sync(achat('medgemma', [{'role': 'user', 'content': 'Hi'}]))
+    """
+    async def _runner():
+        try:
+            return await coro
+        finally:
+            await aclose_async_client()
+
+    return asyncio.run(_runner())
+
+
 # ============================================================================
 # OLLAMA CHAT API WITH RETRY
 # ============================================================================
@@ -49,29 +355,36 @@ def chat_with_retries(
     messages: Any,
     options: Dict[str, Any] = None,
     retries: int = 3,
-    backoff: float = 0.6
+    backoff: float = 0.6,
+    caller: Optional[str] = None,
+    deadline: Optional[float] = None
 ):
     """
-    Call ollama.chat with automatic retry logic for connection errors.
-    
+    Call ollama.chat with automatic retry logic for backend failures.
+
     Features:
-    - Exponential backoff on connection failures
+    - Decorrelated-jitter backoff on connection errors, timeouts and 5xx
     - Configurable retry attempts
+    - A deadline after which no further attempt is started (a blocking
+      call already in progress is bounded by OLLAMA_TIMEOUT instead)
     - Detailed error logging
-    
+
     Args:
         model: Ollama model name (e.g., 'medgemma', 'llama2')
         messages: List of message dictionaries with 'role' and 'content'
         options: Optional parameters for the model (temperature, max_tokens, etc.)
         retries: Maximum number of retry attempts (default: 3)
         backoff: Base backoff time in seconds (default: 0.6)
-    
+        caller: Telemetry tag of the calling feature (e.g. 'patient_summary')
+        deadline: Seconds allowed across all attempts (default: OLLAMA_DEADLINE, 0 = none)
+
     Returns:
         Ollama chat response dictionary
-    
+
     Raises:
-        Exception: If all retries are exhausted or non-connection error occurs
-    
+        TimeoutError: If the deadline passed before a response
+        Exception: If all retries are exhausted or a non-retryable error occurs
+
     Example:
         >>> response = chat_with_retries(
         ...     model='medgemma',
@@ -82,61 +395,483 @@ def chat_with_retries(
     if options is None:
         options = {}
 
+    router = get_router()
+    failed_hosts = set()
+    delays = _Backoff(backoff)
+    expires = _expiry(_resolve_deadline(deadline))
     attempt = 0
     while True:
         try:
-            return ollama.chat(model=model, messages=messages, options=options)
+            _remaining(expires)
+            with router.route(model, _is_backend_failure, exclude=failed_hosts) as backend:
+                started = time.monotonic()
+                try:
+                    resp = _get_sync_client(backend.host).chat(
+                        model=model, messages=messages, options=options, keep_alive=keep_alive()
+                    )
+                except Exception as e:
+                    failed_hosts.add(backend.host)
+                    _record_failure(e)
+                    raise
+                get_breaker().record_success()
+                get_telemetry().record(caller, resp, model=model, host=backend.host)
+                _observe_latency(caller, time.monotonic() - started)
+                return resp
         except Exception as e:
-            # Detect connection-related errors
-            msg = str(e).lower()
-            is_connection = (
-                'failed to connect' in msg or 
-                'connectionerror' in msg or 
-                isinstance(e, req_exceptions.ConnectionError)
-            )
-            
             attempt += 1
-            
-            # Give up if not a connection error or out of retries
-            if not is_connection or attempt > retries:
+
+            # Give up on request errors, when out of retries or past the deadline
+            sleep = _next_delay(e, attempt, retries, delays, expires)
+            if sleep is None:
                 logger.exception('❌ Ollama chat failed (no more retries): %s', e)
                 raise
-            
-            # Calculate exponential backoff
-            sleep = backoff * (2 ** (attempt - 1))
+
+            _count("retries")
             logger.warning(
-                '⚠️  Ollama connection failed, retrying in %.2fs (attempt %d/%d): %s',
+                '⚠️  Ollama call failed, retrying in %.2fs (attempt %d/%d): %s',
                 sleep, attempt, retries, e
             )
             time.sleep(sleep)
 
 
+# ============================================================================
+# SINGLE-FLIGHT COALESCING
+# ============================================================================
+
+class _Flight:
+    """
+    One in-flight generation shared by every caller with an identical request.
+
+    The producer task appends response chunks to `items`; each subscriber
+    replays `items` from the start and then follows new chunks as they are
+    published, so late joiners still receive the full stream. Wakeups are
+    delivered with `call_soon_threadsafe`, so subscribers may live on any
+    event loop.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.items: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._wakeups: Dict[int, Any] = {}
+
+    def publish(self, item: Any = None, *, finished: bool = False, error: BaseException = None) -> None:
+        with _flights_lock:
+            if item is not None:
+                self.items.append(item)
+            if error is not None:
+                self.error = error
+            if finished:
+                self.finished = True
+            wakeups = list(self._wakeups.values())
+        for loop, event in wakeups:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Subscriber's loop already closed; nothing to wake
+                pass
+
+    async def run(self, start: Callable[[], AsyncIterator[Any]]) -> None:
+        try:
+            async for item in start():
+                self.publish(item)
+            self.publish(finished=True)
+        except BaseException as e:
+            self.publish(error=e, finished=True)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            with _flights_lock:
+                if _flights.get(self.key) is self:
+                    del _flights[self.key]
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        event = asyncio.Event()
+        token = id(event)
+        with _flights_lock:
+            self._wakeups[token] = (asyncio.get_running_loop(), event)
+        index = 0
+        try:
+            while True:
+                with _flights_lock:
+                    pending = self.items[index:]
+                    finished, error = self.finished, self.error
+                    event.clear()
+                for item in pending:
+                    index += 1
+                    yield item
+                if error is not None:
+                    raise error
+                if finished:
+                    return
+                await event.wait()
+        finally:
+            with _flights_lock:
+                self._wakeups.pop(token, None)
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+_coalesce_counters = {"leaders": 0, "joined": 0}
+
+
+def _flight_key(model: str, messages: Any, options: Dict[str, Any], stream: bool, kwargs: Dict[str, Any]) -> str:
+    return make_key(model, messages, options, version=f"stream={stream}|{sorted(kwargs.items())}")
+
+
+async def _coalesced(key: str, start: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+    """
+    Yield the chunks of the in-flight request for `key`, starting it if needed.
+
+    The producer runs as its own task so that one caller going away does not
+    abort the generation for the others; it is cancelled only when the last
+    subscriber leaves before completion.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight(key)
+            _flights[key] = flight
+            _coalesce_counters["leaders"] += 1
+        else:
+            _coalesce_counters["joined"] += 1
+        flight.subscribers += 1
+
+    if leader:
+        flight.task = asyncio.get_running_loop().create_task(flight.run(start))
+    else:
+        logger.info("🔗 Joined identical in-flight Ollama request (%s...)", key[:12])
+
+    try:
+        async with contextlib.aclosing(flight.subscribe()) as items:
+            async for item in items:
+                yield item
+    finally:
+        with _flights_lock:
+            flight.subscribers -= 1
+            abandoned = flight.subscribers == 0 and not flight.finished
+            if abandoned and _flights.get(key) is flight:
+                del _flights[key]
+        if abandoned and flight.task is not None:
+            try:
+                flight.task.get_loop().call_soon_threadsafe(flight.task.cancel)
+            except RuntimeError:
+                pass
+
+
+def coalescing_stats() -> Dict[str, int]:
+    """Return how many requests started a generation vs. joined an existing one."""
+    with _flights_lock:
+        return {**_coalesce_counters, "in_flight": len(_flights)}
+
+
+# ============================================================================
+# ASYNC CHAT API
+# ============================================================================
+
+async def _achat_with_retries(model, messages, options, retries, backoff, caller, deadline, hedge, **kwargs):
+    async with get_admission().slot():
+        return await _achat_admitted(model, messages, options, retries, backoff, caller, deadline, hedge, **kwargs)
+
+
+async def _achat_attempt(router, model, messages, options, caller, exclude, timeout, chosen, kwargs):
+    """One non-streaming call on one backend, bounded by `timeout` seconds."""
+    with router.route(model, _is_backend_failure, exclude=exclude) as backend:
+        chosen.append(backend.host)
+        started = time.monotonic()
+        try:
+            resp = await asyncio.wait_for(
+                get_async_client(backend.host).chat(
+                    model=model, messages=messages, options=options, **{'keep_alive': keep_alive(), **kwargs}
+                ),
+                timeout,
+            )
+        except Exception as e:
+            if isinstance(e, TimeoutError):
+                _count("deadline_exceeded")
+            _record_failure(e)
+            raise
+        get_breaker().record_success()
+        get_telemetry().record(caller, resp, model=model, host=backend.host)
+        _observe_latency(caller, time.monotonic() - started)
+        return resp
+
+
+async def _achat_hedged(router, model, messages, options, caller, exclude, timeout, chosen, kwargs):
+    """
+    Like `_achat_attempt`, but once the call has run longer than the caller's
+    p95 a duplicate is sent to another backend; the first success wins and
+    the other request is cancelled (which also aborts it on the server).
+    """
+    delay = _hedge_delay(caller)
+    primary = asyncio.ensure_future(
+        _achat_attempt(router, model, messages, options, caller, exclude, timeout, chosen, kwargs)
+    )
+    if delay is None or (timeout is not None and delay >= timeout):
+        return await primary
+
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        avoid = set(exclude) | set(chosen)
+        if not done and router.has_alternative(avoid):
+            _count("hedged")
+            logger.info("🏁 Hedging slow Ollama call (%s) to a second backend after %.2fs", caller or "other", delay)
+            tasks.add(asyncio.ensure_future(_achat_attempt(
+                router, model, messages, options, caller, avoid,
+                None if timeout is None else timeout - delay, chosen, kwargs
+            )))
+        while True:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        _count("hedge_wins")
+                    return task.result()
+            if not pending:
+                raise next(iter(done)).exception()
+            tasks = pending
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _achat_admitted(model, messages, options, retries, backoff, caller, deadline, hedge, **kwargs):
+    router = get_router()
+    failed_hosts = set()
+    delays = _Backoff(backoff)
+    expires = _expiry(_resolve_deadline(deadline))
+    attempt_once = _achat_hedged if _hedging_enabled(hedge) else _achat_attempt
+    attempt = 0
+    while True:
+        chosen: List[str] = []
+        try:
+            return await attempt_once(
+                router, model, messages, options, caller, failed_hosts, _remaining(expires), chosen, kwargs
+            )
+        except Exception as e:
+            failed_hosts.update(chosen)
+            attempt += 1
+            sleep = _next_delay(e, attempt, retries, delays, expires)
+            if sleep is None:
+                logger.exception('❌ Ollama async chat failed (no more retries): %s', e)
+                raise
+
+            _count("retries")
+            logger.warning(
+                '⚠️  Ollama call failed, retrying in %.2fs (attempt %d/%d): %s',
+                sleep, attempt, retries, e
+            )
+            await asyncio.sleep(sleep)
+
+
+async def _achat_stream_with_retries(model, messages, options, retries, backoff, caller, deadline, **kwargs):
+    async with get_admission().slot():
+        async with contextlib.aclosing(
+            _achat_stream_admitted(model, messages, options, retries, backoff, caller, deadline, **kwargs)
+        ) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+
+async def _prepend(first: Any, rest: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    yield first
+    async for item in rest:
+        yield item
+
+
+async def _achat_stream_admitted(model, messages, options, retries, backoff, caller, deadline, **kwargs):
+    router = get_router()
+    failed_hosts = set()
+    delays = _Backoff(backoff)
+    expires = _expiry(_resolve_deadline(deadline))
+    attempt = 0
+    while True:
+        started = False
+        try:
+            with router.route(model, _is_backend_failure, exclude=failed_hosts) as backend:
+                try:
+                    requested_at = time.monotonic()
+                    stream = await asyncio.wait_for(
+                        get_async_client(backend.host).chat(
+                            model=model, messages=messages, options=options, stream=True,
+                            **{'keep_alive': keep_alive(), **kwargs}
+                        ),
+                        _remaining(expires),
+                    )
+                    # The deadline bounds the wait for the first chunk; after
+                    # that tokens are flowing and OLLAMA_TIMEOUT guards stalls
+                    chunks = stream.__aiter__()
+                    try:
+                        first = await asyncio.wait_for(chunks.__anext__(), _remaining(expires))
+                    except StopAsyncIteration:
+                        return
+                    started = True
+                    ttft = time.monotonic() - requested_at
+                    get_breaker().record_success()
+                    async for chunk in _prepend(first, chunks):
+                        if chunk.get('done'):
+                            # The final chunk carries the token counts and timings
+                            get_telemetry().record(caller, chunk, ttft=ttft, model=model, host=backend.host)
+                        yield chunk
+                except Exception as e:
+                    if isinstance(e, TimeoutError) and not started:
+                        _count("deadline_exceeded")
+                    failed_hosts.add(backend.host)
+                    _record_failure(e)
+                    raise
+            return
+        except Exception as e:
+            attempt += 1
+            sleep = None if started else _next_delay(e, attempt, retries, delays, expires)
+            if sleep is None:
+                logger.exception('❌ Ollama streaming chat failed (no more retries): %s', e)
+                raise
+
+            _count("retries")
+            logger.warning(
+                '⚠️  Ollama stream failed before the first chunk, retrying in %.2fs (attempt %d/%d): %s',
+                sleep, attempt, retries, e
+            )
+            await asyncio.sleep(sleep)
+
+
+async def achat(
+    model: str,
+    messages: Any,
+    options: Dict[str, Any] = None,
+    retries: int = 3,
+    backoff: float = 0.6,
+    coalesce: bool = True,
+    caller: Optional[str] = None,
+    deadline: Optional[float] = None,
+    hedge: Optional[bool] = None,
+    **kwargs
+):
+    """
+    Async counterpart of `chat_with_retries` using the pooled AsyncClient.
+
+    Backoff between attempts is an `asyncio.sleep`, so a retrying call never
+    holds a thread or blocks the event loop. Each attempt is cut off when the
+    deadline expires, so a stuck backend cannot hold the call beyond it.
+    With hedging on (and more than one backend) an attempt that runs past
+    the caller's recent p95 latency is duplicated on a second backend; the
+    first response wins and the other request is cancelled. Concurrent calls with an
+    identical (model, messages, options) share one in-flight generation
+    unless `coalesce=False`.
+
+    Each generation first takes a slot from the admission controller in the
+    caller's priority lane (see `ollama_admission.set_request_priority`);
+    when that lane's queue is full `AdmissionRejected` is raised at once.
+
+    Args:
+        model: Ollama model name
+        messages: List of message dictionaries with 'role' and 'content'
+        options: Optional parameters for the model (temperature, num_predict, etc.)
+        retries: Maximum number of retry attempts (default: 3)
+        backoff: Base backoff time in seconds (default: 0.6)
+        coalesce: Share identical concurrent requests (default: True)
+        caller: Telemetry tag of the calling feature (e.g. 'clinician_report')
+        deadline: Seconds allowed across all attempts (default: OLLAMA_DEADLINE, 0 = none)
+        hedge: Hedge slow attempts on a second backend (default: OLLAMA_HEDGE)
+        **kwargs: Extra arguments forwarded to `AsyncClient.chat` (e.g. keep_alive)
+
+    Returns:
+        Ollama chat response (supports `resp['message']['content']`)
+
+    Example:
+        >>> resp = await achat('medgemma', [{'role': 'user', 'content': 'Hello'}])
+    """
+    if options is None:
+        options = {}
+    if not coalesce:
+        return await _achat_with_retries(model, messages, options, retries, backoff, caller, deadline, hedge, **kwargs)
+
+    async def _start():
+        yield await _achat_with_retries(model, messages, options, retries, backoff, caller, deadline, hedge, **kwargs)
+
+    key = _flight_key(model, messages, options, False, kwargs)
+    async with contextlib.aclosing(_coalesced(key, _start)) as results:
+        async for resp in results:
+            return resp
+    raise RuntimeError("Ollama request finished without a response")
+
+
+async def achat_stream(
+    model: str,
+    messages: Any,
+    options: Dict[str, Any] = None,
+    retries: int = 3,
+    backoff: float = 0.6,
+    coalesce: bool = True,
+    caller: Optional[str] = None,
+    deadline: Optional[float] = None,
+    **kwargs
+) -> AsyncIterator[Any]:
+    """
+    Stream chat response chunks from Ollama without blocking the event loop.
+
+    Backend failures are retried only until the first chunk arrives, and the
+    `deadline` (default: OLLAMA_DEADLINE) bounds the wait for that chunk;
+    once tokens have been yielded a failure is raised to the caller, since
+    replaying the stream would duplicate output. Identical concurrent
+    streams are coalesced: every subscriber receives all chunks of the one
+    shared generation. The admission slot is held until the stream ends.
+    Telemetry (tagged with `caller`) is taken from the final `done` chunk.
+
+    Yields:
+        Ollama chat response chunks (each with `chunk['message']['content']`)
+
+    Example:
+        >>> async for chunk in achat_stream('medgemma', messages):
+        ...     print(chunk['message']['content'], end='')
+    """
+    if options is None:
+        options = {}
+    if coalesce:
+        key = _flight_key(model, messages, options, True, kwargs)
+        source = _coalesced(
+            key, lambda: _achat_stream_with_retries(model, messages, options, retries, backoff, caller, deadline, **kwargs)
+        )
+    else:
+        source = _achat_stream_with_retries(model, messages, options, retries, backoff, caller, deadline, **kwargs)
+
+    async with contextlib.aclosing(source) as chunks:
+        async for chunk in chunks:
+            yield chunk
+
+
 # ============================================================================
 # HEALTH CHECK
 # ============================================================================
 
 def is_ollama_reachable(timeout: float = 0.8) -> bool:
     """
-    Quick TCP/HTTP health check for Ollama server.
+    Quick TCP/HTTP health check for the configured Ollama servers.
     
     Args:
         timeout: Request timeout in seconds (default: 0.8)
     
     Returns:
-        True if server responds, False otherwise
+        True if at least one backend responds, False otherwise
     
     Example:
         >>> if is_ollama_reachable():
         ...     print("Ollama server is online")
     """
-    base_url = _get_ollama_base_url().rstrip('/')
-    
-    try:
-        import requests
-        resp = requests.get(base_url, timeout=timeout)
-        # Any HTTP response indicates server is reachable
-        logger.debug(f"✅ Ollama server reachable at {base_url}")
-        return True
-    except Exception as e:
-        logger.debug(f"❌ Ollama server unreachable at {base_url}: {e}")
-        return False
+    import requests
+
+    for base_url in get_router().hosts():
+        try:
+            requests.get(base_url, timeout=timeout)
+            # Any HTTP response indicates server is reachable
+            logger.debug(f"✅ Ollama server reachable at {base_url}")
+            return True
+        except Exception as e:
+            logger.debug(f"❌ Ollama server unreachable at {base_url}: {e}")
+    return False
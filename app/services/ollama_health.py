@@ -0,0 +1,246 @@
+"""
+Ollama Circuit Breaker and Background Health Prober
+
+Keeps an in-memory view of whether Ollama is usable so request paths can
+check it for free instead of issuing a blocking HTTP probe per message:
+- `CircuitBreaker` (closed / open / half-open) fed by the outcome of real
+  calls made through `app.services.ollama_client`
+- `HealthProber`: an asyncio task started in the app lifespan that pings
+  every backend periodically and feeds the same breaker, so an outage is
+  noticed (and a recovery picked up) even when no traffic is flowing
+
+States:
+- closed: requests flow; consecutive failures trip the breaker open
+- open: requests are refused until the reset timeout elapses (or a probe
+  succeeds), then the breaker goes half-open
+- half-open: a single trial request is let through; success closes the
+  breaker, failure re-opens it
+
+Environment Variables:
+- OLLAMA_BREAKER_FAILURES: Consecutive failures that open the breaker (default: 3)
+- OLLAMA_BREAKER_RESET_SECONDS: Time spent open before a trial (default: 15)
+- OLLAMA_HEALTH_INTERVAL: Seconds between background probes, 0 disables (default: 10)
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker; every method is a constant-time in-memory
+    operation, so it is safe to call on the hot path of every request.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 15.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_started_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._transitions = 0
+        self._rejected = 0
+
+    def _set_state(self, state: str, now: float) -> None:
+        # Caller holds self._lock
+        if state == self._state:
+            return
+        logger.warning("⚡ Ollama circuit %s → %s", self._state, state)
+        self._state = state
+        self._transitions += 1
+        self._trial_started_at = None
+        if state == OPEN:
+            self._opened_at = now
+
+    def _refresh(self, now: float) -> None:
+        # Caller holds self._lock
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN, now)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Return True if a request may be sent to Ollama now.
+
+        In half-open state only one trial request is admitted at a time (a
+        trial that never reports back is considered lost after the reset
+        timeout).
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._refresh(now)
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN:
+                if self._trial_started_at is None or now - self._trial_started_at >= self.reset_timeout:
+                    self._trial_started_at = now
+                    return True
+            self._rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """A real call completed against a backend."""
+        with self._lock:
+            self._consecutive_failures = 0
+            self._set_state(CLOSED, time.monotonic())
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        """A real call (or probe) failed because the backend was unusable."""
+        now = time.monotonic()
+        with self._lock:
+            self._consecutive_failures += 1
+            self._last_error = str(error) if error is not None else None
+            self._refresh(now)
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._set_state(OPEN, now)
+
+    def record_probe(self, reachable: bool, error: Optional[BaseException] = None) -> None:
+        """
+        Feed a background probe result.
+
+        A successful probe only moves an open breaker to half-open: the
+        server answering a ping does not prove generations work, so a real
+        request has to close it.
+        """
+        if not reachable:
+            self.record_failure(error)
+            return
+        with self._lock:
+            if self._state == OPEN:
+                self._set_state(HALF_OPEN, time.monotonic())
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._refresh(now)
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "open_for_s": round(max(0.0, self._opened_at + self.reset_timeout - now), 1)
+                if self._state == OPEN else 0.0,
+                "transitions": self._transitions,
+                "rejected": self._rejected,
+                "last_error": self._last_error,
+            }
+
+
+class HealthProber:
+    """Periodically pings every Ollama backend and reports to a CircuitBreaker."""
+
+    def __init__(self, breaker: CircuitBreaker, hosts: List[str], interval: float = 10.0, timeout: float = 2.0):
+        self.breaker = breaker
+        self.hosts = hosts
+        self.interval = interval
+        self.timeout = timeout
+        self.last_probe_at: Optional[float] = None
+        self.reachable_hosts: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def probe_once(self) -> bool:
+        """Ping all backends concurrently; True if at least one answered."""
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async def _ping(host: str) -> Optional[str]:
+                try:
+                    await client.get(f"{host}/api/version")
+                    return host
+                except httpx.HTTPError:
+                    return None
+
+            results = await asyncio.gather(*(_ping(h) for h in self.hosts))
+
+        self.reachable_hosts = [h for h in results if h]
+        self.last_probe_at = time.time()
+        reachable = bool(self.reachable_hosts)
+        self.breaker.record_probe(
+            reachable, None if reachable else ConnectionError("No Ollama backend answered the health probe")
+        )
+        return reachable
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.probe_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Ollama health probe failed unexpectedly: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info("🩺 Ollama health prober started (every %.0fs)", self.interval)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "interval_s": self.interval,
+            "running": self._task is not None and not self._task.done(),
+            "last_probe_at": self.last_probe_at,
+            "reachable_hosts": list(self.reachable_hosts),
+        }
+
+
+_breaker: Optional[CircuitBreaker] = None
+_prober: Optional[HealthProber] = None
+_lock = threading.Lock()
+
+
+def get_breaker() -> CircuitBreaker:
+    """Lazily build the process-wide circuit breaker from the environment."""
+    global _breaker
+    if _breaker is None:
+        with _lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    failure_threshold=int(os.environ.get('OLLAMA_BREAKER_FAILURES', 3)),
+                    reset_timeout=float(os.environ.get('OLLAMA_BREAKER_RESET_SECONDS', 15)),
+                )
+    return _breaker
+
+
+def get_prober() -> HealthProber:
+    """Lazily build the process-wide health prober (not started)."""
+    global _prober
+    if _prober is None:
+        breaker = get_breaker()
+        with _lock:
+            if _prober is None:
+                from app.services.ollama_router import get_router
+
+                _prober = HealthProber(
+                    breaker,
+                    get_router().hosts(),
+                    interval=float(os.environ.get('OLLAMA_HEALTH_INTERVAL', 10)),
+                )
+    return _prober
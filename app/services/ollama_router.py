@@ -0,0 +1,268 @@
+"""
+Ollama Backend Router
+
+Spreads LLM traffic over several Ollama servers:
+- Least-outstanding-requests balancing, preferring backends that already
+  have the requested model loaded (avoids multi-second cold loads)
+- Passive health tracking: backends that keep failing are ejected for a
+  cooldown period and re-admitted afterwards
+- Per-backend request, error and latency statistics
+
+With a single configured host the router degenerates to "always use it",
+so the single-box setup behaves exactly as before.
+
+Environment Variables:
+- OLLAMA_HOSTS: Comma-separated Ollama base URLs
+  (default: OLLAMA_HOST / OLLAMA_URL / http://localhost:11434)
+- OLLAMA_EJECT_AFTER_FAILURES: Consecutive failures before ejection (default: 3)
+- OLLAMA_EJECT_SECONDS: Cooldown before an ejected backend is retried (default: 30)
+- OLLAMA_MODEL_IDLE_SECONDS: How long a model is assumed to stay loaded after
+  its last use (default: the keep_alive every request sends, OLLAMA_KEEP_ALIVE;
+  only set it when the servers override keep_alive themselves)
+"""
+
+import contextlib
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Extra "virtual in-flight requests" charged to a backend that would have to
+# load the model first; a cold load costs about as much as a couple of queued
+# generations on CPU.
+COLD_MODEL_PENALTY = 2
+
+
+class Backend:
+    """Routing state and statistics for one Ollama server."""
+
+    def __init__(self, host: str):
+        self.host = host.rstrip('/')
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.last_error: Optional[str] = None
+        self.ewma_latency: Optional[float] = None
+        self.loaded_models: Dict[str, float] = {}
+        self._latencies: deque = deque(maxlen=256)
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def has_model_loaded(self, model: str, now: float, idle_seconds: float) -> bool:
+        last_used = self.loaded_models.get(model)
+        return last_used is not None and now - last_used <= idle_seconds
+
+    def latency_percentile(self, q: float) -> Optional[float]:
+        """Return the q-quantile (0..1) of recent successful request latencies in seconds."""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        p50 = self.latency_percentile(0.5)
+        p95 = self.latency_percentile(0.95)
+        return {
+            "host": self.host,
+            "healthy": self.is_available(now),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "ejected_for_s": round(max(0.0, self.ejected_until - now), 1),
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "p50_latency_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_latency_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "loaded_models": sorted(self.loaded_models),
+            "last_error": self.last_error,
+        }
+
+
+class OllamaRouter:
+    """
+    Least-outstanding-requests router over a fixed set of backends.
+
+    All methods are thread-safe and non-blocking, so they can be used from
+    coroutines and worker threads alike.
+    """
+
+    def __init__(
+        self,
+        hosts: Iterable[str],
+        eject_after: int = 3,
+        eject_seconds: float = 30.0,
+        model_idle_seconds: float = 300.0,
+    ):
+        self.backends: List[Backend] = [Backend(h) for h in hosts]
+        if not self.backends:
+            raise ValueError("OllamaRouter needs at least one backend host")
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.model_idle_seconds = model_idle_seconds
+        self._lock = threading.Lock()
+
+    def acquire(self, model: str, exclude: Iterable[str] = ()) -> Backend:
+        """
+        Pick a backend for `model` and count the request as in flight.
+
+        Preference order: healthy, not excluded, fewest outstanding requests
+        (with a penalty when the model is not loaded), lowest latency. If
+        every backend is ejected, the one whose cooldown ends first is used
+        so requests are never refused outright.
+        """
+        excluded = set(exclude)
+        now = time.monotonic()
+        with self._lock:
+            candidates = [b for b in self.backends if b.is_available(now) and b.host not in excluded]
+            if not candidates:
+                candidates = [b for b in self.backends if b.is_available(now)] or [
+                    min(self.backends, key=lambda b: b.ejected_until)
+                ]
+
+            def _score(b: Backend):
+                cold = 0 if b.has_model_loaded(model, now, self.model_idle_seconds) else COLD_MODEL_PENALTY
+                return (b.in_flight + cold, b.ewma_latency or 0.0)
+
+            backend = min(candidates, key=_score)
+            backend.in_flight += 1
+            backend.requests += 1
+            return backend
+
+    def release(
+        self,
+        backend: Backend,
+        model: str,
+        latency: Optional[float] = None,
+        failed: bool = False,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """
+        Finish a request started with `acquire`.
+
+        Args:
+            latency: Duration in seconds of a successful request
+            failed: True if the backend itself misbehaved (connection error, 5xx)
+            error: The exception raised, if any (for diagnostics)
+        """
+        now = time.monotonic()
+        with self._lock:
+            backend.in_flight = max(0, backend.in_flight - 1)
+            if failed:
+                backend.failures += 1
+                backend.consecutive_failures += 1
+                backend.last_error = str(error) if error is not None else None
+                if backend.consecutive_failures >= self.eject_after and backend.is_available(now):
+                    backend.ejected_until = now + self.eject_seconds
+                    logger.warning(
+                        "🚫 Ejecting Ollama backend %s for %.0fs after %d consecutive failures",
+                        backend.host, self.eject_seconds, backend.consecutive_failures
+                    )
+            elif latency is not None:
+                if backend.consecutive_failures:
+                    logger.info("✅ Ollama backend %s recovered", backend.host)
+                backend.consecutive_failures = 0
+                backend.ejected_until = 0.0
+                backend.loaded_models[model] = now
+                backend._latencies.append(latency)
+                backend.ewma_latency = (
+                    latency if backend.ewma_latency is None
+                    else 0.8 * backend.ewma_latency + 0.2 * latency
+                )
+
+    @contextlib.contextmanager
+    def route(
+        self,
+        model: str,
+        is_failure: Callable[[BaseException], bool],
+        exclude: Iterable[str] = (),
+    ) -> Iterator[Backend]:
+        """
+        Context manager wrapping `acquire`/`release` around one request.
+
+        Exceptions for which `is_failure` is True count against the backend;
+        cancellations and other errors release it without affecting health.
+        """
+        backend = self.acquire(model, exclude)
+        start = time.monotonic()
+        try:
+            yield backend
+        except Exception as e:
+            self.release(backend, model, failed=is_failure(e), error=e)
+            raise
+        except BaseException:
+            self.release(backend, model)
+            raise
+        else:
+            self.release(backend, model, latency=time.monotonic() - start)
+
+    def mark_loaded(self, host: str, model: str) -> None:
+        """Record that `model` is resident on `host` (e.g. after a warm-up ping)."""
+        now = time.monotonic()
+        with self._lock:
+            for backend in self.backends:
+                if backend.host == host.rstrip('/'):
+                    backend.loaded_models[model] = now
+
+    def has_alternative(self, exclude: Iterable[str]) -> bool:
+        """Return True if a healthy backend outside `exclude` exists (e.g. to hedge a request)."""
+        excluded = {h.rstrip('/') for h in exclude}
+        now = time.monotonic()
+        with self._lock:
+            return any(b.is_available(now) and b.host not in excluded for b in self.backends)
+
+    def hosts(self) -> List[str]:
+        return [b.host for b in self.backends]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Return per-backend statistics for diagnostics endpoints."""
+        now = time.monotonic()
+        with self._lock:
+            return [b.snapshot(now) for b in self.backends]
+
+
+def _configured_hosts() -> List[str]:
+    raw = os.environ.get('OLLAMA_HOSTS', '')
+    hosts = [h.strip() for h in raw.split(',') if h.strip()]
+    if hosts:
+        return hosts
+    return [
+        os.environ.get('OLLAMA_HOST') or
+        os.environ.get('OLLAMA_URL') or
+        'http://localhost:11434'
+    ]
+
+
+def _model_idle_seconds() -> float:
+    raw = os.environ.get('OLLAMA_MODEL_IDLE_SECONDS')
+    if raw:
+        return float(raw)
+    # Imported here: ollama_client imports this module
+    from app.services.ollama_client import keep_alive_seconds
+    return keep_alive_seconds()
+
+
+_router: Optional[OllamaRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> OllamaRouter:
+    """Lazily build the process-wide router from the environment."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = OllamaRouter(
+                    _configured_hosts(),
+                    eject_after=int(os.environ.get('OLLAMA_EJECT_AFTER_FAILURES', 3)),
+                    eject_seconds=float(os.environ.get('OLLAMA_EJECT_SECONDS', 30)),
+                    model_idle_seconds=_model_idle_seconds(),
+                )
+                logger.info("Ollama router configured with backends: %s", _router.hosts())
+    return _router
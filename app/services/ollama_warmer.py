@@ -0,0 +1,185 @@
+"""
+Ollama Model Warmer
+
+Ollama unloads a model once it has been idle for its keep_alive period, and
+the next request then pays a multi-second `load_duration`. The warmer keeps
+the configured models resident:
+- Every request carries `keep_alive` (OLLAMA_KEEP_ALIVE, see ollama_client)
+- At startup every model is loaded on every backend before the app reports
+  ready
+- During business hours each model is pinged on a schedule, so quiet
+  periods never let it expire; outside those hours it is allowed to unload
+- Pings that had to load the model are recorded as cold-load events in
+  `app.services.llm_telemetry` (caller "warmer")
+
+A warm ping is a chat request with no messages: Ollama loads the model (if
+needed), refreshes its keep_alive and returns without generating.
+
+Pings carry a `num_ctx` too. Ollama restarts the runner whenever `num_ctx`
+changes (see app.services.llm_budget), so a ping at the Modelfile default
+would load a runner that the next real request immediately reloads. The
+ping uses the bucket real traffic has chosen most often (the largest bucket
+before any traffic).
+
+Environment Variables:
+- OLLAMA_WARM_MODELS: Comma-separated models to keep warm (default: MODEL_NAME)
+- OLLAMA_WARM_INTERVAL: Seconds between scheduled pings, 0 disables (default: 240)
+- OLLAMA_WARM_HOURS: Local business hours as "HH-HH" (default: 07-20; empty = always)
+- OLLAMA_WARM_DAYS: Days to warm, e.g. "mon-fri" or "all" (default: mon-fri)
+- OLLAMA_WARM_ON_STARTUP: Load models during startup, 0/1 (default: 1)
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.llm_budget import most_used_ctx
+from app.services.llm_telemetry import get_telemetry
+from app.services.ollama_client import get_async_client, keep_alive
+from app.services.ollama_router import get_router
+
+logger = logging.getLogger(__name__)
+
+_DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def parse_hours(raw: str) -> Optional[Tuple[int, int]]:
+    """Parse "HH-HH" into (start, end) hours; None means all day."""
+    raw = (raw or "").strip()
+    if not raw:
+        return None
+    start, _, end = raw.partition("-")
+    return int(start), int(end or 24)
+
+
+def parse_days(raw: str) -> Set[int]:
+    """Parse "mon-fri", "mon,wed,fri" or "all" into weekday numbers (Monday = 0)."""
+    raw = (raw or "all").strip().lower()
+    if raw in ("all", "*"):
+        return set(range(7))
+    days: Set[int] = set()
+    for part in raw.split(","):
+        first, _, last = part.strip().partition("-")
+        lo = _DAYS.index(first[:3])
+        hi = _DAYS.index(last[:3]) if last else lo
+        days.update(range(lo, hi + 1))
+    return days
+
+
+class ModelWarmer:
+    """Loads models at startup and keeps them resident during business hours."""
+
+    def __init__(
+        self,
+        models: List[str],
+        hosts: List[str],
+        interval: float = 240.0,
+        hours: Optional[Tuple[int, int]] = (7, 20),
+        days: Optional[Set[int]] = None,
+    ):
+        self.models = models
+        self.hosts = hosts
+        self.interval = interval
+        self.hours = hours
+        self.days = days if days is not None else set(range(5))
+        self.pings = 0
+        self.failures = 0
+        self.last_ping_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def in_business_hours(self, now: Optional[datetime] = None) -> bool:
+        now = now or datetime.now()
+        if now.weekday() not in self.days:
+            return False
+        if self.hours is None:
+            return True
+        start, end = self.hours
+        return start <= now.hour < end
+
+    async def ping(self, host: str, model: str) -> bool:
+        """Load/refresh `model` on `host`; returns False if the backend refused."""
+        started = time.monotonic()
+        try:
+            resp = await get_async_client(host).chat(
+                model=model, messages=[], options={"num_ctx": most_used_ctx()}, keep_alive=keep_alive()
+            )
+        except Exception as e:
+            self.failures += 1
+            logger.warning("🔥 Warm ping failed for %s on %s: %s", model, host, e)
+            return False
+        self.pings += 1
+        self.last_ping_at = time.time()
+        get_telemetry().record("warmer", resp, model=model, host=host)
+        get_router().mark_loaded(host, model)
+        logger.debug("🔥 Warm ping %s on %s took %.2fs", model, host, time.monotonic() - started)
+        return True
+
+    async def warm_all(self) -> bool:
+        """Ping every (host, model) pair concurrently; True if all succeeded."""
+        results = await asyncio.gather(*(self.ping(h, m) for h in self.hosts for m in self.models))
+        return all(results)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.in_business_hours():
+                continue
+            try:
+                await self.warm_all()
+            except Exception as e:
+                logger.warning("Scheduled model warm-up failed unexpectedly: %s", e)
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info("🔥 Model warmer scheduled every %.0fs for %s", self.interval, self.models)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "models": list(self.models),
+            "interval_s": self.interval,
+            "business_hours": list(self.hours) if self.hours else None,
+            "days": [_DAYS[d] for d in sorted(self.days)],
+            "active_now": self.in_business_hours(),
+            "running": self._task is not None and not self._task.done(),
+            "pings": self.pings,
+            "failures": self.failures,
+            "last_ping_at": self.last_ping_at,
+            "cold_loads": get_telemetry().cold_loads(),
+        }
+
+
+_warmer: Optional[ModelWarmer] = None
+_warmer_lock = threading.Lock()
+
+
+def get_warmer() -> ModelWarmer:
+    """Lazily build the process-wide model warmer from the environment."""
+    global _warmer
+    if _warmer is None:
+        with _warmer_lock:
+            if _warmer is None:
+                from app.core.config import settings
+
+                models = [m.strip() for m in os.environ.get('OLLAMA_WARM_MODELS', '').split(',') if m.strip()]
+                _warmer = ModelWarmer(
+                    models or [settings.MODEL_NAME],
+                    get_router().hosts(),
+                    interval=float(os.environ.get('OLLAMA_WARM_INTERVAL', 240)),
+                    hours=parse_hours(os.environ.get('OLLAMA_WARM_HOURS', '07-20')),
+                    days=parse_days(os.environ.get('OLLAMA_WARM_DAYS', 'mon-fri')),
+                )
+    return _warmer
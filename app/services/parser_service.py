@@ -6,29 +6,48 @@ This module provides robust PDF and document parsing with multiple fallback stra
 2. PDF sanitization + retry (secondary)
 3. OCR fallback for scanned documents (tertiary)
 
+Results are cached by file content (app.services.extraction_cache): a
+byte-identical file is not parsed again, and its Docling document can be
+reloaded without reparsing (`load_docling_document`).
+
+Docling conversions run in pre-initialized worker processes
+(app.services.docling_pool); with DOCLING_POOL_WORKERS=0 they run in this
+process on a shared converter.
+
 Dependencies:
     - docling: For structured document parsing
     - pypdf: For PDF manipulation and sanitization
     - pdf2image: For converting PDF pages to images
-    - pytesseract: For OCR text extraction
+    - pytesseract: For OCR text extraction (see app.services.ocr_service)
 
 Author: Medical Report Analysis System
 """
 
+import importlib.metadata
+import json
 import os
 import logging
+from typing import List, Optional, Tuple
 
 # Prevent symlink permission issues on Windows
 os.environ.setdefault("HF_HUB_DISABLE_SYMLINKS", "1")
 
 from docling.document_converter import DocumentConverter
 from docling.exceptions import ConversionError
+from docling_core.types.doc import DoclingDocument
 from pypdf import PdfReader, PdfWriter
-from pdf2image import convert_from_path
-import pytesseract
+
+from app.services import docling_pool, extraction_cache, ocr_service
+from app.services.extraction_cache import CachedExtraction
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the extraction chain changes its output, so cached
+# extractions from the old pipeline are not reused
+PARSER_VERSION = "1"
+
+OCR_DPI = 200
+
 # Check for ONNX Runtime availability
 try:
     import onnxruntime  # type: ignore
@@ -44,7 +63,8 @@ _converter = None  # lazy singleton
 def get_converter() -> DocumentConverter:
     """Lazily initialize and return the Docling converter.
 
-    Avoids blocking import/startup; initializes on first use.
+    Avoids blocking import/startup; initializes on first use. Each Docling
+    pool worker calls this once when it starts.
     """
     global _converter
     if _converter is None:
@@ -97,18 +117,36 @@ def sanitize_pdf(path: str) -> str:
         return path  # Return original if sanitization fails
 
 
+def _ocr(path: str) -> Tuple[str, List[int]]:
+    """OCR a PDF; returns its text and the pages that could not be read."""
+    try:
+        result = ocr_service.ocr_pdf_pages(path, dpi=OCR_DPI)
+        text = result.text
+
+        logger.info(f"OCR extracted {len(text)} chars from {len(result.pages)} pages in {result.seconds}s")
+        if result.failed_pages:
+            logger.warning(f"OCR dropped pages {result.failed_pages} of {path}")
+        return text, result.failed_pages
+
+    except Exception as e:
+        logger.error(f"OCR failed: {e}", exc_info=True)
+        return "", []
+
+
 def ocr_pdf(path: str) -> str:
     """
     Extract text from PDF using Optical Character Recognition (OCR).
     
-    This function converts each PDF page to an image and uses Tesseract OCR
-    to extract text. Useful for scanned documents or image-based PDFs.
+    Pages are rasterized one at a time and read by Tesseract in parallel
+    across the OCR worker pool (app.services.ocr_service), so memory stays
+    bounded to a few pages. Useful for scanned documents or image-based PDFs.
     
     Args:
         path: Absolute path to the PDF file
         
     Returns:
-        str: Extracted text from all pages, joined with newlines
+        str: Extracted text from all pages in page order, joined with newlines
+             (pages that fail are left empty and logged)
              Returns empty string if OCR fails
              
     Note:
@@ -119,68 +157,78 @@ def ocr_pdf(path: str) -> str:
         >>> text = ocr_pdf("scanned_report.pdf")
         >>> print(len(text))  # Number of characters extracted
     """
+    return _ocr(path)[0]
+
+
+def _extraction_options() -> dict:
+    """Everything besides the file bytes that shapes the extracted text."""
     try:
-        # Convert PDF pages to images at 200 DPI
-        pages = convert_from_path(path, dpi=200)
-        
-        # Extract text from each page image
-        text = "\n".join(pytesseract.image_to_string(page) for page in pages)
-        
-        logger.info(f"OCR extracted {len(text)} chars from {len(pages)} pages")
-        return text
-        
+        docling_version = importlib.metadata.version("docling")
+    except importlib.metadata.PackageNotFoundError:
+        docling_version = None
+    return {"docling": docling_version, "ocr_dpi": OCR_DPI}
+
+
+def _cache_key(file_path: str, digest: Optional[str] = None) -> str:
+    return extraction_cache.make_key(
+        digest or extraction_cache.file_digest(file_path), PARSER_VERSION, _extraction_options()
+    )
+
+
+def _serialize_document(document) -> Optional[str]:
+    try:
+        return json.dumps(document.export_to_dict())
     except Exception as e:
-        logger.error(f"OCR failed: {e}", exc_info=True)
-        return ""
+        logger.warning(f"Could not serialize Docling document: {e}")
+        return None
+
 
+def export_document(document) -> Tuple[str, Optional[str]]:
+    """Return (markdown, serialized JSON) of a converted Docling document."""
+    return document.export_to_markdown(), _serialize_document(document)
 
-def extract_data_from_file(file_path: str) -> str:
+
+def _convert(file_path: str) -> Tuple[str, Optional[str]]:
     """
-    Extract text from medical documents using multi-tier fallback strategy.
-    
-    Processing Pipeline:
-        1. Attempt structured parsing with Docling
-        2. If fails: Sanitize PDF and retry Docling
-        3. If still fails: Use OCR fallback
-        4. If all fail: Return helpful error message
-    
-    Args:
-        file_path: Absolute path to the document file
-                   Supports: PDF, images (PNG, JPG, etc.)
-        
-    Returns:
-        str: Extracted text content from the document
-             May include markdown formatting from Docling
-             Returns error message string if extraction fails
-             
+    Convert a document with Docling, in the worker pool when it is enabled.
+
     Raises:
-        Does not raise exceptions - returns error strings instead
-        
-    Example:
-        >>> text = extract_data_from_file("medical_report.pdf")
-        >>> if text.startswith("Error:"):
-        ...     print("Extraction failed:", text)
-        ... else:
-        ...     print(f"Extracted {len(text)} characters")
+        ConversionError: Docling rejected the document
     """
-    logger.info(f"Extracting data from file: {file_path}")
+    pool = docling_pool.get_pool()
+    if pool is None:
+        return export_document(get_converter().convert(file_path).document)
+    try:
+        return pool.convert(file_path)
+    except docling_pool.ConversionFailed as e:
+        raise ConversionError(str(e)) from e
 
-    # Validate file exists
-    if not os.path.exists(file_path):
-        error_msg = f"Error: File does not exist. {file_path}"
-        logger.error(error_msg)
-        return error_msg
+
+def _is_pool_failure(error: Exception) -> bool:
+    """True when Docling could not run at all (pool timeout, crash or shutdown)."""
+    return isinstance(error, docling_pool.DoclingPoolError) and not isinstance(error, docling_pool.DoclingJobError)
+
+
+def _extract(file_path: str) -> Tuple[Optional[CachedExtraction], bool]:
+    """
+    Run the Docling -> sanitize -> OCR chain.
+
+    Returns:
+        (extraction or None when every tier fails, whether it may be cached).
+        A fallback result is not cacheable when Docling failed for a transient
+        reason or OCR could not read every page, so the next upload of the
+        file gets another attempt.
+    """
+    cacheable = True
 
     # --- TIER 1: Structured Docling Parsing ---
     try:
         logger.info("Converting document with Docling...")
-        converter = get_converter()
-        result = converter.convert(file_path)
-        content = result.document.export_to_markdown()
+        content, document_json = _convert(file_path)
 
         if content and content.strip():
             logger.info(f"Docling extracted {len(content)} chars (structured).")
-            return content.strip()
+            return CachedExtraction(content.strip(), "docling", document_json), True
 
         logger.warning("Docling returned EMPTY text. Falling back...")
 
@@ -190,31 +238,93 @@ def extract_data_from_file(file_path: str) -> str:
         clean_path = sanitize_pdf(file_path)
 
         try:
-            converter = get_converter()
-            result = converter.convert(clean_path)
-            content = result.document.export_to_markdown()
+            content, document_json = _convert(clean_path)
 
             if content and content.strip():
                 logger.info(
                     f"Sanitized Docling extracted {len(content)} chars."
                 )
-                return content.strip()
+                return CachedExtraction(content.strip(), "sanitized", document_json), True
 
         except Exception as sanitize_error:
+            cacheable = not _is_pool_failure(sanitize_error)
             logger.warning(
                 f"Docling STILL failed after sanitization: {sanitize_error}"
             )
 
     except Exception as e:
+        cacheable = not _is_pool_failure(e)
         logger.error(f"Docling error: {e}", exc_info=True)
 
     # --- TIER 3: OCR Fallback ---
     logger.warning("Attempting OCR fallback...")
-    text = ocr_pdf(file_path)
+    text, failed_pages = _ocr(file_path)
 
     if text and text.strip():
         logger.info(f"OCR fallback successful: {len(text)} chars extracted")
-        return text.strip()
+        return CachedExtraction(text.strip(), "ocr"), cacheable and not failed_pages
+
+    return None, cacheable
+
+
+def extract_data_from_file(file_path: str, digest: Optional[str] = None) -> str:
+    """
+    Extract text from medical documents using multi-tier fallback strategy.
+    
+    Processing Pipeline:
+        0. Return the cached extraction of a byte-identical file, if any
+        1. Attempt structured parsing with Docling
+        2. If fails: Sanitize PDF and retry Docling
+        3. If still fails: Use OCR fallback
+        4. If all fail: Return helpful error message
+    
+    Args:
+        file_path: Absolute path to the document file
+                   Supports: PDF, images (PNG, JPG, etc.)
+        digest: SHA-256 of the file bytes, if the caller already has it
+        
+    Returns:
+        str: Extracted text content from the document
+             May include markdown formatting from Docling
+             Returns error message string if extraction fails
+             
+    Raises:
+        Does not raise exceptions - returns error strings instead
+        
+    Example:
+        >>> text = extract_data_from_file("medical_report.pdf")
+        >>> if text.startswith("Error:"):
+        ...     print("Extraction failed:", text)
+        ... else:
+        ...     print(f"Extracted {len(text)} characters")
+    """
+    logger.info(f"Extracting data from file: {file_path}")
+
+    # Validate file exists
+    if not os.path.exists(file_path):
+        error_msg = f"Error: File does not exist. {file_path}"
+        logger.error(error_msg)
+        return error_msg
+
+    cache = extraction_cache.get_extraction_cache()
+    key = None
+    if cache is not None:
+        try:
+            key = _cache_key(file_path, digest)
+            cached = cache.get(key)
+            if cached is not None:
+                logger.info(f"Extraction cache hit ({cached.method}, {len(cached.markdown)} chars)")
+                return cached.markdown
+        except OSError as e:
+            logger.warning(f"Extraction cache lookup failed: {e}")
+
+    extracted, cacheable = _extract(file_path)
+    if extracted is not None:
+        if key is not None and cacheable:
+            cache.set(key, extracted)
+        elif key is not None:
+            logger.warning("Fallback extraction is incomplete or Docling was unavailable; not caching it")
+        return extracted.markdown
 
     # --- FINAL FAILURE ---
     logger.error("All parsing methods failed.")
@@ -224,3 +334,29 @@ def extract_data_from_file(file_path: str) -> str:
         "Try uploading a scanned image (PNG/JPG) of each page instead."
     )
 
+
+def load_docling_document(file_path: str, digest: Optional[str] = None) -> Optional[DoclingDocument]:
+    """
+    Return the structured Docling document of a file for further exports.
+
+    Served from the extraction cache when the file was parsed before;
+    otherwise the file is extracted (and cached) first. Returns None when
+    the text came from the OCR fallback or extraction failed.
+    """
+    cache = extraction_cache.get_extraction_cache()
+    if cache is None:
+        try:
+            _, document_json = _convert(file_path)
+        except Exception as e:
+            logger.error(f"Docling conversion failed: {e}", exc_info=True)
+            return None
+        return DoclingDocument.model_validate_json(document_json) if document_json else None
+
+    key = _cache_key(file_path, digest)
+    cached = cache.get(key)
+    if cached is None:
+        extract_data_from_file(file_path, digest)
+        cached = cache.get(key)
+    if cached is None or cached.document_json is None:
+        return None
+    return DoclingDocument.model_validate_json(cached.document_json)
@@ -1,64 +1,271 @@
+import asyncio
+import contextlib
 import logging
 import os
+import re
 import ollama
-from typing import List, Dict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from app.services import parser_service
+from app.services import llm_cache
+from app.services.guardrails import GuardrailEngine
+from app.services.lab_extractor import extract_lab_values, format_lab_table, lab_records_from_dicts
+from app.services.llm_budget import budget_options, ctx_buckets, estimate_prompt_tokens
+from app.services.ollama_client import AdmissionRejected, achat, achat_stream, run_sync
+from app.services.ollama_router import get_router
+from app.utils.text_utils import chunk_markdown
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 # Use local Ollama model for summarization rather than loading heavy transformers
 # This keeps the service lightweight and delegates model serving to Ollama.
+#
+# Every generator is implemented as a coroutine (`agenerate_*`) on top of the
+# pooled async Ollama client; the historical synchronous names are thin
+# wrappers kept for worker threads and scripts. The patient and clinician
+# summaries also have `astream_*` variants that yield model tokens as they
+# are generated, for the chat UI.
+
+# Bump whenever _guardrail_validator changes so cached outputs produced under
+# the old rules are not served again.
+GUARDRAIL_VERSION = "1"
+
+
+# Summaries are never blocked: these patterns (plain substrings) only add a
+# disclaimer, unless the output already carries one
+SUMMARY_GUARDRAILS = GuardrailEngine({
+    "caution": [re.escape(p) for p in ('diagnos', 'prescrib', 'you have', 'take ', 'lol', 'omg')],
+})
+DISCLAIMER_PRESENT = GuardrailEngine({
+    "disclaimed": [re.escape(p) for p in ('consult a', 'i cannot provide a definitive diagnosis')],
+})
+
 
 def _guardrail_validator(text: str) -> str:
     # Basic guardrail checks to avoid diagnoses, prescriptions, or casual chat
-    prohibited = ['diagnos', 'prescrib', 'you have', 'take ', 'lol', 'omg']
-    for p in prohibited:
-        if p in text.lower():
-            logger.warning(f"Guardrail triggered for pattern: {p}")
-            # Instead of replacing the entire output with a canned disclaimer (which can be
-            # overly conservative), append a short disclaimer while preserving the model's
-            # analysis. This loosens the guardrail but keeps an explicit safety notice.
-            disclaimer = (
-                "\n\n[Disclaimer] I can help explain findings and what they might indicate, but I cannot provide a definitive diagnosis or prescribe medications. "
-                "Please consult a qualified healthcare professional for diagnosis and treatment."
-            )
-            # If the model output already contains the disclaimer text, avoid duplicating it.
-            if 'consult a' in text.lower() or 'i cannot provide a definitive diagnosis' in text.lower():
-                return text
-            return text + disclaimer
+    hit = SUMMARY_GUARDRAILS.check(text)
+    if hit is None:
+        return text
+    logger.warning(f"Guardrail triggered for pattern: {hit.text.lower()}")
+    # Instead of replacing the entire output with a canned disclaimer (which can be
+    # overly conservative), append a short disclaimer while preserving the model's
+    # analysis. This loosens the guardrail but keeps an explicit safety notice.
+    disclaimer = (
+        "\n\n[Disclaimer] I can help explain findings and what they might indicate, but I cannot provide a definitive diagnosis or prescribe medications. "
+        "Please consult a qualified healthcare professional for diagnosis and treatment."
+    )
+    # If the model output already contains the disclaimer text, avoid duplicating it.
+    if DISCLAIMER_PRESENT.check(text) is not None:
+        return text
+    return text + disclaimer
+
+
+LAB_VALUES_NOTE = (
+    "The lab values below were extracted from the document and flagged (↑ high / ↓ low / ✓ normal; % = deviation "
+    "from the violated reference bound) by a deterministic parser. Treat them as correct: do not re-extract or re-check "
+    "them, discuss the flagged results and mention normal results only as a group."
+)
+
+
+def _lab_table(text: str, lab_results: Optional[List[Dict]]) -> str:
+    """Markdown table of the precomputed lab values (extracted from `text` when not supplied), or ''."""
+    records = lab_records_from_dicts(lab_results) if lab_results is not None else extract_lab_values(text)
+    return format_lab_table(records) if records else ""
+
+
+def _with_lab_values(document: str, lab_table: str) -> str:
+    if not lab_table:
+        return document
+    return f"{LAB_VALUES_NOTE}\n\n{lab_table}\n\n{document}"
+
+
+async def _acomplete_cached(messages: List[Dict], options: Dict, caller: str, validate: bool = True) -> str:
+    """Run a deterministic summarizer prompt, serving repeats from the response cache.
+
+    Returns the guardrail-validated model output (raw output when `validate`
+    is False, for intermediate notes). Empty outputs are never cached.
+    `caller` tags the generation in LLM telemetry. `num_ctx`/`num_predict`
+    are sized to the prompt by `llm_budget.budget_options`.
+    """
+    options = budget_options(messages, options, caller)
+    cache = llm_cache.get_response_cache()
+    key = llm_cache.make_key(settings.MODEL_NAME, messages, options, GUARDRAIL_VERSION if validate else "raw")
+    if cache is not None:
+        cached = await cache.aget(key)
+        if cached is not None:
+            logger.info("LLM cache hit (%s...)", key[:12])
+            return cached
+
+    resp = await achat(model=settings.MODEL_NAME, messages=messages, options=options, caller=caller)
+    output = resp.get('message', {}).get('content', '').strip()
+    if validate:
+        output = _guardrail_validator(output)
+
+    if cache is not None and output.strip():
+        await cache.aset(key, output)
+    return output
+
+
+async def _astream_cached(messages: List[Dict], options: Dict, caller: str) -> AsyncIterator[str]:
+    """Streaming counterpart of `_acomplete_cached`.
+
+    Yields model tokens as they arrive (a cache hit in one piece), then the
+    guardrail disclaimer if the finished output needs one. The validated
+    output is cached under the same key as `_acomplete_cached`, so each
+    variant serves the other's repeats.
+    """
+    options = budget_options(messages, options, caller)
+    cache = llm_cache.get_response_cache()
+    key = llm_cache.make_key(settings.MODEL_NAME, messages, options, GUARDRAIL_VERSION)
+    if cache is not None:
+        cached = await cache.aget(key)
+        if cached is not None:
+            logger.info("LLM cache hit (%s...)", key[:12])
+            yield cached
+            return
+
+    parts = []
+    # Leaving early (client gone) closes the stream and cancels the generation
+    async with contextlib.aclosing(
+        achat_stream(model=settings.MODEL_NAME, messages=messages, options=options, caller=caller)
+    ) as stream:
+        async for chunk in stream:
+            token = chunk['message']['content']
+            if token:
+                parts.append(token)
+                yield token
+
+    output = "".join(parts).strip()
+    validated = _guardrail_validator(output)
+    # The validator only ever appends a disclaimer
+    if len(validated) > len(output):
+        yield validated[len(output):]
+    if cache is not None and validated.strip():
+        await cache.aset(key, validated)
+
+
+# ----------------------------------------------------------------------------
+# Map-reduce for documents that do not fit a single prompt
+# ----------------------------------------------------------------------------
+#
+# Long documents are split on section/page boundaries, every chunk is
+# condensed into findings notes concurrently (map), and the generators below
+# then run their usual prompt over the notes (reduce). Chunk notes go through
+# the response cache, so a second view of the same document (patient, then
+# clinician) only pays for the final prompt.
+#
+# Environment Variables:
+# - SUMMARY_CHUNK_TOKENS: Size of a map chunk in estimated tokens (default: 1500)
+# - SUMMARY_MAP_CONCURRENCY: Chunks condensed at once (default: 2 per Ollama backend)
+
+CHUNK_NOTES_PROMPT = (
+    "You are extracting notes from one section of a longer medical document. "
+    "List every clinically relevant finding in this section as short bullet points. "
+    "Copy test names, numeric values, units, reference ranges and abnormal flags exactly as written. "
+    "Keep dates, medications and procedures that are mentioned. "
+    "Do not interpret, diagnose or add anything that is not in the text. "
+    "If the section has no clinical content, reply with 'No findings.'"
+)
+
+# Passes over the notes before giving up and letting the final prompt truncate
+MAX_REDUCE_ROUNDS = 3
+
+
+def _chunk_tokens() -> int:
+    return int(os.environ.get('SUMMARY_CHUNK_TOKENS', 1500))
+
+
+def _map_concurrency() -> int:
+    raw = os.environ.get('SUMMARY_MAP_CONCURRENCY')
+    return max(1, int(raw) if raw else 2 * len(get_router().hosts()))
+
+
+def _document_budget(system_prompt: str, num_predict: int) -> int:
+    """Tokens left for the document once the system prompt and the output are reserved."""
+    reserved = estimate_prompt_tokens([{"role": "system", "content": system_prompt}]) + num_predict + 100
+    return max(_chunk_tokens(), ctx_buckets()[-1] - reserved)
+
+
+async def _acondense_chunk(chunk: str, index: int, total: int, language: str, slots: asyncio.Semaphore) -> str:
+    messages = [
+        {"role": "system", "content": CHUNK_NOTES_PROMPT},
+        {"role": "user", "content": f"Section {index + 1} of {total} (write the notes in {language}):\n\n{chunk}"},
+    ]
+    async with slots:
+        try:
+            return await _acomplete_cached(messages, {"temperature": 0.0, "num_predict": 400}, "chunk_notes", validate=False)
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            # Keep the content: the next round (or the final prompt) still sees it
+            logger.warning(f"Condensing chunk {index + 1}/{total} failed, keeping it verbatim: {e}")
+            return chunk
+
+
+async def acondense_document(text: str, language: str = 'English', max_tokens: int = None) -> str:
+    """Map-reduce `text` down to at most ~max_tokens of findings notes.
+
+    Returns the text unchanged when it already fits. Otherwise it is split
+    with `chunk_markdown`, chunks are condensed concurrently (at most
+    SUMMARY_MAP_CONCURRENCY at a time) and the notes are joined in document
+    order, repeating on the notes while they are still too long.
+    """
+    max_tokens = max_tokens or _chunk_tokens()
+    size = estimate_prompt_tokens([{"role": "user", "content": text}])
+    rounds = 0
+    while size > max_tokens and rounds < MAX_REDUCE_ROUNDS:
+        rounds += 1
+        chunks = chunk_markdown(text, min(max_tokens, _chunk_tokens()))
+        logger.info(f"Condensing document (~{size} tokens) in {len(chunks)} chunks, round {rounds}")
+        slots = asyncio.Semaphore(_map_concurrency())
+        notes = await asyncio.gather(*(
+            _acondense_chunk(chunk, i, len(chunks), language, slots) for i, chunk in enumerate(chunks)
+        ))
+        condensed = "\n\n".join(f"## Part {i + 1}\n{note}" for i, note in enumerate(notes))
+        new_size = estimate_prompt_tokens([{"role": "user", "content": condensed}])
+        if new_size >= size:
+            logger.warning("Condensing no longer shrinks the document (~%d tokens); using it as is", new_size)
+            break
+        text, size = condensed, new_size
     return text
 
 
-def generate_summary_from_text(text: str, language: str = 'English') -> str:
-    """Generate a concise summary using Ollama chat model."""
+async def agenerate_summary_from_text(text: str, language: str = 'English', lab_results: Optional[List[Dict]] = None) -> str:
+    """Generate a concise summary using Ollama chat model.
+
+    `lab_results` are the stored `Report.lab_results`; when omitted they are
+    extracted from `text`.
+    """
     logger.info(f"Generating summary via Ollama (text length={len(text)})")
     try:
+        lab_table = _lab_table(text, lab_results)
         system_prompt = (
             "You are a concise, professional medical assistant. Summarize the following extracted text from a medical report in "
             f"{language}. Do not diagnose or prescribe. Keep it clear and patient-friendly. Aim for 2-4 short sentences suitable for a patient."
         )
+        text = await acondense_document(text, language, _document_budget(system_prompt + lab_table, 200))
 
         messages = [
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": text}
+            {"role": "user", "content": _with_lab_values(text, lab_table)}
         ]
 
-        from app.services.ollama_client import chat_with_retries
-        resp = chat_with_retries(
-            model=settings.MODEL_NAME,
-            messages=messages,
-            options={"temperature": 0.0, "num_predict": 200}
-        )
-        summary = resp.get('message', {}).get('content', '')
-        return _guardrail_validator(summary)
+        return await _acomplete_cached(messages, {"temperature": 0.0, "num_predict": 200}, "text_summary")
+    except AdmissionRejected:
+        # Load shedding: surface as 503 instead of degrading to a fallback
+        raise
     except Exception as e:
         logger.error(f"Ollama summarization failed: {e}", exc_info=True)
         # Fallback: return short snippet
         return (text.strip().replace('\n', ' ')[:300] + '...')
 
 
-def generate_summary_from_image(image_path: str, language: str) -> str:
+def generate_summary_from_text(text: str, language: str = 'English', lab_results: Optional[List[Dict]] = None) -> str:
+    """Synchronous wrapper around `agenerate_summary_from_text`."""
+    return run_sync(agenerate_summary_from_text(text, language, lab_results))
+
+
+async def agenerate_summary_from_image(image_path: str, language: str) -> str:
     """
     Analyze medical image directly using MedGemma VLM (Vision-Language Model).
     MedGemma can process images directly without needing text extraction.
@@ -82,14 +289,14 @@ def generate_summary_from_image(image_path: str, language: str) -> str:
             }
         ]
 
-        from app.services.ollama_client import chat_with_retries
-        resp = chat_with_retries(
+        resp = await achat(
             model=settings.MODEL_NAME,  # Use configured MedGemma model
             messages=messages,
-            options={
+            options=budget_options(messages, {
                 "temperature": 0.3,  # Lower temperature for more focused medical analysis
                 "num_predict": 300
-            }
+            }, "vlm_image"),
+            caller="vlm_image",
         )
 
         analysis = resp.get('message', {}).get('content', '')
@@ -98,21 +305,76 @@ def generate_summary_from_image(image_path: str, language: str) -> str:
         # Apply guardrails to the response
         return _guardrail_validator(analysis)
 
+    except AdmissionRejected:
+        # Load shedding: surface as 503 instead of degrading to a fallback
+        raise
     except Exception as e:
         logger.error(f"MedGemma VLM analysis failed: {e}", exc_info=True)
         # Fallback to text extraction if VLM fails
         logger.info("Falling back to text extraction method")
         try:
-            extracted = parser_service.extract_data_from_file(image_path)
+            extracted = await asyncio.to_thread(parser_service.extract_data_from_file, image_path)
             if extracted.startswith('Error:'):
                 return extracted
-            return generate_summary_from_text(extracted, language)
+            return await agenerate_summary_from_text(extracted, language)
         except Exception as fallback_error:
             logger.error(f"Fallback text extraction also failed: {fallback_error}")
             return f"Error: Could not analyze image. {str(e)}"
 
 
-def generate_patient_summary_from_text(text: str, language: str = 'English') -> str:
+def generate_summary_from_image(image_path: str, language: str) -> str:
+    """Synchronous wrapper around `agenerate_summary_from_image`."""
+    return run_sync(agenerate_summary_from_image(image_path, language))
+
+
+# Allow more length for structured format
+PATIENT_SUMMARY_OPTIONS = {"temperature": 0.2, "num_predict": 500}
+
+
+async def _patient_summary_messages(text: str, language: str, lab_table: str) -> List[Dict]:
+    """Build the patient summary prompt (shared by the blocking and streaming variants)."""
+    system_prompt = (
+        f"You are a medical assistant writing a friendly, easy-to-read summary for a patient in {language}.\n\n"
+        "**Instructions:**\n"
+        "1. Start with a clear heading like '📋 Your Test Results Summary'\n"
+        "2. Extract the key test name and values from the report\n"
+        "3. Explain what the test measures in simple terms\n"
+        "4. State if the results are within normal range or not (in plain language)\n"
+        "5. Provide a brief, general explanation of what this might indicate\n"
+        "6. Give one simple health tip or next step (but NO medications)\n"
+        "7. End with a reminder to discuss with their healthcare provider\n\n"
+        "**Format Requirements:**\n"
+        "- Use short paragraphs with line breaks for readability\n"
+        "- Use bullet points (•) for lists\n"
+        "- Use emojis sparingly for visual appeal (✓ for normal, ⚠️ for attention needed)\n"
+        "- Avoid medical jargon or explain it in parentheses\n"
+        "- Be reassuring but honest\n"
+        "- NEVER diagnose or prescribe medications\n\n"
+        "**Example Format:**\n"
+        "📋 Your Test Results Summary\n\n"
+        "Test Name: [Extract from report]\n"
+        "Your Result: [Value] [Unit]\n"
+        "Normal Range: [Reference range]\n\n"
+        "What This Means:\n"
+        "[Plain language explanation of what this test measures]\n\n"
+        "Your Results:\n"
+        "✓ Your levels are within the normal range / ⚠️ Your levels are [higher/lower] than the normal range\n\n"
+        "What to Know:\n"
+        "[Brief, non-diagnostic context about what this generally indicates]\n\n"
+        "Next Steps:\n"
+        "• [Simple health tip or monitoring suggestion]\n"
+        "• Discuss these results with your healthcare provider for personalized advice\n\n"
+        "Remember: This is a simplified summary. Your doctor can provide a complete interpretation and personalized recommendations."
+    )
+    text = await acondense_document(text, language, _document_budget(system_prompt + lab_table, 500))
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Create a patient-friendly summary of this medical report:\n\n{_with_lab_values(text, lab_table)}"}
+    ]
+
+
+async def agenerate_patient_summary_from_text(text: str, language: str = 'English', lab_results: Optional[List[Dict]] = None) -> str:
     """Generate a patient-facing summary in clear, readable format.
 
     Goals:
@@ -123,63 +385,192 @@ def generate_patient_summary_from_text(text: str, language: str = 'English') ->
     Constraints:
       - No definitive diagnoses or medication instructions.
       - Avoid jargon unless briefly explained in parentheses.
+
+    Precomputed `lab_results` (extracted from `text` when omitted) are given
+    to the model so it does not have to extract and range-check values itself.
     """
     logger.info(f"Generating patient summary (expanded) via Ollama (text length={len(text)})")
     try:
-        system_prompt = (
-            f"You are a medical assistant writing a friendly, easy-to-read summary for a patient in {language}.\n\n"
-            "**Instructions:**\n"
-            "1. Start with a clear heading like '📋 Your Test Results Summary'\n"
-            "2. Extract the key test name and values from the report\n"
-            "3. Explain what the test measures in simple terms\n"
-            "4. State if the results are within normal range or not (in plain language)\n"
-            "5. Provide a brief, general explanation of what this might indicate\n"
-            "6. Give one simple health tip or next step (but NO medications)\n"
-            "7. End with a reminder to discuss with their healthcare provider\n\n"
-            "**Format Requirements:**\n"
-            "- Use short paragraphs with line breaks for readability\n"
-            "- Use bullet points (•) for lists\n"
-            "- Use emojis sparingly for visual appeal (✓ for normal, ⚠️ for attention needed)\n"
-            "- Avoid medical jargon or explain it in parentheses\n"
-            "- Be reassuring but honest\n"
-            "- NEVER diagnose or prescribe medications\n\n"
-            "**Example Format:**\n"
-            "📋 Your Test Results Summary\n\n"
-            "Test Name: [Extract from report]\n"
-            "Your Result: [Value] [Unit]\n"
-            "Normal Range: [Reference range]\n\n"
-            "What This Means:\n"
-            "[Plain language explanation of what this test measures]\n\n"
-            "Your Results:\n"
-            "✓ Your levels are within the normal range / ⚠️ Your levels are [higher/lower] than the normal range\n\n"
-            "What to Know:\n"
-            "[Brief, non-diagnostic context about what this generally indicates]\n\n"
-            "Next Steps:\n"
-            "• [Simple health tip or monitoring suggestion]\n"
-            "• Discuss these results with your healthcare provider for personalized advice\n\n"
-            "Remember: This is a simplified summary. Your doctor can provide a complete interpretation and personalized recommendations."
-        )
+        lab_table = _lab_table(text, lab_results)
+        messages = await _patient_summary_messages(text, language, lab_table)
+        return await _acomplete_cached(messages, PATIENT_SUMMARY_OPTIONS, "patient_summary")
+    except AdmissionRejected:
+        # Load shedding: surface as 503 instead of degrading to a fallback
+        raise
+    except Exception as e:
+        logger.error(f"Expanded patient summary generation failed: {e}", exc_info=True)
+        return await agenerate_summary_from_text(text, language, lab_results)
 
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Create a patient-friendly summary of this medical report:\n\n{text}"}
-        ]
 
-        from app.services.ollama_client import chat_with_retries
-        resp = chat_with_retries(
-            model=settings.MODEL_NAME,
-            messages=messages,
-            options={"temperature": 0.2, "num_predict": 500}  # Allow more length for structured format
-        )
+def generate_patient_summary_from_text(text: str, language: str = 'English', lab_results: Optional[List[Dict]] = None) -> str:
+    """Synchronous wrapper around `agenerate_patient_summary_from_text`."""
+    return run_sync(agenerate_patient_summary_from_text(text, language, lab_results))
 
-        summary = resp.get('message', {}).get('content', '')
-        return _guardrail_validator(summary.strip())
-    except Exception as e:
-        logger.error(f"Expanded patient summary generation failed: {e}", exc_info=True)
-        return generate_summary_from_text(text, language)
 
+async def astream_patient_summary_from_text(
+    text: str, language: str = 'English', lab_results: Optional[List[Dict]] = None
+) -> AsyncIterator[str]:
+    """Stream the patient summary of `agenerate_patient_summary_from_text` token by token.
 
-def generate_detailed_report_from_text(text: str, language: str = 'English') -> str:
+    If the generation fails before its first token, the short text summary
+    is yielded instead; later failures are raised to the caller.
+    """
+    logger.info(f"Streaming patient summary via Ollama (text length={len(text)})")
+    started = False
+    try:
+        lab_table = _lab_table(text, lab_results)
+        messages = await _patient_summary_messages(text, language, lab_table)
+        async for token in _astream_cached(messages, PATIENT_SUMMARY_OPTIONS, "patient_summary"):
+            started = True
+            yield token
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        if started:
+            raise
+        logger.error(f"Streaming patient summary failed: {e}", exc_info=True)
+        yield await agenerate_summary_from_text(text, language, lab_results)
+
+
+async def _clinician_report_messages(text: str, language: str, lab_table: str) -> Tuple[List[Dict], Dict]:
+    """Build the single-generation clinician report prompt and its options."""
+    system_prompt = (
+        f"You are an advanced clinical decision support assistant creating a comprehensive, structured medical report for healthcare professionals in {language}.\n\n"
+        
+        "**CRITICAL INSTRUCTIONS:**\n"
+        "You MUST create a detailed, well-structured report using the EXACT format and sections below. Each section is MANDATORY.\n\n"
+        
+        "**REQUIRED REPORT STRUCTURE:**\n\n"
+        
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+        "📊 CLINICAL ANALYSIS REPORT\n"
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        
+        "## 1️⃣ EXECUTIVE SUMMARY\n"
+        "[Provide a 2-3 sentence high-level overview of the report type, key findings, and overall clinical picture]\n\n"
+        
+        "## 2️⃣ KEY LABORATORY/DIAGNOSTIC RESULTS\n"
+        "[Extract and present ALL test values in structured format. For EACH result include:]\n"
+        "• **Test Name:** [Full name]\n"
+        "  - Result: [Numeric value] [Unit]\n"
+        "  - Reference Range: [Lower limit - Upper limit] [Unit]\n"
+        "  - Status: [Normal ✓ / Elevated ↑ / Decreased ↓ / Critical ⚠️]\n"
+        "  - Deviation: [If abnormal, calculate % above/below reference range]\n\n"
+        "[If multiple tests, list each one separately with clear visual separation]\n\n"
+        
+        "## 3️⃣ INTERPRETIVE CONTEXT & PATHOPHYSIOLOGY\n"
+        "[Provide detailed scientific context WITHOUT diagnosing:]\n"
+        "• **Biological Significance:**\n"
+        "  - What does this marker/parameter measure at the molecular/cellular level?\n"
+        "  - What physiological processes does it reflect?\n"
+        "  - What mechanisms could cause elevation/reduction?\n\n"
+        "• **Clinical Correlations:**\n"
+        "  - What clinical conditions are COMMONLY associated with these patterns?\n"
+        "  - What are the differential considerations? (List 3-5 possibilities)\n"
+        "  - Are there any patterns across multiple markers?\n\n"
+        "• **Contextual Factors:**\n"
+        "  - Age/demographic considerations if relevant\n"
+        "  - Temporal trends if multiple values present\n"
+        "  - Potential confounding factors (medications, diet, timing)\n\n"
+        
+        "## 4️⃣ CLINICAL SIGNIFICANCE & RISK STRATIFICATION\n"
+        "[Categorize findings based on clinical importance:]\n\n"
+        "**🟢 Normal/Low Risk Findings:**\n"
+        "• [List parameters within expected ranges]\n"
+        "• Clinical Implication: [Brief explanation]\n\n"
+        
+        "**🟡 Borderline/Moderate Risk Findings:**\n"
+        "• [List parameters slightly outside reference but not critical]\n"
+        "• Clinical Implication: [Explain significance and monitoring needs]\n\n"
+        
+        "**🔴 Abnormal/High Risk Findings:**\n"
+        "• [List significantly abnormal values]\n"
+        "• Clinical Implication: [Explain urgency and potential clinical impact]\n"
+        "• Action Threshold: [Indicate if values cross critical decision points]\n\n"
+        
+        "**⚡ Critical/Immediate Attention:**\n"
+        "• [List any life-threatening values if present]\n"
+        "• Immediate Considerations: [What requires urgent evaluation]\n\n"
+        
+        "## 5️⃣ DATA QUALITY & LIMITATIONS\n"
+        "[Critically assess the report quality:]\n"
+        "• **Completeness:** [Are all expected values present? Any missing tests?]\n"
+        "• **Methodology:** [Test method noted? Any limitations of technique?]\n"
+        "• **Specimen Quality:** [Any collection/handling issues noted?]\n"
+        "• **OCR/Data Extraction:** [Any unclear values or potential transcription errors?]\n"
+        "• **Uncertainty Factors:** [What clinical context is missing?]\n\n"
+        
+        "## 6️⃣ RECOMMENDED FOLLOW-UP ACTIONS\n"
+        "[Evidence-based next steps WITHOUT prescribing:]\n\n"
+        "**Immediate Actions (0-24 hours):**\n"
+        "• [List any urgent evaluations needed]\n\n"
+        
+        "**Short-term Follow-up (1-4 weeks):**\n"
+        "• [Recommended repeat testing or additional investigations]\n"
+        "• [Clinical correlation needed with symptoms/history]\n\n"
+        
+        "**Long-term Monitoring:**\n"
+        "• [Ongoing surveillance recommendations]\n"
+        "• [Frequency of repeat testing based on current findings]\n\n"
+        
+        "**Additional Diagnostic Workup (if indicated):**\n"
+        "• [Complementary tests that would provide additional context]\n"
+        "• [Imaging or specialized studies to consider]\n\n"
+        
+        "**Patient Education/Lifestyle:**\n"
+        "• [General health recommendations relevant to findings]\n"
+        "• [Monitoring guidance for patient]\n\n"
+        
+        "## 7️⃣ CLINICAL PEARLS & EDUCATION POINTS\n"
+        "[Provide educational context for clinicians:]\n\n"
+        "**Technical Terminology:**\n"
+        "• [Define any complex medical terms with brief explanations]\n\n"
+        
+        "**Clinical Pearls:**\n"
+        "• [Important practice points or common pitfalls to avoid]\n"
+        "• [Evidence-based insights related to these findings]\n\n"
+        
+        "**Reference Standards:**\n"
+        "• [Note if reference ranges are population-specific]\n"
+        "• [Mention any recent guideline updates relevant to interpretation]\n\n"
+        
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+        "**DISCLAIMER:** This analysis is for informational and educational purposes only. It does NOT constitute a diagnosis, treatment recommendation, or replace clinical judgment. All findings must be interpreted in the context of complete patient history, physical examination, and additional clinical data. Consult appropriate specialists as needed.\n"
+        "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+        
+        "**FORMATTING REQUIREMENTS:**\n"
+        "- Use markdown formatting with headers (##), bold (**), and bullet points (•)\n"
+        "- Use emojis for visual hierarchy (numbers, symbols, indicators)\n"
+        "- Include actual numeric values with units\n"
+        "- Calculate deviations from reference ranges when abnormal\n"
+        "- Use clinical terminology appropriate for healthcare professionals\n"
+        "- Be comprehensive but organized - use subsections liberally\n"
+        "- NEVER provide definitive diagnoses or medication prescriptions\n"
+        "- Always acknowledge uncertainty and need for clinical correlation\n"
+    )
+    # The results table is inserted afterwards, so section 2 needs far fewer tokens
+    num_predict = 1600 if lab_table else 2000
+    text = await acondense_document(text, language, _document_budget(system_prompt + lab_table, num_predict))
+
+    user_prompt = (
+        "Generate a comprehensive clinical analysis report from the following medical document.\n"
+        "Follow the EXACT structure provided in the system prompt. Each section MUST be present and detailed.\n\n"
+        + _with_lab_values("---BEGIN MEDICAL DOCUMENT---\n" + text + "\n---END MEDICAL DOCUMENT---\n\n", lab_table)
+        + ("In section 2, do NOT list the individual results: the table above is inserted there automatically. "
+           "Only add the notes on the flagged results.\n" if lab_table else "")
+        + "Create the full structured report now, ensuring ALL 7 sections are thoroughly completed:"
+    )
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+    # Much longer for comprehensive report
+    return messages, {"temperature": 0.1, "num_predict": num_predict}
+
+
+async def agenerate_detailed_report_from_text(text: str, language: str = 'English', lab_results: Optional[List[Dict]] = None) -> str:
     """Generate an expanded structured clinician-facing report with deeper comprehension.
 
     Sections (in this order):
@@ -196,151 +587,242 @@ def generate_detailed_report_from_text(text: str, language: str = 'English') ->
       - Prefer concise bullet points over long prose.
       - If no numeric values found, still produce Key Results with qualitative findings.
       - If reference ranges appear, format: VALUE (Ref: X–Y).
+
+    When lab values are available (`lab_results`, or extracted from `text`),
+    the Key Results table is inserted from them instead of being generated.
     """
     logger.info(f"Generating expanded clinician report via Ollama (text length={len(text)})")
     try:
-        system_prompt = (
-            f"You are an advanced clinical decision support assistant creating a comprehensive, structured medical report for healthcare professionals in {language}.\n\n"
-            
-            "**CRITICAL INSTRUCTIONS:**\n"
-            "You MUST create a detailed, well-structured report using the EXACT format and sections below. Each section is MANDATORY.\n\n"
-            
-            "**REQUIRED REPORT STRUCTURE:**\n\n"
-            
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-            "📊 CLINICAL ANALYSIS REPORT\n"
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-            
-            "## 1️⃣ EXECUTIVE SUMMARY\n"
-            "[Provide a 2-3 sentence high-level overview of the report type, key findings, and overall clinical picture]\n\n"
-            
-            "## 2️⃣ KEY LABORATORY/DIAGNOSTIC RESULTS\n"
-            "[Extract and present ALL test values in structured format. For EACH result include:]\n"
-            "• **Test Name:** [Full name]\n"
-            "  - Result: [Numeric value] [Unit]\n"
-            "  - Reference Range: [Lower limit - Upper limit] [Unit]\n"
-            "  - Status: [Normal ✓ / Elevated ↑ / Decreased ↓ / Critical ⚠️]\n"
-            "  - Deviation: [If abnormal, calculate % above/below reference range]\n\n"
-            "[If multiple tests, list each one separately with clear visual separation]\n\n"
-            
-            "## 3️⃣ INTERPRETIVE CONTEXT & PATHOPHYSIOLOGY\n"
-            "[Provide detailed scientific context WITHOUT diagnosing:]\n"
-            "• **Biological Significance:**\n"
-            "  - What does this marker/parameter measure at the molecular/cellular level?\n"
-            "  - What physiological processes does it reflect?\n"
-            "  - What mechanisms could cause elevation/reduction?\n\n"
-            "• **Clinical Correlations:**\n"
-            "  - What clinical conditions are COMMONLY associated with these patterns?\n"
-            "  - What are the differential considerations? (List 3-5 possibilities)\n"
-            "  - Are there any patterns across multiple markers?\n\n"
-            "• **Contextual Factors:**\n"
-            "  - Age/demographic considerations if relevant\n"
-            "  - Temporal trends if multiple values present\n"
-            "  - Potential confounding factors (medications, diet, timing)\n\n"
-            
-            "## 4️⃣ CLINICAL SIGNIFICANCE & RISK STRATIFICATION\n"
-            "[Categorize findings based on clinical importance:]\n\n"
-            "**🟢 Normal/Low Risk Findings:**\n"
-            "• [List parameters within expected ranges]\n"
-            "• Clinical Implication: [Brief explanation]\n\n"
-            
-            "**🟡 Borderline/Moderate Risk Findings:**\n"
-            "• [List parameters slightly outside reference but not critical]\n"
-            "• Clinical Implication: [Explain significance and monitoring needs]\n\n"
-            
-            "**🔴 Abnormal/High Risk Findings:**\n"
-            "• [List significantly abnormal values]\n"
-            "• Clinical Implication: [Explain urgency and potential clinical impact]\n"
-            "• Action Threshold: [Indicate if values cross critical decision points]\n\n"
-            
-            "**⚡ Critical/Immediate Attention:**\n"
-            "• [List any life-threatening values if present]\n"
-            "• Immediate Considerations: [What requires urgent evaluation]\n\n"
-            
-            "## 5️⃣ DATA QUALITY & LIMITATIONS\n"
-            "[Critically assess the report quality:]\n"
-            "• **Completeness:** [Are all expected values present? Any missing tests?]\n"
-            "• **Methodology:** [Test method noted? Any limitations of technique?]\n"
-            "• **Specimen Quality:** [Any collection/handling issues noted?]\n"
-            "• **OCR/Data Extraction:** [Any unclear values or potential transcription errors?]\n"
-            "• **Uncertainty Factors:** [What clinical context is missing?]\n\n"
-            
-            "## 6️⃣ RECOMMENDED FOLLOW-UP ACTIONS\n"
-            "[Evidence-based next steps WITHOUT prescribing:]\n\n"
-            "**Immediate Actions (0-24 hours):**\n"
-            "• [List any urgent evaluations needed]\n\n"
-            
-            "**Short-term Follow-up (1-4 weeks):**\n"
-            "• [Recommended repeat testing or additional investigations]\n"
-            "• [Clinical correlation needed with symptoms/history]\n\n"
-            
-            "**Long-term Monitoring:**\n"
-            "• [Ongoing surveillance recommendations]\n"
-            "• [Frequency of repeat testing based on current findings]\n\n"
-            
-            "**Additional Diagnostic Workup (if indicated):**\n"
-            "• [Complementary tests that would provide additional context]\n"
-            "• [Imaging or specialized studies to consider]\n\n"
-            
-            "**Patient Education/Lifestyle:**\n"
-            "• [General health recommendations relevant to findings]\n"
-            "• [Monitoring guidance for patient]\n\n"
-            
-            "## 7️⃣ CLINICAL PEARLS & EDUCATION POINTS\n"
-            "[Provide educational context for clinicians:]\n\n"
-            "**Technical Terminology:**\n"
-            "• [Define any complex medical terms with brief explanations]\n\n"
-            
-            "**Clinical Pearls:**\n"
-            "• [Important practice points or common pitfalls to avoid]\n"
-            "• [Evidence-based insights related to these findings]\n\n"
-            
-            "**Reference Standards:**\n"
-            "• [Note if reference ranges are population-specific]\n"
-            "• [Mention any recent guideline updates relevant to interpretation]\n\n"
-            
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-            "**DISCLAIMER:** This analysis is for informational and educational purposes only. It does NOT constitute a diagnosis, treatment recommendation, or replace clinical judgment. All findings must be interpreted in the context of complete patient history, physical examination, and additional clinical data. Consult appropriate specialists as needed.\n"
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-            
-            "**FORMATTING REQUIREMENTS:**\n"
-            "- Use markdown formatting with headers (##), bold (**), and bullet points (•)\n"
-            "- Use emojis for visual hierarchy (numbers, symbols, indicators)\n"
-            "- Include actual numeric values with units\n"
-            "- Calculate deviations from reference ranges when abnormal\n"
-            "- Use clinical terminology appropriate for healthcare professionals\n"
-            "- Be comprehensive but organized - use subsections liberally\n"
-            "- NEVER provide definitive diagnoses or medication prescriptions\n"
-            "- Always acknowledge uncertainty and need for clinical correlation\n"
-        )
-
-        user_prompt = (
-            "Generate a comprehensive clinical analysis report from the following medical document.\n"
-            "Follow the EXACT structure provided in the system prompt. Each section MUST be present and detailed.\n\n"
-            "---BEGIN MEDICAL DOCUMENT---\n" + text + "\n---END MEDICAL DOCUMENT---\n\n"
-            "Create the full structured report now, ensuring ALL 7 sections are thoroughly completed:"
-        )
-
+        if clinician_report_mode() == 'sections':
+            return await agenerate_detailed_report_sections(text, language, lab_results)
+
+        lab_table = _lab_table(text, lab_results)
+        messages, options = await _clinician_report_messages(text, language, lab_table)
+        report = await _acomplete_cached(messages, options, "clinician_report")
+        return _insert_lab_table(report, lab_table)
+    except AdmissionRejected:
+        # Load shedding: surface as 503 instead of degrading to a fallback
+        raise
+    except Exception as e:
+        logger.error(f"Expanded clinician report generation failed: {e}", exc_info=True)
+        return await agenerate_summary_from_text(text, language, lab_results)
+
+
+# ----------------------------------------------------------------------------
+# Section-wise clinician report
+# ----------------------------------------------------------------------------
+#
+# The seven report sections are generated as independent prompts that are
+# scheduled concurrently (admission control and the router spread them over
+# the available Ollama slots), so the report takes about as long as its
+# slowest section instead of one 2000-token generation. Every section prompt
+# starts with the same system prompt and document, so the backend can reuse
+# the evaluated prefix.
+#
+# Environment Variables:
+# - CLINICIAN_REPORT_MODE: single | sections (default: single)
+
+CLINICIAN_SECTION_SYSTEM_PROMPT = (
+    "You are an advanced clinical decision support assistant writing one section of a structured medical report "
+    "for healthcare professionals in {language}. Use markdown with bold (**) and bullet points (•), include actual "
+    "numeric values with units and reference ranges, and be concise. NEVER provide definitive diagnoses or medication "
+    "prescriptions, and acknowledge uncertainty and the need for clinical correlation."
+)
+
+# (heading, instructions, num_predict) in report order
+CLINICIAN_REPORT_SECTIONS = (
+    ("1️⃣ EXECUTIVE SUMMARY",
+     "A 2-3 sentence high-level overview of the report type, key findings and overall clinical picture.", 150),
+    ("2️⃣ KEY LABORATORY/DIAGNOSTIC RESULTS",
+     "Every test with: Test Name, Result (value and unit), Reference Range, Status (Normal ✓ / Elevated ↑ / "
+     "Decreased ↓ / Critical ⚠️) and, if abnormal, the % deviation from the reference range.", 500),
+    ("3️⃣ INTERPRETIVE CONTEXT & PATHOPHYSIOLOGY",
+     "Biological significance of the markers, commonly associated clinical conditions and 3-5 differential "
+     "considerations, patterns across markers and contextual or confounding factors. Do not diagnose.", 400),
+    ("4️⃣ CLINICAL SIGNIFICANCE & RISK STRATIFICATION",
+     "Group findings under 🟢 Normal/Low Risk, 🟡 Borderline/Moderate Risk, 🔴 Abnormal/High Risk and "
+     "⚡ Critical/Immediate Attention, each with its clinical implication.", 350),
+    ("5️⃣ DATA QUALITY & LIMITATIONS",
+     "Completeness, methodology, specimen quality, OCR/data extraction issues and missing clinical context.", 200),
+    ("6️⃣ RECOMMENDED FOLLOW-UP ACTIONS",
+     "Immediate (0-24 hours), short-term (1-4 weeks) and long-term follow-up, additional diagnostic workup and "
+     "patient education, without prescribing.", 350),
+    ("7️⃣ CLINICAL PEARLS & EDUCATION POINTS",
+     "Definitions of technical terms, clinical pearls and pitfalls, and notes on reference standards.", 250),
+)
+
+# Index of the section rendered from precomputed lab values when available
+KEY_RESULTS_SECTION = 1
+
+CLINICIAN_REPORT_HEADER = (
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+    "📊 CLINICAL ANALYSIS REPORT\n"
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+)
+
+CLINICIAN_REPORT_FOOTER = (
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+    "**DISCLAIMER:** This analysis is for informational and educational purposes only. It does NOT constitute a "
+    "diagnosis, treatment recommendation, or replace clinical judgment. All findings must be interpreted in the "
+    "context of complete patient history, physical examination, and additional clinical data. Consult appropriate "
+    "specialists as needed.\n"
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+)
+
+
+# The section heading only ("## 2️⃣ KEY LABORATORY/DIAGNOSTIC RESULTS", "**2. Key Results**"),
+# never a prose line that happens to mention key results
+_KEY_RESULTS_HEADING = re.compile(
+    r"^[ \t]*(?:#+[ \t]*)?(?:\*\*)?[ \t]*(?:\d\ufe0f?\u20e3?[.)]?[ \t]*)?"
+    r"KEY (?:LABORATORY\b[^.\n]*?)?RESULTS\b[^.\n]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def _insert_lab_table(report: str, lab_table: str) -> str:
+    """Put the precomputed results table under the Key Results heading (appended if the model dropped it)."""
+    if not lab_table:
+        return report
+    match = _KEY_RESULTS_HEADING.search(report)
+    if match is None:
+        return f"{report}\n\n**Extracted lab values**\n{lab_table}"
+    return f"{report[:match.end()]}\n{lab_table}\n{report[match.end():]}"
+
+
+def clinician_report_mode() -> str:
+    return os.environ.get('CLINICIAN_REPORT_MODE', 'single').strip().lower()
+
+
+def _assemble_clinician_report(sections: Dict[int, str]) -> str:
+    """Join the finished sections in report order; the disclaimer is added once all are present."""
+    parts = [CLINICIAN_REPORT_HEADER] + [sections[i] for i in sorted(sections)]
+    if len(sections) == len(CLINICIAN_REPORT_SECTIONS):
+        parts.append(CLINICIAN_REPORT_FOOTER)
+    return _guardrail_validator("\n\n".join(parts))
+
+
+async def astream_detailed_report_sections(
+    text: str, language: str = 'English', lab_results: Optional[List[Dict]] = None
+) -> AsyncIterator[str]:
+    """Generate the clinician report section by section, concurrently.
+
+    Yields the report assembled so far (sections in report order) each time a
+    section completes, so callers can show progress before the slowest
+    section is done. The last value is the complete report. A section that
+    fails is replaced by a short notice instead of failing the report. When
+    lab values are available, the Key Results section is their precomputed
+    table and needs no model call.
+    """
+    system_prompt = CLINICIAN_SECTION_SYSTEM_PROMPT.format(language=language)
+    lab_table = _lab_table(text, lab_results)
+    longest = max(num_predict for _, _, num_predict in CLINICIAN_REPORT_SECTIONS)
+    text = await acondense_document(text, language, _document_budget(system_prompt + lab_table, longest))
+    # Shared by every section prompt; only the trailing instruction differs
+    document_prefix = (
+        "Generate one section of a clinical analysis report from the following medical document.\n\n"
+        + _with_lab_values("---BEGIN MEDICAL DOCUMENT---\n" + text + "\n---END MEDICAL DOCUMENT---\n\n", lab_table)
+    )
+
+    async def _section(index: int, heading: str, instructions: str, num_predict: int):
+        if index == KEY_RESULTS_SECTION and lab_table:
+            return index, f"## {heading}\n{lab_table}"
         messages = [
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
+            {"role": "user", "content": document_prefix + f"Write ONLY this section, starting with its heading.\n## {heading}\n{instructions}"},
         ]
-
-        from app.services.ollama_client import chat_with_retries
-        resp = chat_with_retries(
-            model=settings.MODEL_NAME,
-            messages=messages,
-            options={"temperature": 0.1, "num_predict": 2000}  # Much longer for comprehensive report
-        )
-
-        report = resp.get('message', {}).get('content', '')
-        return _guardrail_validator(report)
+        try:
+            output = await _acomplete_cached(
+                messages, {"temperature": 0.1, "num_predict": num_predict}, "clinician_section", validate=False
+            )
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"Clinician report section '{heading}' failed: {e}", exc_info=True)
+            output = "_This section could not be generated. Please retry the report._"
+        if not output.lstrip().startswith("#"):
+            output = f"## {heading}\n{output}"
+        return index, output
+
+    tasks = [asyncio.ensure_future(_section(i, *spec)) for i, spec in enumerate(CLINICIAN_REPORT_SECTIONS)]
+    finished: Dict[int, str] = {}
+    try:
+        for next_section in asyncio.as_completed(tasks):
+            index, output = await next_section
+            finished[index] = output
+            logger.info(f"Clinician report section {index + 1}/{len(tasks)} ready")
+            yield _assemble_clinician_report(finished)
+    finally:
+        # On early close (client disconnect) or a shed section, stop the
+        # siblings and wait for them so their admission slots are freed now
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def agenerate_detailed_report_sections(
+    text: str, language: str = 'English', lab_results: Optional[List[Dict]] = None
+) -> str:
+    """Return the complete section-wise clinician report (see `astream_detailed_report_sections`)."""
+    report = ""
+    async for report in astream_detailed_report_sections(text, language, lab_results):
+        pass
+    return report
+
+
+def generate_detailed_report_from_text(text: str, language: str = 'English', lab_results: Optional[List[Dict]] = None) -> str:
+    """Synchronous wrapper around `agenerate_detailed_report_from_text`."""
+    return run_sync(agenerate_detailed_report_from_text(text, language, lab_results))
+
+
+async def _astream_with_lab_table(tokens: AsyncIterator[str], lab_table: str) -> AsyncIterator[str]:
+    """Pass `tokens` through, emitting `lab_table` right after the Key Results heading line."""
+    text = ""
+    async for token in tokens:
+        if lab_table:
+            match = _KEY_RESULTS_HEADING.search(text + token)
+            # Wait until the heading line is complete
+            if match and match.end() < len(text) + len(token):
+                cut = match.end() - len(text)
+                yield token[:cut]
+                yield f"\n{lab_table}\n"
+                token, lab_table = token[cut:], ""
+            text += token
+        yield token
+    if lab_table:
+        yield f"\n\n**Extracted lab values**\n{lab_table}"
+
+
+async def astream_detailed_report_from_text(
+    text: str, language: str = 'English', lab_results: Optional[List[Dict]] = None
+) -> AsyncIterator[str]:
+    """Stream the single-generation clinician report token by token.
+
+    Same prompt, cache entry and lab table as `agenerate_detailed_report_from_text`
+    in single mode (for sections mode use `astream_detailed_report_sections`).
+    If the generation fails before its first token, the short text summary
+    is yielded instead; later failures are raised to the caller.
+    """
+    logger.info(f"Streaming clinician report via Ollama (text length={len(text)})")
+    started = False
+    try:
+        lab_table = _lab_table(text, lab_results)
+        messages, options = await _clinician_report_messages(text, language, lab_table)
+        tokens = _astream_cached(messages, options, "clinician_report")
+        async for token in _astream_with_lab_table(tokens, lab_table):
+            started = True
+            yield token
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        logger.error(f"Expanded clinician report generation failed: {e}", exc_info=True)
-        return generate_summary_from_text(text, language)
+        if started:
+            raise
+        logger.error(f"Streaming clinician report failed: {e}", exc_info=True)
+        yield await agenerate_summary_from_text(text, language, lab_results)
 
 
-def summarize_chat_context(conversation_history: List[Dict[str, str]], language: str = 'English') -> str:
+async def asummarize_chat_context(
+    conversation_history: List[Dict[str, str]], language: str = 'English', previous_summary: Optional[str] = None
+) -> str:
     """
     Summarize chat conversation history for context management.
 
@@ -348,11 +830,15 @@ def summarize_chat_context(conversation_history: List[Dict[str, str]], language:
     that captures the key medical discussion points, questions asked,
     and important findings mentioned. This summary can be used as context
     when the full conversation exceeds token limits.
+
+    With `previous_summary`, the messages are folded into that summary
+    (rolling memory, see app.services.conversation_memory) and it is kept
+    as is if the update fails.
     """
     logger.info(f"Summarizing chat context ({len(conversation_history)} messages)")
 
     if not conversation_history:
-        return "No previous conversation."
+        return previous_summary or "No previous conversation."
 
     try:
         # Convert conversation history to a readable format
@@ -373,16 +859,23 @@ def summarize_chat_context(conversation_history: List[Dict[str, str]], language:
             "Do not include any new medical advice or diagnoses."
         )
 
+        if previous_summary:
+            request = (
+                f"Summary of the conversation so far:\n{previous_summary}\n\n"
+                f"Update the summary with these newer messages:\n\n{conversation_text}"
+            )
+        else:
+            request = f"Please summarize this medical conversation:\n\n{conversation_text}"
         messages = [
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Please summarize this medical conversation:\n\n{conversation_text}"}
+            {"role": "user", "content": request}
         ]
 
-        from app.services.ollama_client import chat_with_retries
-        resp = chat_with_retries(
+        resp = await achat(
             model=settings.MODEL_NAME,
             messages=messages,
-            options={"temperature": 0.0, "num_predict": 150}  # Keep summary short
+            options=budget_options(messages, {"temperature": 0.0, "num_predict": 150}, "context_summary"),  # Keep summary short
+            caller="context_summary",
         )
 
         summary = resp.get('message', {}).get('content', '').strip()
@@ -395,6 +888,8 @@ def summarize_chat_context(conversation_history: List[Dict[str, str]], language:
 
     except Exception as e:
         logger.error(f"Chat context summarization failed: {e}", exc_info=True)
+        if previous_summary:
+            return previous_summary
         # Fallback: create a simple summary
         topics = []
         for msg in conversation_history[-5:]:  # Look at recent messages
@@ -410,3 +905,10 @@ def summarize_chat_context(conversation_history: List[Dict[str, str]], language:
             return f"Previous conversation covered: {', '.join(set(topics))}."
         else:
             return "Previous medical conversation summary not available."
+
+
+def summarize_chat_context(
+    conversation_history: List[Dict[str, str]], language: str = 'English', previous_summary: Optional[str] = None
+) -> str:
+    """Synchronous wrapper around `asummarize_chat_context`."""
+    return run_sync(asummarize_chat_context(conversation_history, language, previous_summary))
@@ -1,7 +1,7 @@
 """Text processing utilities for the medical analyzer."""
 
 import re
-from typing import Optional
+from typing import List, Optional
 
 
 def sanitize_text(text: str) -> str:
@@ -45,3 +45,58 @@ def estimate_token_count(text: str) -> int:
 
     # Rough estimate: 1 token per word/punctuation, with some overhead
     return len(words)
+
+
+# Progressively finer ways to cut a document, paired with the separator used
+# to re-join pieces cut at that level: sections and pages (markdown headings,
+# form feeds from OCR, Docling page-break markers), paragraphs, lines,
+# sentences.
+_CHUNK_SPLITTERS = (
+    (re.compile(r'\f|^<!--\s*page break\s*-->[ \t]*$|(?=^#{1,6}\s)', re.MULTILINE), "\n\n"),
+    (re.compile(r'\n\s*\n'), "\n\n"),
+    (re.compile(r'\n'), "\n"),
+    (re.compile(r'(?<=[.!?])\s+'), " "),
+)
+
+
+def chunk_markdown(text: str, max_tokens: int, _level: int = 0) -> List[str]:
+    """Split markdown into chunks of at most ~max_tokens, cutting on natural boundaries.
+
+    Sections and pages are packed greedily into chunks; a section that is
+    too large on its own is split on paragraphs, then lines, then sentences,
+    and as a last resort on words. Chunks are returned in document order.
+
+    Args:
+        text: Document text (e.g. Docling markdown or OCR output)
+        max_tokens: Chunk size limit, measured with `estimate_token_count`
+
+    Returns:
+        List of non-empty chunks
+    """
+    if not text or not text.strip():
+        return []
+    if _level >= len(_CHUNK_SPLITTERS):
+        words = text.split()
+        step = max(1, max_tokens // 2)
+        return [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+
+    pattern, joiner = _CHUNK_SPLITTERS[_level]
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in pattern.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        tokens = estimate_token_count(piece)
+        if current and size + tokens > max_tokens:
+            chunks.append(joiner.join(current))
+            current, size = [], 0
+        if tokens > max_tokens:
+            chunks.extend(chunk_markdown(piece, max_tokens, _level + 1))
+            continue
+        current.append(piece)
+        size += tokens
+    if current:
+        chunks.append(joiner.join(current))
+    return chunks
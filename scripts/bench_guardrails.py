@@ -0,0 +1,110 @@
+"""
+Guardrail Microbenchmark
+
+Compares the per-pattern guardrail loops the services used before with the
+compiled engine in app.services.guardrails:
+
+- chat, full text:   one `re.search` per pattern vs. `CHAT_GUARDRAILS.check`
+- chat, streaming:   `GuardrailScanner.feed` over token-sized chunks
+- summary, full text: one substring scan per pattern vs. `SUMMARY_GUARDRAILS.check`
+- early abort:       how much of a response is consumed before a blocking
+                     pattern stops the stream
+
+Usage:
+    python scripts/bench_guardrails.py --chars 2000 --repeat 2000
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+# Only the pattern tables are needed; settings must still validate on import
+os.environ.setdefault("JWT_SECRET_KEY", "bench")
+os.environ.setdefault("MODEL_NAME", "bench")
+
+from app.services.chat_service import CHAT_GUARDRAILS, GUARDRAIL_RESPONSES, PROHIBITED_PATTERNS  # noqa: E402
+from app.services.summarizer_service import SUMMARY_GUARDRAILS  # noqa: E402
+
+SENTENCE = (
+    "Your hemoglobin of 13.8 g/dL is within the reference range of 13.0 to 17.0 g/dL, "
+    "and the platelet count is slightly above the upper limit. "
+)
+BLOCKED = "Based on these values I prescribe a course of iron tablets. "
+
+
+def _response(chars: int, blocked_at: float = None) -> str:
+    text = (SENTENCE * (chars // len(SENTENCE) + 1))[:chars]
+    if blocked_at is None:
+        return text
+    cut = int(len(text) * blocked_at)
+    return text[:cut] + BLOCKED + text[cut:]
+
+
+def _chunks(text: str, size: int = 4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def legacy_chat_check(response: str):
+    response_lower = response.lower()
+    for category in GUARDRAIL_RESPONSES:
+        for pattern in PROHIBITED_PATTERNS[category]:
+            if re.search(pattern, response_lower):
+                return category
+    return None
+
+
+def legacy_summary_check(text: str):
+    for p in ['diagnos', 'prescrib', 'you have', 'take ', 'lol', 'omg']:
+        if p in text.lower():
+            return p
+    return None
+
+
+def stream_scan(chunks):
+    scanner = CHAT_GUARDRAILS.scanner()
+    for consumed, chunk in enumerate(chunks, 1):
+        _, hit = scanner.feed(chunk)
+        if hit is not None:
+            return consumed
+    scanner.finish()
+    return len(chunks)
+
+
+def _report(name: str, fn, repeat: int) -> float:
+    seconds = min(timeit.repeat(fn, number=repeat, repeat=3)) / repeat
+    print(f"{name:<36} {seconds * 1e6:10.1f} µs")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chars", type=int, default=2000, help="Response length in characters")
+    parser.add_argument("--repeat", type=int, default=2000, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    clean = _response(args.chars)
+    chunks = _chunks(clean)
+    print(f"Response: {len(clean)} chars, {len(chunks)} streamed chunks\n")
+
+    legacy = _report("chat, legacy per-pattern loop", lambda: legacy_chat_check(clean), args.repeat)
+    compiled = _report("chat, compiled check", lambda: CHAT_GUARDRAILS.check(clean), args.repeat)
+    _report("chat, incremental stream scan", lambda: stream_scan(chunks), max(1, args.repeat // 10))
+    print(f"{'speed-up (full text)':<36} {legacy / compiled:10.1f} x\n")
+
+    legacy = _report("summary, legacy substring loop", lambda: legacy_summary_check(clean), args.repeat)
+    compiled = _report("summary, compiled check", lambda: SUMMARY_GUARDRAILS.check(clean), args.repeat)
+    print(f"{'speed-up (full text)':<36} {legacy / compiled:10.1f} x\n")
+
+    blocked_chunks = _chunks(_response(args.chars, blocked_at=0.2))
+    consumed = stream_scan(blocked_chunks)
+    print(f"Early abort: stopped after {consumed}/{len(blocked_chunks)} chunks "
+          f"({100 * consumed / len(blocked_chunks):.0f}% of the generation)")
+
+
+if __name__ == "__main__":
+    main()
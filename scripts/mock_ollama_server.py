@@ -0,0 +1,303 @@
+"""
+Mock Ollama Server
+
+A local stand-in for Ollama + MedGemma so `ollama_client`, `chat_service`
+and the API endpoints can be exercised and load-tested without a model.
+It speaks the subset of the Ollama HTTP API the application uses:
+
+- GET  /               "Ollama is running" (reachability checks)
+- GET  /api/version    Health prober target
+- GET  /api/tags       Available models
+- POST /api/pull       Makes a model available (streamed or single status)
+- POST /api/chat       Streaming (NDJSON) and non-streaming chat, including
+                       the token counts and durations real Ollama reports
+- GET  /mock/stats     Request/error/load counters and peak concurrency
+
+Behaviour is deterministic: outputs are canned per prompt type (patient
+summary, clinician report, context summary, image analysis, chat) and
+truncated to `num_predict`, timings follow the configured rates, and error
+injection uses a seeded RNG or a fixed "every Nth request" pattern.
+
+Model residency is simulated like Ollama: the first request for a model
+(or one after its `keep_alive` expired) waits `--load-delay` and reports it
+as `load_duration`. A chat with no messages only loads the model.
+
+Usage:
+    python scripts/mock_ollama_server.py --port 11435 --tokens-per-sec 15 --ttft 0.4 --load-delay 3
+
+    # then point the app at it
+    OLLAMA_HOSTS=http://localhost:11435 uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+PATIENT_SUMMARY = (
+    "**What This Test Checked:** This report looks at your blood counts and cholesterol. "
+    "**Key Findings:** Hemoglobin is 13.8 g/dL, which is within the normal range. "
+    "Total cholesterol is 212 mg/dL, slightly above the desirable level. "
+    "**What This Means:** Most values are normal; the cholesterol result is worth discussing. "
+    "**Next Steps:** Please review these results with your doctor."
+)
+
+CLINICIAN_REPORT = (
+    "1. REPORT OVERVIEW: Routine panel including CBC and lipid profile. "
+    "2. KEY FINDINGS: Hemoglobin 13.8 g/dL (ref 13.0-17.0). Total cholesterol 212 mg/dL (ref <200), flagged high. "
+    "3. CLINICAL SIGNIFICANCE: Mild hypercholesterolaemia; remaining indices unremarkable. "
+    "4. ABNORMAL VALUES: Total cholesterol elevated. "
+    "5. PATTERNS AND CORRELATIONS: No haematological abnormality accompanying the lipid finding. "
+    "6. RECOMMENDATIONS FOR FOLLOW-UP: Repeat fasting lipid profile; assess cardiovascular risk. "
+    "7. LIMITATIONS: Single time point; clinical history not provided."
+)
+
+CONTEXT_SUMMARY = (
+    "The user asked about their blood test results, focusing on cholesterol and hemoglobin. "
+    "The assistant explained the values and advised discussing them with a doctor."
+)
+
+IMAGE_ANALYSIS = (
+    "The image shows a frontal chest radiograph with clear lung fields and a normal cardiac silhouette. "
+    "No focal consolidation is visible. Please consult a healthcare professional for a formal interpretation."
+)
+
+CHAT_ANSWER = (
+    "Hemoglobin carries oxygen in your blood. A value of 13.8 g/dL is within the usual adult range. "
+    "If you have symptoms such as tiredness, please mention them to your doctor, who can interpret the result in context."
+)
+
+
+@dataclass
+class MockConfig:
+    """Tunable behaviour of the mock server."""
+
+    models: List[str] = field(default_factory=lambda: ["medgemma"])
+    tokens_per_sec: float = 20.0
+    ttft: float = 0.3
+    load_delay: float = 2.0
+    default_keep_alive: float = 300.0
+    parallel: int = 4
+    error_rate: float = 0.0
+    error_every: int = 0
+    error_status: int = 500
+    seed: int = 0
+
+
+def _canned_output(messages: List[Dict[str, Any]]) -> str:
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system").lower()
+    if any(m.get("images") for m in messages):
+        return IMAGE_ANALYSIS
+    if "conversation summarizer" in system:
+        return CONTEXT_SUMMARY
+    if "clinician" in system or "detailed" in system or "comprehensive" in system:
+        return CLINICIAN_REPORT
+    if "patient" in system or "summarize" in system:
+        return PATIENT_SUMMARY
+    return CHAT_ANSWER
+
+
+def _tokenize(text: str) -> List[str]:
+    """Split into word-ish tokens that concatenate back to the original text."""
+    return re.findall(r"\s*\S+", text)
+
+
+def _parse_keep_alive(value: Any, default: float) -> float:
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?", str(value).strip())
+    if not match:
+        return default
+    number, unit = float(match.group(1)), match.group(2) or "s"
+    return number * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def create_app(config: Optional[MockConfig] = None) -> FastAPI:
+    """Build the mock Ollama ASGI app (usable with uvicorn or httpx.ASGITransport)."""
+    config = config or MockConfig()
+    app = FastAPI(title="Mock Ollama")
+    rng = random.Random(config.seed)
+    slots = asyncio.Semaphore(max(1, config.parallel))
+    available = set(config.models)
+    loaded_until: Dict[str, float] = {}
+    stats = {"requests": 0, "errors": 0, "loads": 0, "in_flight": 0, "max_in_flight": 0, "tokens": 0}
+
+    def _inject_error() -> Optional[JSONResponse]:
+        stats["requests"] += 1
+        if (config.error_every and stats["requests"] % config.error_every == 0) or rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": "mock injected failure"}, status_code=config.error_status)
+        return None
+
+    async def _ensure_loaded(model: str, keep_alive: float) -> float:
+        """Return the load time paid (0 when the model was resident)."""
+        now = time.monotonic()
+        load = 0.0
+        if loaded_until.get(model, 0.0) < now:
+            stats["loads"] += 1
+            load = config.load_delay
+            await asyncio.sleep(load)
+        loaded_until[model] = time.monotonic() + (keep_alive if keep_alive >= 0 else float("inf"))
+        return load
+
+    @app.get("/", response_class=PlainTextResponse)
+    async def root():
+        return "Ollama is running"
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-mock"}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {
+            "models": [
+                {"name": m, "model": m, "modified_at": _now_iso(), "size": 0, "digest": "mock", "details": {}}
+                for m in sorted(available)
+            ]
+        }
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        return {**stats, "loaded_models": sorted(m for m, t in loaded_until.items() if t >= time.monotonic())}
+
+    @app.post("/api/pull")
+    async def pull(request: Request):
+        body = await request.json()
+        model = body.get("model") or body.get("name")
+        available.add(model)
+        statuses = [{"status": "pulling manifest"}, {"status": "verifying sha256 digest"}, {"status": "success"}]
+        if body.get("stream", True):
+            return StreamingResponse(
+                (json.dumps(s) + "\n" for s in statuses), media_type="application/x-ndjson"
+            )
+        return statuses[-1]
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        model = body.get("model")
+        if model not in available:
+            return JSONResponse({"error": f"model '{model}' not found"}, status_code=404)
+        error = _inject_error()
+        if error is not None:
+            return error
+
+        messages = body.get("messages") or []
+        options = body.get("options") or {}
+        keep_alive = _parse_keep_alive(body.get("keep_alive"), config.default_keep_alive)
+        tokens = _tokenize(_canned_output(messages)) if messages else []
+        num_predict = options.get("num_predict")
+        if isinstance(num_predict, int) and num_predict >= 0:
+            tokens = tokens[:num_predict]
+        prompt_tokens = max(1, sum(len(m.get("content", "")) for m in messages) // 4) if messages else 0
+        per_token = 1.0 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0.0
+
+        def _final(load: float, eval_s: float, total: float) -> Dict[str, Any]:
+            return {
+                "model": model,
+                "created_at": _now_iso(),
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "done_reason": "load" if not messages else "stop",
+                "total_duration": int(total * 1e9),
+                "load_duration": int(load * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(config.ttft * 1e9) if messages else 0,
+                "eval_count": len(tokens),
+                "eval_duration": int(eval_s * 1e9),
+            }
+
+        async def _generate():
+            started = time.monotonic()
+            async with slots:
+                stats["in_flight"] += 1
+                stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+                try:
+                    load = await _ensure_loaded(model, keep_alive)
+                    if messages:
+                        await asyncio.sleep(config.ttft)
+                    eval_started = time.monotonic()
+                    for token in tokens:
+                        await asyncio.sleep(per_token)
+                        stats["tokens"] += 1
+                        yield {
+                            "model": model,
+                            "created_at": _now_iso(),
+                            "message": {"role": "assistant", "content": token},
+                            "done": False,
+                        }
+                    yield _final(load, time.monotonic() - eval_started, time.monotonic() - started)
+                finally:
+                    stats["in_flight"] -= 1
+
+        if body.get("stream", True):
+            async def _ndjson():
+                async for chunk in _generate():
+                    yield json.dumps(chunk) + "\n"
+
+            return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
+        content = []
+        final: Dict[str, Any] = {}
+        async for chunk in _generate():
+            if chunk["done"]:
+                final = chunk
+            else:
+                content.append(chunk["message"]["content"])
+        final["message"] = {"role": "assistant", "content": "".join(content)}
+        return final
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a deterministic mock Ollama server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--models", default="medgemma", help="Comma-separated model names to serve")
+    parser.add_argument("--tokens-per-sec", type=float, default=20.0, help="Generation speed (0 = instant)")
+    parser.add_argument("--ttft", type=float, default=0.3, help="Prompt-eval delay before the first token (s)")
+    parser.add_argument("--load-delay", type=float, default=2.0, help="Cold model load time (s)")
+    parser.add_argument("--keep-alive", type=float, default=300.0, help="Default keep_alive when a request sends none (s)")
+    parser.add_argument("--parallel", type=int, default=4, help="Concurrent generations (like OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an injected failure")
+    parser.add_argument("--error-every", type=int, default=0, help="Fail every Nth chat request (0 = never)")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed for error injection")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        models=[m.strip() for m in args.models.split(",") if m.strip()],
+        tokens_per_sec=args.tokens_per_sec,
+        ttft=args.ttft,
+        load_delay=args.load_delay,
+        default_keep_alive=args.keep_alive,
+        parallel=args.parallel,
+        error_rate=args.error_rate,
+        error_every=args.error_every,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+
+    import uvicorn
+
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
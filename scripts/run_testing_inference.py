@@ -133,7 +133,8 @@ def generate_doctor_summary(extracted_text: str, language: str = 'English') -> s
         resp = chat_with_retries(
             model='edwardlo12/medgemma-4b-it-Q4_K_M',
             messages=messages,
-            options={"temperature": 0.0, "num_predict": 400}
+            options={"temperature": 0.0, "num_predict": 400},
+            caller="testing_inference"
         )
         summary = resp.get('message', {}).get('content', '')
         return summary
@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.services.llm_cache as llm_cache
+import app.services.summarizer_service as summarizer_service
+from app.api.endpoints import reports as reports_endpoint
+from app.db import models, schemas
+from app.services import batch_summarizer
+from app.services.ollama_admission import current_priority
+
+
+def _fake_achat(state, delays):
+    async def fake_achat(model, messages, options=None, caller=None, **kwargs):
+        document = messages[-1]["content"]
+        name = next(key for key in delays if key in document)
+        state["lanes"].add(current_priority())
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(delays[name])
+            return {"message": {"content": f"Summary of {name}"}}
+        finally:
+            state["active"] -= 1
+    return fake_achat
+
+
+def test_batch_runs_bounded_in_batch_lane_and_streams_in_finish_order(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+    state = {"active": 0, "peak": 0, "lanes": set()}
+    delays = {"Alpha": 0.08, "Bravo": 0.01, "Charlie": 0.02, "Delta": 0.01, "Echo": 0.01}
+    monkeypatch.setattr(summarizer_service, "achat", _fake_achat(state, delays))
+    items = [batch_summarizer.BatchItem(index=i, text=f"{name} report") for i, name in enumerate(delays)]
+
+    async def collect():
+        return [r async for r in batch_summarizer.astream_batch_summaries(items, "summary", concurrency=2)]
+
+    results = asyncio.run(collect())
+
+    assert state["peak"] == 2 and state["lanes"] == {"batch"}
+    assert sorted(r["index"] for r in results) == [0, 1, 2, 3, 4]
+    # The slow first item does not hold back the others
+    assert results[-1]["index"] == 0
+    assert all(r["status"] == "completed" for r in results)
+
+
+def test_endpoint_reuses_stored_report_text_and_streams_ndjson(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+    parsed = []
+    monkeypatch.setattr(reports_endpoint.parser_service, "extract_data_from_file", parsed.append)
+    seen = []
+
+    async def fake_summary(text, language='English', lab_results=None):
+        if text.startswith("Garbled"):
+            raise RuntimeError("model crashed")
+        seen.append((text, lab_results))
+        return f"Summary: {text[:5]}"
+
+    monkeypatch.setitem(batch_summarizer.AUDIENCES, "patient", fake_summary)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    stored = models.Report(language="English", report_type=models.ReportType.text,
+                           raw_text="Stored CBC text", lab_results=[])
+    image = models.Report(language="English", report_type=models.ReportType.image)
+    db.add_all([stored, image])
+    db.commit()
+
+    request = schemas.BatchSummaryRequest(report_ids=[stored.id, image.id, 999], texts=["Pasted lipid panel", "Garbled"])
+
+    async def collect():
+        response = await reports_endpoint.batch_summarize(request, db)
+        assert response.media_type == "application/x-ndjson"
+        return [json.loads(line) async for line in response.body_iterator]
+
+    results = {r["index"]: r for r in asyncio.run(collect())}
+    db.close()
+
+    assert parsed == []
+    assert ("Stored CBC text", []) in seen
+    assert results[0]["summary"] == "Summary: Store" and results[0]["report_id"] == stored.id
+    assert results[1]["error"] == "Report has no extracted text"
+    assert results[2]["error"] == "Report not found"
+    assert results[3]["status"] == "completed" and results[3]["report_id"] is None
+    # A failing item is reported without stopping the batch
+    assert (results[4]["status"], results[4]["error"]) == ("failed", "model crashed")
+
+
+def test_file_uploaded_reports_can_be_batch_summarized(monkeypatch, tmp_path):
+    import io
+
+    from fastapi import UploadFile
+
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+    parsed = []
+
+    def fake_extract(path, digest=None):
+        parsed.append(path)
+        return "Hemoglobin 11.2 g/dL (ref 13.0-17.0)"
+
+    async def fake_summary(text, language='English', lab_results=None):
+        return f"Summary of {text[:10]} with {len(lab_results)} lab values"
+
+    monkeypatch.setattr(reports_endpoint.parser_service, "extract_data_from_file", fake_extract)
+    monkeypatch.setattr(reports_endpoint.summarizer_service, "agenerate_summary_from_text", fake_summary)
+    monkeypatch.setattr(reports_endpoint.tts_service, "generate_speech", lambda **kwargs: None)
+    monkeypatch.setitem(batch_summarizer.AUDIENCES, "summary", fake_summary)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    # Uploaded before the extracted text was stored
+    legacy_file = tmp_path / "old.pdf"
+    legacy_file.write_bytes(b"%PDF-1.4")
+    legacy = models.Report(language="English", report_type=models.ReportType.text,
+                           original_file_path=str(legacy_file), status=models.ReportStatus.completed)
+    db.add(legacy)
+    db.commit()
+
+    async def run():
+        upload = UploadFile(io.BytesIO(b"%PDF-1.4 cbc"), filename="cbc.pdf")
+        (uploaded,) = await reports_endpoint.upload_files_report("English", [upload], None, db)
+        request = schemas.BatchSummaryRequest(report_ids=[uploaded.id, legacy.id], audience="summary")
+        response = await reports_endpoint.batch_summarize(request, db)
+        return uploaded, [json.loads(line) async for line in response.body_iterator]
+
+    uploaded, results = asyncio.run(run())
+    db.refresh(legacy)
+    db.close()
+
+    assert uploaded.raw_text == "Hemoglobin 11.2 g/dL (ref 13.0-17.0)"
+    assert all(r["status"] == "completed" for r in results)
+    assert all(r["summary"] == "Summary of Hemoglobin with 1 lab values" for r in results)
+    # Only the legacy report is parsed again (served by the extraction cache in production)
+    assert parsed[1:] == [str(legacy_file)]
+    assert legacy.raw_text and legacy.lab_results
@@ -0,0 +1,72 @@
+import asyncio
+
+import app.services.chat_service as chat_service
+from app.services.llm_budget import estimate_prompt_tokens
+from app.services.llm_telemetry import LLMTelemetry
+from app.services.ollama_health import CircuitBreaker
+
+DOCUMENT = "Complete blood count. Hemoglobin 11.2 g/dL (ref 13.0-17.0). " * 40
+
+
+def test_follow_up_turns_share_a_byte_identical_document_prefix(monkeypatch):
+    monkeypatch.setattr(chat_service, "get_breaker", lambda: CircuitBreaker())
+    telemetry = LLMTelemetry()
+    monkeypatch.setattr(chat_service, "get_telemetry", lambda: telemetry)
+    calls = []
+
+    async def fake_stream(model, messages, options=None, caller=None, **kwargs):
+        calls.append((messages, options))
+        prompt = estimate_prompt_tokens(messages)
+        # Like Ollama: only the tokens after the cached prefix are evaluated
+        evaluated = prompt if len(calls) == 1 else 40
+        yield {"message": {"content": "Your hemoglobin is below range."}, "done": False}
+        yield {"message": {"content": ""}, "done": True, "prompt_eval_count": evaluated,
+               "prompt_eval_duration": evaluated * 1_000_000}
+
+    monkeypatch.setattr(chat_service, "achat_stream", fake_stream)
+    chat_service.set_session_document(7, DOCUMENT)
+
+    async def ask(question, history=None):
+        return "".join([t async for t in chat_service.generate_chat_response_streaming(
+            question, history=history, session_id=7
+        )])
+
+    asyncio.run(ask("What does my hemoglobin mean?"))
+    asyncio.run(ask("Is it serious?", history=[
+        {"role": "user", "content": "What does my hemoglobin mean?"},
+        {"role": "assistant", "content": "Your hemoglobin is below range."},
+    ]))
+    chat_service.clear_session_document(7)
+
+    (first, first_options), (second, second_options) = calls
+    assert second[:2] == first[:2] and DOCUMENT in first[1]["content"]
+    assert second[-1]["content"] == "Is it serious?"
+    # The context window stays put so the runner (and its cache) is not restarted
+    assert second_options["num_ctx"] == first_options["num_ctx"]
+
+    reuse = telemetry.snapshot()["prefix_reuse"]["chat"]
+    assert (reuse["first_turns"], reuse["follow_ups"], reuse["hits"], reuse["reuse_rate"]) == (1, 1, 1, 1.0)
+    assert reuse["avg_prompt_eval_ms_follow_up"] < reuse["avg_prompt_eval_ms_first"]
+
+
+def test_full_prompt_evaluation_counts_as_a_miss():
+    telemetry = LLMTelemetry()
+
+    telemetry.record_prefix_reuse("chat", {"prompt_eval_count": 900}, prompt_tokens=1000, prefix_tokens=800,
+                                  first_use=False)
+    telemetry.record_prefix_reuse("chat", {"prompt_eval_count": 150}, prompt_tokens=1000, prefix_tokens=800,
+                                  first_use=False)
+
+    reuse = telemetry.snapshot()["prefix_reuse"]["chat"]
+    assert (reuse["follow_ups"], reuse["hits"], reuse["reuse_rate"], reuse["reused_tokens"]) == (2, 1, 0.5, 800)
+
+
+def test_prefix_cache_is_bounded_per_session(monkeypatch):
+    monkeypatch.setenv("CHAT_PREFIX_SESSIONS", "2")
+    for session_id in (101, 102, 103):
+        chat_service.set_session_document(session_id, f"Report {session_id}")
+
+    assert not chat_service.has_session_document(101)
+    assert chat_service.has_session_document(102) and chat_service.has_session_document(103)
+    chat_service.clear_session_document(102)
+    chat_service.clear_session_document(103)
@@ -0,0 +1,66 @@
+import asyncio
+
+import app.services.llm_cache as llm_cache
+import app.services.summarizer_service as summarizer_service
+from app.utils.text_utils import chunk_markdown, estimate_token_count
+
+SECTION = "Hemoglobin 13.8 g/dL (ref 13.0-17.0). " * 40
+
+
+def _document(sections: int) -> str:
+    return "\n\n".join(f"## Section {i}\n{SECTION}" for i in range(sections))
+
+
+def test_chunks_follow_section_and_page_boundaries():
+    text = "# Labs\nHb 13.8\n\n# Imaging\nClear lungs\fPage two findings"
+
+    assert chunk_markdown(text, 6) == ["# Labs\nHb 13.8", "# Imaging\nClear lungs", "Page two findings"]
+    assert chunk_markdown(text, 1000) == ["# Labs\nHb 13.8\n\n# Imaging\nClear lungs\n\nPage two findings"]
+
+
+def test_oversized_section_is_split_below_the_limit():
+    chunks = chunk_markdown(_document(1) + "\n" + "word " * 2000, 300)
+
+    assert len(chunks) > 1
+    assert all(estimate_token_count(c) <= 300 for c in chunks)
+
+
+def test_long_document_is_condensed_concurrently_with_per_chunk_cache(tmp_path, monkeypatch):
+    cache = llm_cache.ResponseCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: cache)
+    monkeypatch.setenv("SUMMARY_CHUNK_TOKENS", "500")
+    monkeypatch.setenv("SUMMARY_MAP_CONCURRENCY", "3")
+    calls = []
+    active = {"now": 0, "peak": 0}
+
+    async def fake_achat(model, messages, options=None, caller=None, **kwargs):
+        calls.append(caller)
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        return {"message": {"content": "- Hemoglobin 13.8 g/dL"}}
+
+    monkeypatch.setattr(summarizer_service, "achat", fake_achat)
+    document = _document(8)
+
+    condensed = asyncio.run(summarizer_service.acondense_document(document, max_tokens=1000))
+
+    chunk_calls = len(calls)
+    assert chunk_calls == len(chunk_markdown(document, 500)) > 3
+    assert set(calls) == {"chunk_notes"}
+    assert active["peak"] == 3
+    assert condensed.startswith("## Part 1\n- Hemoglobin 13.8 g/dL")
+
+    # Same document again: every chunk is served from the cache
+    asyncio.run(summarizer_service.acondense_document(document, max_tokens=1000))
+    assert len(calls) == chunk_calls
+
+
+def test_short_document_is_left_alone(monkeypatch):
+    async def fail(*args, **kwargs):
+        raise AssertionError("no model call expected")
+
+    monkeypatch.setattr(summarizer_service, "achat", fail)
+
+    assert asyncio.run(summarizer_service.acondense_document("Hb 13.8 g/dL", max_tokens=100)) == "Hb 13.8 g/dL"
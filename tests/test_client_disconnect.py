@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+import app.services.ollama_client as ollama_client
+from app.api.deps import ClientDisconnected, cancel_on_disconnect
+
+
+class FakeRequest:
+    """Reports a disconnect once `disconnect_after` seconds have passed."""
+
+    def __init__(self, disconnect_after=None):
+        self.disconnect_after = disconnect_after
+        self.started = None
+
+    async def is_disconnected(self):
+        loop = asyncio.get_running_loop()
+        if self.started is None:
+            self.started = loop.time()
+        return self.disconnect_after is not None and loop.time() - self.started >= self.disconnect_after
+
+
+class EndlessStreamClient:
+    """Fake AsyncClient streaming tokens forever; records when the stream is torn down."""
+
+    def __init__(self):
+        self.closed = asyncio.Event()
+
+    async def chat(self, model, messages, options=None, stream=False, **kwargs):
+        async def _gen():
+            try:
+                while True:
+                    await asyncio.sleep(0.01)
+                    yield {"message": {"content": "x"}}
+            finally:
+                self.closed.set()
+
+        return _gen()
+
+
+def test_disconnect_cancels_block_and_raises():
+    cancelled = []
+
+    async def _run():
+        async with cancel_on_disconnect(FakeRequest(disconnect_after=0.05), interval=0.01):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+    with pytest.raises(ClientDisconnected):
+        asyncio.run(asyncio.wait_for(_run(), 2))
+    assert cancelled == [True]
+
+
+def test_connected_client_is_not_cancelled():
+    async def _run():
+        async with cancel_on_disconnect(FakeRequest(), interval=0.01):
+            await asyncio.sleep(0.05)
+        # The task must not carry a stray cancellation past the block
+        await asyncio.sleep(0.02)
+        return "done"
+
+    assert asyncio.run(_run()) == "done"
+
+
+def test_disconnect_tears_down_the_ollama_stream(monkeypatch):
+    from app.services import ollama_health
+
+    monkeypatch.setattr(ollama_health, "_breaker", ollama_health.CircuitBreaker())
+    fake = EndlessStreamClient()
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: fake)
+
+    async def _run():
+        tokens = 0
+        with pytest.raises(ClientDisconnected):
+            async with cancel_on_disconnect(FakeRequest(disconnect_after=0.05), interval=0.01):
+                async for _ in ollama_client.achat_stream("m", [{"role": "user", "content": "hi"}]):
+                    tokens += 1
+        await asyncio.wait_for(fake.closed.wait(), 1)
+        return tokens
+
+    assert asyncio.run(_run()) > 0
+    assert ollama_client.coalescing_stats()["in_flight"] == 0
@@ -0,0 +1,124 @@
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.services.chat_service as chat_service
+import app.services.summarizer_service as summarizer_service
+from app.db import models
+from app.services import conversation_memory
+from app.services.ollama_admission import AdmissionController, set_request_priority
+from app.services.ollama_health import CircuitBreaker
+
+
+def _session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _add_turns(db, session_id, start, turns):
+    for i in range(start, start + turns):
+        db.add(models.ChatMessage(session_id=session_id, role="user", content=f"Question {i}"))
+        db.add(models.ChatMessage(session_id=session_id, role="assistant", content=f"Answer {i}"))
+    db.commit()
+
+
+def test_history_keeps_summary_and_drops_oldest_messages_over_budget():
+    messages = [{"role": "user", "content": f"Message {i} " + "word " * 40} for i in range(10)]
+
+    history = conversation_memory.assemble_context("Discussed LDL.", messages, max_tokens=250)
+
+    assert history[0] == {"role": "system", "content": "Summary of the earlier conversation: Discussed LDL."}
+    kept = history[1:]
+    assert 0 < len(kept) < len(messages)
+    assert kept == messages[-len(kept):]
+
+
+def test_refresh_folds_turns_beyond_recent_window(monkeypatch):
+    monkeypatch.setenv("CHAT_MEMORY_RECENT_MESSAGES", "4")
+    monkeypatch.setenv("CHAT_MEMORY_SUMMARY_TURNS", "2")
+    prompts = []
+
+    async def fake_achat(model, messages, options=None, caller=None, **kwargs):
+        prompts.append(messages[-1]["content"])
+        return {"message": {"content": f"Summary {len(prompts)}"}}
+
+    monkeypatch.setattr(summarizer_service, "achat", fake_achat)
+    factory = _session_factory()
+    db = factory()
+    session = models.ChatSession(title="Labs")
+    db.add(session)
+    db.commit()
+
+    # 3 turns: only 2 messages beyond the last 4, fewer than 2 turns to fold
+    _add_turns(db, session.id, 0, 3)
+    assert not asyncio.run(conversation_memory.refresh_conversation_summary(session.id, factory))
+    assert prompts == []
+
+    _add_turns(db, session.id, 3, 1)
+    assert asyncio.run(conversation_memory.refresh_conversation_summary(session.id, factory))
+    assert "Question 0" in prompts[0] and "Answer 1" in prompts[0] and "Question 2" not in prompts[0]
+
+    _add_turns(db, session.id, 4, 2)
+    assert asyncio.run(conversation_memory.refresh_conversation_summary(session.id, factory))
+    # The previous summary is updated instead of re-reading the whole session
+    assert "Summary 1" in prompts[1] and "Question 0" not in prompts[1]
+
+    db.expire_all()
+    history = conversation_memory.load_chat_history(db, session.id)
+    assert history[0]["content"].endswith("Summary 2")
+    assert [m["content"] for m in history[1:]] == ["Question 4", "Answer 4", "Question 5", "Answer 5"]
+    db.close()
+
+
+def test_refresh_is_admitted_in_the_batch_lane(monkeypatch):
+    monkeypatch.setenv("CHAT_MEMORY_RECENT_MESSAGES", "2")
+    monkeypatch.setenv("CHAT_MEMORY_SUMMARY_TURNS", "1")
+    ctl = AdmissionController(2)
+
+    async def fake_achat(model, messages, options=None, caller=None, **kwargs):
+        async with ctl.slot():
+            return {"message": {"content": "Summary"}}
+
+    monkeypatch.setattr(summarizer_service, "achat", fake_achat)
+    factory = _session_factory()
+    db = factory()
+    session = models.ChatSession(title="Labs")
+    db.add(session)
+    db.commit()
+    _add_turns(db, session.id, 0, 2)
+
+    async def _after_chat_reply():
+        # Background tasks inherit the context of the chat request
+        set_request_priority("interactive")
+        return await conversation_memory.refresh_conversation_summary(session.id, factory)
+
+    assert asyncio.run(_after_chat_reply())
+    lanes = ctl.stats()["lanes"]
+    assert (lanes["batch"]["admitted"], lanes["interactive"]["admitted"]) == (1, 0)
+    db.close()
+
+
+def test_streaming_chat_sends_history_before_the_question(monkeypatch):
+    monkeypatch.setattr(chat_service, "get_breaker", lambda: CircuitBreaker())
+    sent = []
+
+    async def fake_stream(model, messages, options=None, caller=None, **kwargs):
+        sent.append(messages)
+        yield {"message": {"content": "Your HDL is in range."}}
+
+    monkeypatch.setattr(chat_service, "achat_stream", fake_stream)
+    history = conversation_memory.assemble_context("Asked about cholesterol.", [
+        {"role": "user", "content": "What is my LDL?"},
+        {"role": "assistant", "content": "190 mg/dL, above range."},
+    ])
+
+    async def collect():
+        return [t async for t in chat_service.generate_chat_response_streaming("And HDL?", history=history)]
+
+    asyncio.run(collect())
+
+    assert [m["role"] for m in sent[0]] == ["system", "system", "user", "assistant", "user"]
+    assert sent[0][1:4] == history and sent[0][-1]["content"] == "And HDL?"
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app.services.docling_pool import (
+    ConversionFailed,
+    DoclingJobTimeout,
+    DoclingPool,
+    DoclingPoolError,
+    DoclingWorkerCrashed,
+)
+
+
+def fake_initializer():
+    """Stands in for Docling inside the worker; behaviour is picked by file content."""
+    def convert(path):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        if text == "crash":
+            os._exit(3)
+        if text == "hang":
+            time.sleep(60)
+        if text == "reject":
+            raise ConversionFailed("not a PDF")
+        return f"{os.getpid()}:{text}", None
+    return convert
+
+
+def _doc(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def _pid(markdown):
+    return int(markdown.split(":", 1)[0])
+
+
+def test_workers_are_recycled_after_max_jobs(tmp_path):
+    pool = DoclingPool(workers=1, max_jobs=2, initializer=fake_initializer)
+    try:
+        assert pool.wait_ready()
+        first, second, third = (pool.convert(_doc(tmp_path, f"{i}.pdf", f"page {i}"))[0] for i in range(3))
+    finally:
+        pool.shutdown()
+
+    assert first.endswith(":page 0") and _pid(first) != os.getpid()
+    assert _pid(first) == _pid(second) != _pid(third)
+    stats = pool.stats()
+    assert (stats["jobs"], stats["recycled"], stats["spawned"]) == (3, 1, 2)
+
+
+def test_crashes_and_timeouts_only_fail_their_own_job(tmp_path):
+    pool = DoclingPool(workers=1, timeout=1.0, initializer=fake_initializer)
+    try:
+        with pytest.raises(DoclingWorkerCrashed):
+            pool.convert(_doc(tmp_path, "crash.pdf", "crash"))
+        assert pool.convert(_doc(tmp_path, "a.pdf", "CBC"))[0].endswith(":CBC")
+
+        started = time.monotonic()
+        with pytest.raises(DoclingJobTimeout):
+            pool.convert(_doc(tmp_path, "hang.pdf", "hang"))
+        assert time.monotonic() - started < 5
+        after_timeout = pool.convert(_doc(tmp_path, "b.pdf", "TSH"))[0]
+
+        # A rejected document keeps its worker
+        with pytest.raises(ConversionFailed):
+            pool.convert(_doc(tmp_path, "reject.pdf", "reject"))
+        assert _pid(pool.convert(_doc(tmp_path, "c.pdf", "LDL"))[0]) == _pid(after_timeout)
+    finally:
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert (stats["crashes"], stats["timeouts"], stats["failed"], stats["spawned"]) == (1, 1, 3, 3)
+
+
+def test_shutdown_releases_a_caller_waiting_for_workers():
+    pool = DoclingPool(workers=1, initializer=fake_initializer)
+    pool.start()
+    worker = pool._idle.get()  # the only worker is busy elsewhere
+
+    started = time.monotonic()
+    threading.Timer(0.2, pool.shutdown).start()
+    with pytest.raises(DoclingPoolError):
+        pool.convert("report.pdf")
+    assert time.monotonic() - started < 3
+    pool._stop(worker, kill=True, wait=True)
+
+
+def test_startup_warm_up_task_is_kept_and_observed(monkeypatch, caplog):
+    from fastapi.testclient import TestClient
+
+    import app.services.docling_pool as docling_pool
+    from app.main import app
+
+    pool = DoclingPool(workers=1, initializer=fake_initializer)
+    monkeypatch.setattr(docling_pool, "get_pool", lambda: pool)
+
+    with caplog.at_level("INFO"), TestClient(app):
+        (warm_up,) = app.state.startup_tasks
+        deadline = time.monotonic() + 30
+        while not warm_up.done() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert warm_up.result() is True
+
+    assert "Docling workers ready" in caplog.text
@@ -0,0 +1,127 @@
+from docling_core.types.doc import DocItemLabel, DoclingDocument
+
+import app.services.docling_pool as docling_pool
+import app.services.extraction_cache as extraction_cache
+import app.services.parser_service as parser_service
+from app.services.extraction_cache import CachedExtraction, ExtractionCache
+
+
+class FakeConverter:
+    """Stands in for Docling; counts conversions."""
+
+    def __init__(self):
+        self.calls = []
+
+    def convert(self, path):
+        self.calls.append(path)
+        document = DoclingDocument(name="report")
+        with open(path, encoding="utf-8") as f:
+            document.add_text(label=DocItemLabel.TEXT, text=f.read())
+
+        class Result:
+            pass
+
+        result = Result()
+        result.document = document
+        return result
+
+
+def _use_cache(monkeypatch, tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extractions.sqlite3"))
+    monkeypatch.setattr(extraction_cache, "get_extraction_cache", lambda: cache)
+    monkeypatch.setattr(docling_pool, "get_pool", lambda: None)
+    converter = FakeConverter()
+    monkeypatch.setattr(parser_service, "get_converter", lambda: converter)
+    return cache, converter
+
+
+def test_identical_bytes_are_parsed_once(monkeypatch, tmp_path):
+    cache, converter = _use_cache(monkeypatch, tmp_path)
+    first, copy, other = tmp_path / "a.pdf", tmp_path / "b.pdf", tmp_path / "c.pdf"
+    first.write_text("Hemoglobin 13.8 g/dL")
+    copy.write_text("Hemoglobin 13.8 g/dL")
+    other.write_text("LDL 190 mg/dL")
+
+    assert parser_service.extract_data_from_file(str(first)) == "Hemoglobin 13.8 g/dL"
+    # Same content under another name (e.g. the same PDF sent to chat and to reports)
+    digest = extraction_cache.content_digest(copy.read_bytes())
+    assert parser_service.extract_data_from_file(str(copy), digest) == "Hemoglobin 13.8 g/dL"
+    assert parser_service.extract_data_from_file(str(other)) == "LDL 190 mg/dL"
+
+    assert converter.calls == [str(first), str(other)]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+
+def test_parser_version_is_part_of_the_key(monkeypatch, tmp_path):
+    _, converter = _use_cache(monkeypatch, tmp_path)
+    path = tmp_path / "a.pdf"
+    path.write_text("CRP 12 mg/L")
+
+    parser_service.extract_data_from_file(str(path))
+    monkeypatch.setattr(parser_service, "PARSER_VERSION", "2")
+    parser_service.extract_data_from_file(str(path))
+
+    assert len(converter.calls) == 2
+
+
+def test_docling_document_is_restored_without_reparsing(monkeypatch, tmp_path):
+    _, converter = _use_cache(monkeypatch, tmp_path)
+    path = tmp_path / "a.pdf"
+    path.write_text("TSH 2.1 mIU/L")
+
+    parser_service.extract_data_from_file(str(path))
+    document = parser_service.load_docling_document(str(path))
+
+    assert converter.calls == [str(path)]
+    assert document.export_to_markdown() == "TSH 2.1 mIU/L"
+
+
+def test_least_recently_used_entries_are_evicted_beyond_budget(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extractions.sqlite3"), max_disk_bytes=250)
+    for key in ("a", "b"):
+        cache.set(key, CachedExtraction(markdown=key * 100, method="docling"))
+    assert cache.get("a") is not None  # "b" is now the least recently used
+
+    cache.set("c", CachedExtraction(markdown="c" * 100, method="ocr"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").markdown == "a" * 100 and cache.get("c").method == "ocr"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ocr_fallback_after_a_pool_failure_is_not_cached(monkeypatch, tmp_path):
+    cache, converter = _use_cache(monkeypatch, tmp_path)
+    path = tmp_path / "a.pdf"
+    path.write_text("Ferritin 45 ng/mL")
+
+    class CrashingPool:
+        def convert(self, file_path):
+            raise docling_pool.DoclingWorkerCrashed("worker died")
+
+    monkeypatch.setattr(docling_pool, "get_pool", lambda: CrashingPool())
+    monkeypatch.setattr(parser_service, "_ocr", lambda file_path: ("Ferritin 45 ng/ml (ocr)", []))
+    assert parser_service.extract_data_from_file(str(path)) == "Ferritin 45 ng/ml (ocr)"
+    assert cache.stats()["entries"] == 0
+
+    # The next upload gets Docling again, and its structured result is kept
+    monkeypatch.setattr(docling_pool, "get_pool", lambda: None)
+    assert parser_service.extract_data_from_file(str(path)) == "Ferritin 45 ng/mL"
+    assert converter.calls == [str(path)]
+    assert parser_service.load_docling_document(str(path)) is not None
+
+
+def test_ocr_fallback_after_docling_fails_on_the_document_is_cached(monkeypatch, tmp_path):
+    cache, _ = _use_cache(monkeypatch, tmp_path)
+    path = tmp_path / "a.pdf"
+    path.write_text("scan")
+
+    class FailingPool:
+        def convert(self, file_path):
+            raise docling_pool.DoclingJobError("ValueError: no pages")
+
+    monkeypatch.setattr(docling_pool, "get_pool", lambda: FailingPool())
+    monkeypatch.setattr(parser_service, "_ocr", lambda file_path: ("Vitamin D 31 ng/mL", []))
+    parser_service.extract_data_from_file(str(path))
+
+    assert cache.stats()["entries"] == 1
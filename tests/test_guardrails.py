@@ -0,0 +1,85 @@
+import asyncio
+
+import app.services.chat_service as chat_service
+import app.services.summarizer_service as summarizer_service
+from app.services.guardrails import GuardrailEngine
+from app.services.ollama_health import CircuitBreaker
+
+
+def test_combined_matcher_is_case_insensitive_and_prioritised():
+    engine = GuardrailEngine(
+        {"diagnosis": [r"\bmy diagnosis is\b"], "jokes": [r"\bpunchline\b"]}, blocking=["diagnosis"]
+    )
+
+    hit = engine.check("The PUNCHLINE first, then: My Diagnosis is anaemia.")
+    assert (hit.category, hit.text, hit.blocking) == ("diagnosis", "my diagnosis is", True)
+    assert engine.check("Nothing to see here.") is None
+    # Escapes keep their meaning when patterns are case-folded
+    assert GuardrailEngine({"x": [r"\S+\B"]}).check("ABC").text == "ab"
+
+
+def test_scanner_holds_back_window_and_catches_split_pattern():
+    engine = GuardrailEngine({"prescription": [r"\bi will prescribe\b"]}, blocking=["prescription"], carry_chars=20)
+    scanner = engine.scanner()
+    text = "Your results look stable overall and the trend is reassuring. Next I will pre"
+    released = ""
+    for i in range(0, len(text), 5):
+        out, hit = scanner.feed(text[i:i + 5])
+        assert hit is None
+        released += out
+
+    # Finished sentences are released, the unfinished tail is held back
+    assert released.endswith("reassuring.")
+    assert "I will" not in released
+
+    out, hit = scanner.feed("scribe something you can take every day ")
+    assert hit.category == "prescription" and out == ""
+    assert "Next" not in scanner.text
+
+
+def test_blocking_pattern_stops_ollama_stream_early(monkeypatch):
+    monkeypatch.setattr(chat_service, "get_breaker", lambda: CircuitBreaker())
+    pulled = []
+    closed = []
+
+    async def fake_stream(*args, **kwargs):
+        try:
+            for i, word in enumerate(("Looking at your labs, ", "I prescribe ", "iron daily. ") + ("More text. ",) * 200):
+                pulled.append(i)
+                yield {"message": {"content": word}}
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(chat_service, "achat_stream", fake_stream)
+
+    async def collect():
+        return [t async for t in chat_service.generate_chat_response_streaming("What do my labs mean?")]
+
+    output = "".join(asyncio.run(collect()))
+
+    assert output == chat_service.GUARDRAIL_RESPONSES["prescription"]
+    assert len(pulled) < 20 and closed == [True]
+
+
+def test_clean_stream_is_released_in_full(monkeypatch):
+    monkeypatch.setattr(chat_service, "get_breaker", lambda: CircuitBreaker())
+    words = ["Hemoglobin ", "is ", "within ", "range. "] * 30
+
+    async def fake_stream(*args, **kwargs):
+        for word in words:
+            yield {"message": {"content": word}}
+
+    monkeypatch.setattr(chat_service, "achat_stream", fake_stream)
+
+    async def collect():
+        return [t async for t in chat_service.generate_chat_response_streaming("Explain my hemoglobin")]
+
+    assert "".join(asyncio.run(collect())) == "".join(words)
+
+
+def test_summary_guardrail_appends_disclaimer_once():
+    flagged = summarizer_service._guardrail_validator("You have mild anaemia.")
+
+    assert flagged.startswith("You have mild anaemia.") and "[Disclaimer]" in flagged
+    assert summarizer_service._guardrail_validator(flagged) == flagged
+    assert summarizer_service._guardrail_validator("Values are in range.") == "Values are in range."
@@ -0,0 +1,102 @@
+import asyncio
+
+import app.services.llm_cache as llm_cache
+import app.services.summarizer_service as summarizer_service
+from app.services.lab_extractor import (
+    LabRecord, extract_lab_values, flag_lab_values, format_lab_table, parse_reference_range,
+)
+
+DOCUMENT = """# Complete Blood Count
+| Test | Result | Unit | Reference Range |
+|------|--------|------|-----------------|
+| Hemoglobin | 11.2 | g/dL | 13.0 - 17.0 |
+| WBC | 7,5 | 10^3/uL | 4.0-11.0 |
+| Platelets | 480 H | 10^3/uL | 150-450 |
+
+Lipid panel
+LDL Cholesterol: 190 mg/dL (Ref: < 130)
+HDL 35 mg/dL >40
+TSH < 0.01 mIU/L 0.4-4.0
+Age 45 years
+Page 2 of 3
+"""
+
+
+def test_tables_and_text_lines_become_typed_records():
+    records = {r.name: r for r in extract_lab_values(DOCUMENT)}
+
+    assert list(records) == ["Hemoglobin", "WBC", "Platelets", "LDL Cholesterol", "HDL", "TSH"]
+    assert records["Hemoglobin"].source == "table"
+    assert (records["Hemoglobin"].value, records["Hemoglobin"].unit) == (11.2, "g/dL")
+    assert records["WBC"].value == 7.5
+    assert (records["LDL Cholesterol"].ref_low, records["LDL Cholesterol"].ref_high) == (None, 130.0)
+    # Censored results keep their text but have no numeric value
+    assert records["TSH"].value is None and records["TSH"].value_text == "< 0.01"
+
+
+def test_flags_are_computed_against_reference_bounds():
+    records = {r.name: r for r in extract_lab_values(DOCUMENT)}
+
+    assert records["Hemoglobin"].flag == "low" and records["Hemoglobin"].deviation_pct == 13.8
+    assert records["WBC"].flag == "normal" and records["WBC"].deviation_pct is None
+    assert records["Platelets"].flag == "high"
+    assert records["LDL Cholesterol"].flag == "high" and records["LDL Cholesterol"].deviation_pct == 46.2
+    assert records["HDL"].flag == "low"
+    assert records["TSH"].flag is None
+
+
+def test_flag_printed_after_the_reference_range():
+    records = {r.name: r for r in extract_lab_values(
+        "WBC 11.2 10^3/uL 4.0 - 10.0 H\nGlucose 62 mg/dL 70-99 LOW\nSodium 140 mmol/L 135 - 145"
+    )}
+
+    assert (records["WBC"].value, records["WBC"].unit, records["WBC"].reference_range) == (11.2, "10^3/uL", "4.0 - 10.0")
+    assert records["WBC"].flag == "high"
+    assert records["Glucose"].flag == "low"
+    assert records["Sodium"].flag == "normal"
+
+
+def test_reported_flag_is_kept_without_reference_range():
+    records = flag_lab_values([
+        LabRecord(name="CRP", value=12.0, value_text="12 H", flag="high"),
+        LabRecord(name="Sodium", value=140.0, value_text="140", ref_low=135.0, ref_high=145.0),
+    ])
+
+    assert [r.flag for r in records] == ["high", "normal"]
+    assert parse_reference_range("up to 5") == (None, 5.0)
+    assert parse_reference_range("n/a") == (None, None)
+
+
+def test_summary_prompt_receives_precomputed_table(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+    prompts = []
+
+    async def fake_achat(model, messages, options=None, caller=None, **kwargs):
+        prompts.append(messages[-1]["content"])
+        return {"message": {"content": "Your hemoglobin is slightly low."}}
+
+    monkeypatch.setattr(summarizer_service, "achat", fake_achat)
+    stored = [r.to_dict() for r in extract_lab_values(DOCUMENT)]
+
+    asyncio.run(summarizer_service.agenerate_patient_summary_from_text(DOCUMENT, lab_results=stored))
+
+    assert summarizer_service.LAB_VALUES_NOTE in prompts[0]
+    assert format_lab_table(extract_lab_values(DOCUMENT)) in prompts[0]
+
+
+def test_sectioned_report_renders_key_results_without_model_call(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+    calls = []
+
+    async def fake_achat(model, messages, options=None, caller=None, **kwargs):
+        calls.append(messages[-1]["content"])
+        return {"message": {"content": "Notes."}}
+
+    monkeypatch.setattr(summarizer_service, "achat", fake_achat)
+
+    report = asyncio.run(summarizer_service.agenerate_detailed_report_sections(DOCUMENT))
+
+    key_results = summarizer_service.CLINICIAN_REPORT_SECTIONS[summarizer_service.KEY_RESULTS_SECTION][0]
+    assert len(calls) == len(summarizer_service.CLINICIAN_REPORT_SECTIONS) - 1
+    assert not any(key_results in prompt.split("---END MEDICAL DOCUMENT---")[-1] for prompt in calls)
+    assert f"## {key_results}\n| Test | Result |" in report
@@ -0,0 +1,62 @@
+import logging
+
+from app.services import llm_budget
+
+
+def _messages(words: int, images=None):
+    message = {"role": "user", "content": " ".join(["hemoglobin"] * words)}
+    if images:
+        message["images"] = images
+    return [{"role": "system", "content": "Summarize."}, message]
+
+
+def test_short_input_gets_smallest_window():
+    options = llm_budget.budget_options(_messages(50), {"temperature": 0.0, "num_predict": 200})
+
+    assert options == {"temperature": 0.0, "num_predict": 200, "num_ctx": 2048}
+
+
+def test_long_input_moves_up_a_bucket_without_capping():
+    options = llm_budget.budget_options(_messages(2500), {"num_predict": 500})
+
+    assert options["num_ctx"] == 4096
+    assert options["num_predict"] == 500
+
+
+def test_output_is_capped_to_fit_largest_window(monkeypatch):
+    monkeypatch.setenv("OLLAMA_CTX_BUCKETS", "2048,4096")
+    messages = _messages(2500)
+
+    options = llm_budget.budget_options(messages, {"num_predict": 2000})
+
+    assert options["num_ctx"] == 4096
+    assert options["num_predict"] == 4096 - llm_budget.estimate_prompt_tokens(messages)
+
+
+def test_overflow_is_logged(monkeypatch, caplog):
+    monkeypatch.setenv("OLLAMA_CTX_BUCKETS", "2048")
+    before = llm_budget.budget_stats()["overflow"]
+
+    with caplog.at_level(logging.WARNING, logger="app.services.llm_budget"):
+        options = llm_budget.budget_options(_messages(5000), {"num_predict": 300}, "clinician_report")
+
+    assert options["num_predict"] == llm_budget.MIN_OUTPUT_TOKENS
+    assert "exceeds the 2048-token context window" in caplog.text
+    assert llm_budget.budget_stats()["overflow"] == before + 1
+
+
+def test_images_and_explicit_num_ctx():
+    assert llm_budget.estimate_prompt_tokens(_messages(0, images=["a.png"])) >= llm_budget.IMAGE_TOKENS
+
+    options = llm_budget.budget_options(_messages(10), {"num_ctx": 16384, "num_predict": 100})
+    assert options["num_ctx"] == 16384
+
+
+def test_most_used_ctx_follows_traffic(monkeypatch):
+    monkeypatch.setattr(llm_budget, "_stats", {"requests": 0, "capped": 0, "overflow": 0, "num_ctx": {}})
+    assert llm_budget.most_used_ctx() == 8192
+
+    for words in (50, 50, 2500):
+        llm_budget.budget_options(_messages(words), {"num_predict": 200})
+
+    assert llm_budget.most_used_ctx() == 2048
@@ -0,0 +1,65 @@
+import asyncio
+
+import app.services.llm_cache as llm_cache
+import app.services.summarizer_service as summarizer_service
+
+
+def test_key_is_content_addressed():
+    msgs = [{"role": "user", "content": "CBC report"}]
+    a = llm_cache.make_key("m", msgs, {"temperature": 0.0, "num_predict": 200}, "1")
+    b = llm_cache.make_key("m", msgs, {"num_predict": 200, "temperature": 0.0}, "1")
+    assert a == b
+    assert a != llm_cache.make_key("m", msgs, {"temperature": 0.0, "num_predict": 200}, "2")
+    assert a != llm_cache.make_key("other", msgs, {"temperature": 0.0, "num_predict": 200}, "1")
+
+
+def test_disk_tier_survives_restart_and_counts_hits(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = llm_cache.ResponseCache(path)
+    assert cache.get("k") is None
+    cache.set("k", "summary")
+    assert cache.get("k") == "summary"
+
+    reopened = llm_cache.ResponseCache(path)
+    assert reopened.get("k") == "summary"
+    stats = reopened.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["disk_entries"] == 1
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_and_size_eviction(tmp_path):
+    expired = llm_cache.ResponseCache(str(tmp_path / "ttl.sqlite3"), ttl_seconds=-1)
+    expired.set("k", "v")
+    assert expired.get("k") is None
+
+    small = llm_cache.ResponseCache(str(tmp_path / "small.sqlite3"), memory_entries=1, max_disk_bytes=10)
+    small.set("a", "x" * 8)
+    small.set("b", "y" * 8)
+    assert small.stats()["disk_entries"] == 1
+    assert small.stats()["memory_entries"] == 1
+    assert small.get("b") == "y" * 8
+    assert small.get("a") is None
+
+
+def test_repeated_summary_is_served_from_cache(tmp_path, monkeypatch):
+    cache = llm_cache.ResponseCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: cache)
+    calls = []
+
+    async def fake_achat(model, messages, options=None, **kwargs):
+        calls.append(messages)
+        return {"message": {"content": "Your cholesterol is within range."}}
+
+    monkeypatch.setattr(summarizer_service, "achat", fake_achat)
+
+    async def _twice():
+        first = await summarizer_service.agenerate_patient_summary_from_text("Cholesterol 180 mg/dL")
+        second = await summarizer_service.agenerate_patient_summary_from_text("Cholesterol 180 mg/dL")
+        return first, second
+
+    first, second = asyncio.run(_twice())
+    assert first == second == "Your cholesterol is within range."
+    assert len(calls) == 1
+    assert cache.stats()["memory_hits"] == 1
@@ -0,0 +1,63 @@
+import asyncio
+
+import app.services.llm_telemetry as llm_telemetry
+import app.services.ollama_client as ollama_client
+from app.services.llm_telemetry import LLMTelemetry
+
+FINAL_STATS = {
+    "done": True,
+    "prompt_eval_count": 120,
+    "eval_count": 40,
+    "load_duration": 2_000_000_000,
+    "prompt_eval_duration": 500_000_000,
+    "eval_duration": 4_000_000_000,
+}
+
+
+class StatsClient:
+    """Fake AsyncClient whose responses carry Ollama's timing fields."""
+
+    async def chat(self, model, messages, options=None, stream=False, **kwargs):
+        if not stream:
+            return {"message": {"content": "ok"}, **FINAL_STATS}
+
+        async def _gen():
+            yield {"message": {"content": "o"}, "done": False}
+            yield {"message": {"content": "k"}, **FINAL_STATS}
+
+        return _gen()
+
+
+def test_record_aggregates_tokens_timings_and_reloads():
+    telemetry = LLMTelemetry()
+    telemetry.record("patient_summary", FINAL_STATS)
+    telemetry.record("patient_summary", {**FINAL_STATS, "load_duration": 3_000_000})
+    telemetry.record("chat", {"eval_count": 5, "eval_duration": 1_000_000_000}, ttft=0.2)
+
+    snap = telemetry.snapshot()
+    patient = snap["callers"]["patient_summary"]
+    assert patient["calls"] == 2
+    assert patient["prompt_tokens"] == 240
+    assert patient["model_reloads"] == 1
+    assert patient["tokens_per_sec"]["buckets"]["le_10"] == 2  # 40 tokens / 4s
+    assert patient["ttft_ms"]["count"] == 2
+    assert list(snap["callers"]) == ["patient_summary", "chat"]  # most compute first
+    assert snap["callers"]["chat"]["ttft_ms"]["buckets"]["le_250"] == 1
+    assert snap["totals"]["calls"] == 3
+
+
+def test_client_records_calls_under_caller_tag(monkeypatch):
+    telemetry = LLMTelemetry()
+    monkeypatch.setattr(llm_telemetry, "_telemetry", telemetry)
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: StatsClient())
+
+    async def _run():
+        await ollama_client.achat("m", [{"role": "user", "content": "x"}], caller="clinician_report")
+        return [c async for c in ollama_client.achat_stream("m", [], caller="chat")]
+
+    chunks = asyncio.run(_run())
+    assert len(chunks) == 2
+    snap = telemetry.snapshot()["callers"]
+    assert snap["clinician_report"]["eval_tokens"] == 40
+    assert snap["chat"]["calls"] == 1
+    assert snap["chat"]["ttft_ms"]["count"] == 1
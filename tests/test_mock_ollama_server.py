@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+import ollama
+import pytest
+
+import app.services.ollama_client as ollama_client
+import app.services.summarizer_service as summarizer_service
+from app.core.config import settings
+from scripts.mock_ollama_server import MockConfig, create_app
+
+
+def _client_factory(mock_app):
+    def _client(host=None):
+        return ollama.AsyncClient(host="http://mock", transport=httpx.ASGITransport(app=mock_app))
+    return _client
+
+
+def test_stream_and_non_stream_report_ollama_fields(monkeypatch):
+    mock = create_app(MockConfig(tokens_per_sec=0, ttft=0, load_delay=0.05))
+    monkeypatch.setattr(ollama_client, "get_async_client", _client_factory(mock))
+    messages = [{"role": "user", "content": "What is hemoglobin?"}]
+
+    async def _run():
+        full = await ollama_client.achat("medgemma", messages, {"num_predict": 5}, coalesce=False)
+        chunks = [c async for c in ollama_client.achat_stream("medgemma", messages, coalesce=False)]
+        return full, chunks
+
+    full, chunks = asyncio.run(_run())
+    assert full["eval_count"] == 5
+    assert full["load_duration"] >= 50_000_000  # first request paid the cold load
+    assert chunks[-1]["done"] and chunks[-1]["load_duration"] == 0
+    streamed = "".join(c["message"]["content"] for c in chunks)
+    assert streamed.startswith(full["message"]["content"])
+
+
+def test_outputs_are_deterministic_per_prompt_type(monkeypatch):
+    # Serve whatever model the summarizer is configured with
+    mock = create_app(MockConfig(models=[settings.MODEL_NAME], tokens_per_sec=0, ttft=0, load_delay=0))
+    monkeypatch.setattr(ollama_client, "get_async_client", _client_factory(mock))
+    monkeypatch.setattr(summarizer_service.llm_cache, "get_response_cache", lambda: None)
+
+    report = asyncio.run(summarizer_service.agenerate_detailed_report_from_text("Cholesterol 212 mg/dL"))
+    assert report.startswith("1. REPORT OVERVIEW")
+    assert report == asyncio.run(summarizer_service.agenerate_detailed_report_from_text("Cholesterol 212 mg/dL"))
+
+
+def test_error_injection_and_unknown_model():
+    mock = create_app(MockConfig(tokens_per_sec=0, ttft=0, load_delay=0, error_every=2, error_status=503))
+    client = ollama.AsyncClient(host="http://mock", transport=httpx.ASGITransport(app=mock))
+
+    async def _run():
+        await client.chat(model="medgemma", messages=[{"role": "user", "content": "a"}])
+        with pytest.raises(ollama.ResponseError) as failed:
+            await client.chat(model="medgemma", messages=[{"role": "user", "content": "b"}])
+        with pytest.raises(ollama.ResponseError) as missing:
+            await client.chat(model="other", messages=[])
+        await client.pull("other")
+        tags = await client.list()
+        return failed.value, missing.value, tags
+
+    failed, missing, tags = asyncio.run(_run())
+    assert failed.status_code == 503
+    assert missing.status_code == 404
+    assert {m.model for m in tags.models} == {"medgemma", "other"}
@@ -0,0 +1,86 @@
+import os
+import time
+
+import app.services.ocr_service as ocr_service
+from app.services.ocr_service import OcrPage
+
+
+def slow_first_pages(path, page, dpi, timeout):
+    """Per-page job for the pool: earlier pages finish last."""
+    time.sleep(0.4 / page)
+    return OcrPage(page=page, text=f"page {page} ({os.getpid()})", ocr_seconds=0.4 / page)
+
+
+def test_pages_run_in_parallel_and_come_back_in_order(monkeypatch):
+    monkeypatch.setattr(ocr_service, "page_count", lambda path: 4)
+    try:
+        ocr_service.ocr_pdf_pages("scan.pdf", workers=2, page_fn=slow_first_pages)  # start the workers
+        started = time.monotonic()
+        result = ocr_service.ocr_pdf_pages("scan.pdf", workers=2, page_fn=slow_first_pages)
+        elapsed = time.monotonic() - started
+    finally:
+        ocr_service.shutdown()
+
+    assert [page.page for page in result.pages] == [1, 2, 3, 4]
+    assert result.text.splitlines()[0].startswith("page 1 (")
+    assert len({page.text.split("(")[1] for page in result.pages}) == 2
+    assert str(os.getpid()) not in result.text
+    assert result.pages[0].ocr_seconds == 0.4 and result.seconds > 0
+    # 0.4 + 0.2 + 0.13 + 0.1 s of work split across two workers
+    assert elapsed < 0.75
+
+
+def test_each_page_is_rasterized_on_its_own(monkeypatch):
+    # Imported here: pool workers import this module and do not need Docling
+    from app.services import parser_service
+
+    rasterized = []
+
+    class FakeImage:
+        def __init__(self, page):
+            self.page = page
+
+        def close(self):
+            pass
+
+    def fake_convert(path, dpi, first_page, last_page, timeout):
+        rasterized.append((first_page, last_page, dpi))
+        if first_page == 2:
+            raise RuntimeError("bad page")
+        return [FakeImage(first_page)]
+
+    monkeypatch.setattr(ocr_service, "page_count", lambda path: 3)
+    monkeypatch.setattr(ocr_service, "convert_from_path", fake_convert)
+    monkeypatch.setattr(ocr_service.pytesseract, "image_to_string",
+                        lambda image, timeout=0: f"Hemoglobin page {image.page}")
+    monkeypatch.setenv("OCR_WORKERS", "0")
+
+    text = parser_service.ocr_pdf("scan.pdf")
+
+    assert rasterized == [(1, 1, parser_service.OCR_DPI), (2, 2, parser_service.OCR_DPI), (3, 3, parser_service.OCR_DPI)]
+    # A failing page leaves a gap instead of failing the document
+    assert text == "Hemoglobin page 1\n\nHemoglobin page 3"
+
+
+def test_ocr_with_a_failed_page_is_not_cached(monkeypatch, tmp_path):
+    import app.services.docling_pool as docling_pool
+    import app.services.extraction_cache as extraction_cache
+    from app.services import parser_service
+
+    cache = extraction_cache.ExtractionCache(str(tmp_path / "extractions.sqlite3"))
+    monkeypatch.setattr(extraction_cache, "get_extraction_cache", lambda: cache)
+    monkeypatch.setattr(docling_pool, "get_pool", lambda: None)
+    monkeypatch.setattr(parser_service, "_convert", lambda path: ("", None))  # a scan: Docling finds no text
+    pages = [OcrPage(page=1, text="Hemoglobin 13.8 g/dL"), OcrPage(page=2, text="", error="TimeoutError: page 2")]
+    monkeypatch.setattr(ocr_service, "ocr_pdf_pages",
+                        lambda path, dpi: ocr_service.OcrResult(pages=list(pages)))
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(b"%PDF scan")
+
+    assert ocr_service.OcrResult(pages=pages).failed_pages == [2]
+    assert parser_service.extract_data_from_file(str(path)) == "Hemoglobin 13.8 g/dL"
+    assert cache.stats()["entries"] == 0
+
+    pages[1] = OcrPage(page=2, text="Platelets 250 10^3/uL")
+    assert parser_service.extract_data_from_file(str(path)) == "Hemoglobin 13.8 g/dL\nPlatelets 250 10^3/uL"
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+import app.services.ollama_admission as ollama_admission
+from app.services.ollama_admission import AdmissionController, AdmissionRejected
+
+
+def test_freed_slot_goes_to_highest_priority_waiter():
+    ctl = AdmissionController(1)
+    order = []
+
+    async def _job(priority, name):
+        async with ctl.slot(priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def _run():
+        first = asyncio.create_task(_job("batch", "running"))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(_job("batch", "batch")),
+            asyncio.create_task(_job("report", "report")),
+            asyncio.create_task(_job("interactive", "chat")),
+        ]
+        await asyncio.gather(first, *waiters)
+
+    asyncio.run(_run())
+    assert order == ["running", "chat", "report", "batch"]
+    stats = ctl.stats()
+    assert stats["active"] == 0
+    assert stats["lanes"]["batch"]["wait_max_ms"] > 0
+
+
+def test_class_limit_keeps_a_slot_for_chat():
+    ctl = AdmissionController(2, class_limits={"batch": 1})
+
+    async def _run():
+        await ctl.acquire("batch")
+        blocked = asyncio.create_task(ctl.acquire("batch"))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+        await asyncio.wait_for(ctl.acquire("interactive"), 0.1)
+        blocked.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await blocked
+
+    asyncio.run(_run())
+    assert ctl.stats()["lanes"]["batch"]["queued"] == 0
+
+
+def test_full_queue_is_shed_with_retry_after():
+    ctl = AdmissionController(1, queue_limits={"report": 1})
+
+    async def _run():
+        await ctl.acquire("report")
+        queued = asyncio.create_task(ctl.acquire("report"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as exc:
+            await ctl.acquire("report")
+        with pytest.raises(AdmissionRejected):
+            ctl.precheck("report")
+        ctl.precheck("interactive")
+        ctl.release("report")
+        await queued
+        return exc.value
+
+    rejected = asyncio.run(_run())
+    assert rejected.retry_after >= 1
+    assert ctl.stats()["lanes"]["report"]["rejected"] == 2
+
+
+def test_chat_endpoint_returns_503_when_shed(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    full = AdmissionController(1, queue_limits={"interactive": 0})
+    full._active["batch"] = 1
+    monkeypatch.setattr(ollama_admission, "_controller", full)
+
+    with TestClient(app) as client:
+        session = client.post("/api/v1/chat/sessions", json={"title": "busy"}).json()
+        resp = client.post(f"/api/v1/chat/sessions/{session['id']}/messages", data={"content": "hello"})
+
+    assert resp.status_code == 503
+    assert int(resp.headers["Retry-After"]) >= 1
+
+
+def test_report_shed_mid_pipeline_is_a_503_not_a_failed_report(monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.api.endpoints import reports as reports_endpoint
+    from app.db import models
+
+    async def shed(text, language='English', lab_results=None):
+        raise AdmissionRejected("report", 7)
+
+    monkeypatch.setattr(reports_endpoint.summarizer_service, "agenerate_summary_from_text", shed)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(reports_endpoint.upload_text_report("Hemoglobin 11 g/dL", "English", None, db))
+
+    report = db.query(models.Report).one()
+    assert report.status == models.ReportStatus.failed
+    db.close()
+
+
+def test_shed_chat_summary_says_busy(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.api.endpoints import chat as chat_endpoint
+    from app.main import app
+
+    async def shed_stream(text, language='English', lab_results=None):
+        raise AdmissionRejected("interactive", 4)
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(chat_endpoint.parser_service, "extract_data_from_file", lambda path, digest=None: "CBC text")
+    monkeypatch.setattr(chat_endpoint.summarizer_service, "astream_patient_summary_from_text", shed_stream)
+
+    with TestClient(app) as client:
+        session = client.post("/api/v1/chat/sessions", json={"title": "busy"}).json()
+        resp = client.post(
+            f"/api/v1/chat/sessions/{session['id']}/messages",
+            data={"content": "Explain", "audience": "patient"},
+            files={"file": ("cbc.pdf", b"%PDF-1.4", "application/pdf")},
+        )
+
+    assert resp.status_code == 200
+    assert resp.json()["content"] == "The AI engine is busy right now. Please try again in 4 seconds."
+    assert resp.json()["status"] == "failed"
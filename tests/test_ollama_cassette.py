@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import httpx
+import ollama
+import pytest
+
+import app.services.ollama_client as ollama_client
+from app.services.ollama_cassette import Cassette, CassetteMiss
+from scripts.mock_ollama_server import MockConfig, create_app
+
+MESSAGES = [{"role": "user", "content": "What is hemoglobin?"}]
+
+
+def _use(monkeypatch, cassette, mock_app=None):
+    real = ollama.AsyncClient
+
+    def _offline(request):
+        raise AssertionError("replay must not reach a live Ollama server")
+
+    def _factory(host=None, **kwargs):
+        transport = httpx.ASGITransport(app=mock_app) if mock_app else httpx.MockTransport(_offline)
+        return real(host="http://mock", transport=transport)
+
+    monkeypatch.setattr(ollama_client.ollama, "AsyncClient", _factory)
+    monkeypatch.setattr(ollama_client, "get_cassette", lambda: cassette)
+
+
+async def _stream():
+    started = time.monotonic()
+    chunks = [c async for c in ollama_client.achat_stream("medgemma", MESSAGES, {"num_predict": 6}, coalesce=False)]
+    return "".join(c["message"]["content"] for c in chunks), time.monotonic() - started
+
+
+def test_record_then_replay_with_original_and_scaled_timing(tmp_path, monkeypatch):
+    path = str(tmp_path / "session.jsonl.gz")
+    recorder = Cassette(path, "record")
+    _use(monkeypatch, recorder, create_app(MockConfig(tokens_per_sec=50, ttft=0.05, load_delay=0)))
+    recorded_text, recorded_s = asyncio.run(_stream())
+    full = asyncio.run(ollama_client.achat("medgemma", MESSAGES, coalesce=False))
+    assert recorder.stats()["recorded"] == 2
+
+    player = Cassette(path, "replay")
+    _use(monkeypatch, player)
+    replayed_text, replayed_s = asyncio.run(_stream())
+    assert replayed_text == recorded_text
+    assert replayed_s >= 0.8 * recorded_s
+    replayed_full = asyncio.run(ollama_client.achat("medgemma", MESSAGES, coalesce=False))
+    assert replayed_full["message"].content == full["message"].content
+    assert replayed_full["eval_count"] == full["eval_count"]
+
+    fast = Cassette(path, "replay", speed=0)
+    _use(monkeypatch, fast)
+    fast_text, fast_s = asyncio.run(_stream())
+    assert fast_text == recorded_text
+    assert fast_s < recorded_s / 2
+
+
+def test_unrecorded_request_misses_and_images_match_by_content(tmp_path):
+    a, b = tmp_path / "1f3a_xray.png", tmp_path / "9c2e_xray.png"
+    a.write_bytes(b"same image")
+    b.write_bytes(b"same image")
+    key_a = Cassette.key("m", [{"role": "user", "content": "x", "images": [str(a)]}], {}, False)
+    key_b = Cassette.key("m", [{"role": "user", "content": "x", "images": [str(b)]}], {}, False)
+    assert key_a == key_b
+
+    path = tmp_path / "empty.jsonl"
+    path.write_text("")
+    player = Cassette(str(path), "replay")
+    with pytest.raises(CassetteMiss):
+        player.next(key_a)
+    assert player.stats()["misses"] == 1
@@ -0,0 +1,196 @@
+import asyncio
+import time
+from collections import deque
+
+import pytest
+
+import app.services.ollama_client as ollama_client
+
+
+class FakeAsyncClient:
+    """Stand-in for ollama.AsyncClient that fails a configurable number of times."""
+
+    def __init__(self, failures=0, chunks=("Hello", " world")):
+        self.failures = failures
+        self.chunks = chunks
+        self.calls = 0
+
+    async def chat(self, model, messages, options=None, stream=False, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("Failed to connect to Ollama")
+        if not stream:
+            return {"message": {"content": "".join(self.chunks)}}
+
+        async def _gen():
+            for c in self.chunks:
+                await asyncio.sleep(0)
+                yield {"message": {"content": c}}
+
+        return _gen()
+
+
+def test_achat_retries_connection_errors(monkeypatch):
+    fake = FakeAsyncClient(failures=2)
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: fake)
+
+    resp = asyncio.run(ollama_client.achat("m", [{"role": "user", "content": "hi"}], backoff=0))
+
+    assert resp["message"]["content"] == "Hello world"
+    assert fake.calls == 3
+
+
+def test_achat_gives_up_after_retries(monkeypatch):
+    fake = FakeAsyncClient(failures=5)
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: fake)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(ollama_client.achat("m", [], retries=2, backoff=0))
+    assert fake.calls == 3
+
+
+def test_achat_stream_yields_chunks(monkeypatch):
+    fake = FakeAsyncClient(failures=1)
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: fake)
+
+    async def _collect():
+        return [c["message"]["content"] async for c in ollama_client.achat_stream("m", [], backoff=0)]
+
+    assert asyncio.run(_collect()) == ["Hello", " world"]
+
+
+def test_async_client_is_pooled_per_loop():
+    async def _twice():
+        first = ollama_client.get_async_client()
+        second = ollama_client.get_async_client()
+        await ollama_client.aclose_async_client()
+        return first, second
+
+    first, second = asyncio.run(_twice())
+    assert first is second
+
+
+def test_identical_concurrent_requests_share_one_generation(monkeypatch):
+    fake = FakeAsyncClient()
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: fake)
+    messages = [{"role": "user", "content": "Summarize CBC"}]
+
+    async def _burst():
+        return await asyncio.gather(*(ollama_client.achat("m", messages, {"temperature": 0}) for _ in range(5)))
+
+    results = asyncio.run(_burst())
+    assert fake.calls == 1
+    assert all(r["message"]["content"] == "Hello world" for r in results)
+
+    asyncio.run(ollama_client.achat("m", messages, {"temperature": 0.5}))
+    assert fake.calls == 2
+
+
+def test_coalesced_stream_fans_out_every_token(monkeypatch):
+    fake = FakeAsyncClient(chunks=("a", "b", "c"))
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: fake)
+
+    async def _collect():
+        return [c["message"]["content"] async for c in ollama_client.achat_stream("m", [])]
+
+    async def _burst():
+        return await asyncio.gather(_collect(), _collect(), _collect())
+
+    assert asyncio.run(_burst()) == [["a", "b", "c"]] * 3
+    assert fake.calls == 1
+    assert ollama_client.coalescing_stats()["in_flight"] == 0
+
+
+@pytest.fixture
+def fresh_policy(monkeypatch):
+    from app.services import ollama_health
+
+    monkeypatch.setattr(ollama_health, "_breaker", ollama_health.CircuitBreaker())
+    monkeypatch.setattr(ollama_client, "_caller_latencies", {})
+    monkeypatch.setattr(
+        ollama_client, "_policy_counters", {"retries": 0, "deadline_exceeded": 0, "hedged": 0, "hedge_wins": 0}
+    )
+
+
+def test_decorrelated_jitter_stays_within_bounds():
+    backoff = ollama_client._Backoff(0.5, cap=4.0)
+    delays = [backoff.next() for _ in range(50)]
+
+    assert all(0.5 <= d <= 4.0 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_achat_retries_server_errors_but_not_bad_requests(monkeypatch, fresh_policy):
+    import ollama
+
+    class Flaky(FakeAsyncClient):
+        def __init__(self, status):
+            super().__init__()
+            self.status = status
+
+        async def chat(self, model, messages, options=None, stream=False, **kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                raise ollama.ResponseError("boom", self.status)
+            return {"message": {"content": "ok"}}
+
+    server_error = Flaky(503)
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: server_error)
+    asyncio.run(ollama_client.achat("m", [], backoff=0, coalesce=False))
+    assert server_error.calls == 2
+
+    bad_request = Flaky(400)
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: bad_request)
+    with pytest.raises(ollama.ResponseError):
+        asyncio.run(ollama_client.achat("m", [], backoff=0, coalesce=False))
+    assert bad_request.calls == 1
+
+
+def test_deadline_cuts_off_a_stuck_backend(monkeypatch, fresh_policy):
+    class Stuck(FakeAsyncClient):
+        async def chat(self, model, messages, options=None, stream=False, **kwargs):
+            self.calls += 1
+            await asyncio.sleep(30)
+
+    stuck = Stuck()
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: stuck)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        asyncio.run(ollama_client.achat("m", [], backoff=0.01, deadline=0.2, coalesce=False))
+    assert time.monotonic() - started < 5
+    assert ollama_client.retry_stats()["deadline_exceeded"] >= 1
+
+
+def test_slow_call_is_hedged_to_second_backend(monkeypatch, fresh_policy):
+    from app.services.ollama_router import OllamaRouter
+
+    router = OllamaRouter(["http://slow", "http://fast"])
+    monkeypatch.setattr(ollama_client, "get_router", lambda: router)
+    cancelled = []
+
+    class Backend(FakeAsyncClient):
+        def __init__(self, delay, text):
+            super().__init__(chunks=(text,))
+            self.delay = delay
+
+        async def chat(self, model, messages, options=None, stream=False, **kwargs):
+            try:
+                await asyncio.sleep(self.delay)
+            except asyncio.CancelledError:
+                cancelled.append(self.chunks[0])
+                raise
+            return await super().chat(model, messages, options, stream, **kwargs)
+
+    clients = {"http://slow": Backend(5, "slow"), "http://fast": Backend(0.01, "fast")}
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: clients[host])
+    monkeypatch.setattr(ollama_client, "_caller_latencies", {"text_summary": deque([0.05] * 30)})
+    monkeypatch.setenv("OLLAMA_HEDGE_MIN_DELAY", "0.05")
+
+    resp = asyncio.run(ollama_client.achat("m", [], caller="text_summary", hedge=True, coalesce=False))
+
+    assert resp["message"]["content"] == "fast"
+    assert cancelled == ["slow"]
+    stats = ollama_client.retry_stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    assert all(b["in_flight"] == 0 for b in router.snapshot())
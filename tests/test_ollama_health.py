@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import app.services.chat_service as chat_service
+import app.services.ollama_client as ollama_client
+import app.services.ollama_health as ollama_health
+from app.services.ollama_health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, HealthProber
+
+
+def test_breaker_opens_then_half_opens_after_timeout():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure(ConnectionError("down"))
+    assert breaker.state == CLOSED
+    breaker.record_failure(ConnectionError("down"))
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()  # only one trial at a time
+
+    breaker.record_failure(ConnectionError("still down"))
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_probe_success_moves_open_breaker_to_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    prober = HealthProber(breaker, ["http://127.0.0.1:9"], timeout=0.2)
+
+    assert asyncio.run(prober.probe_once()) is False
+    assert breaker.state == OPEN
+
+    breaker.record_probe(True)
+    assert breaker.state == HALF_OPEN
+
+
+def test_real_call_failures_trip_breaker_and_chat_skips_ollama(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    monkeypatch.setattr(ollama_health, "_breaker", breaker)
+    calls = []
+
+    class DownClient:
+        async def chat(self, **kwargs):
+            calls.append(kwargs)
+            raise ConnectionError("Failed to connect to Ollama")
+
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: DownClient())
+
+    reply = asyncio.run(chat_service.agenerate_chat_response("What does my hemoglobin value mean?"))
+    assert "couldn't reach" in reply
+    assert breaker.state == OPEN
+
+    made = len(calls)
+    reply = asyncio.run(chat_service.agenerate_chat_response("What does my hemoglobin value mean?"))
+    assert "temporarily unavailable" in reply
+    assert len(calls) == made
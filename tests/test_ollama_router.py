@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from app.services.ollama_router import OllamaRouter
+
+
+def _never_failure(e):
+    return False
+
+
+def test_least_outstanding_requests():
+    router = OllamaRouter(["http://a:11434", "http://b:11434"])
+    first = router.acquire("m")
+    second = router.acquire("m")
+    assert first.host != second.host
+    router.release(first, "m", latency=0.1)
+    assert router.acquire("m").host == first.host
+
+
+def test_prefers_backend_with_model_loaded():
+    router = OllamaRouter(["http://a:11434", "http://b:11434"])
+    b = router.backends[1]
+    router.release(router.acquire("m", exclude=["http://a:11434"]), "m", latency=0.2)
+    assert b.has_model_loaded("m", time.monotonic(), router.model_idle_seconds)
+    # One request already running on the warm backend still beats a cold load
+    router.acquire("m")
+    assert router.acquire("m").host == b.host
+
+
+def test_failing_backend_is_ejected_and_readmitted():
+    router = OllamaRouter(["http://a:11434", "http://b:11434"], eject_after=2, eject_seconds=0.05)
+    bad = router.backends[0]
+    for _ in range(2):
+        router.release(router.acquire("m", exclude=["http://b:11434"]), "m", failed=True, error=ConnectionError("x"))
+    assert not bad.is_available(time.monotonic())
+    assert all(router.acquire("m").host == "http://b:11434" for _ in range(3))
+
+    time.sleep(0.06)
+    assert bad.is_available(time.monotonic())
+    router.release(router.acquire("m", exclude=["http://b:11434"]), "m", latency=0.1)
+    assert bad.consecutive_failures == 0
+
+
+def test_route_records_latency_and_ignores_cancellation():
+    router = OllamaRouter(["http://a:11434"])
+    with router.route("m", _never_failure) as backend:
+        pass
+    assert backend.snapshot(time.monotonic())["p50_latency_ms"] is not None
+
+    with pytest.raises(KeyboardInterrupt):
+        with router.route("m", lambda e: True):
+            raise KeyboardInterrupt
+    assert backend.failures == 0
+    assert backend.in_flight == 0
+
+
+def test_model_idle_window_follows_keep_alive(monkeypatch):
+    import app.services.ollama_router as ollama_router
+    from app.services.ollama_client import keep_alive_seconds
+
+    monkeypatch.delenv("OLLAMA_MODEL_IDLE_SECONDS", raising=False)
+    for keep_alive, seconds in [("30m", 1800), ("1h30m", 5400), ("90s", 90), ("600", 600), ("-1", float("inf"))]:
+        monkeypatch.setenv("OLLAMA_KEEP_ALIVE", keep_alive)
+        assert keep_alive_seconds() == seconds
+    monkeypatch.delenv("OLLAMA_KEEP_ALIVE")
+    assert ollama_router._model_idle_seconds() == 1800
+
+    monkeypatch.setenv("OLLAMA_MODEL_IDLE_SECONDS", "120")
+    assert ollama_router._model_idle_seconds() == 120
@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime
+
+import app.services.llm_budget as llm_budget
+import app.services.llm_telemetry as llm_telemetry
+import app.services.ollama_client as ollama_client
+import app.services.ollama_warmer as ollama_warmer
+from app.services.llm_telemetry import LLMTelemetry
+from app.services.ollama_warmer import ModelWarmer, parse_days, parse_hours
+
+
+class LoadingClient:
+    """Fake AsyncClient that reports a cold load on the first ping only."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def chat(self, model, messages, options=None, stream=False, **kwargs):
+        self.calls.append({"model": model, "messages": messages, "options": options, **kwargs})
+        load = 3_000_000_000 if len(self.calls) == 1 else 2_000_000
+        return {"message": {"content": ""}, "done": True, "load_duration": load}
+
+
+def test_business_hours_schedule():
+    warmer = ModelWarmer(["m"], ["h"], hours=parse_hours("07-20"), days=parse_days("mon-fri"))
+    assert warmer.in_business_hours(datetime(2026, 10, 14, 9, 30))  # Wednesday
+    assert not warmer.in_business_hours(datetime(2026, 10, 14, 21, 0))
+    assert not warmer.in_business_hours(datetime(2026, 10, 17, 9, 30))  # Saturday
+    assert parse_days("all") == set(range(7))
+    assert parse_hours("") is None
+
+
+def test_warm_pings_every_backend_and_logs_cold_loads(monkeypatch):
+    fake = LoadingClient()
+    telemetry = LLMTelemetry()
+    monkeypatch.setattr(ollama_warmer, "get_async_client", lambda host=None: fake)
+    monkeypatch.setattr(llm_telemetry, "_telemetry", telemetry)
+    monkeypatch.setenv("OLLAMA_KEEP_ALIVE", "45m")
+
+    warmer = ModelWarmer(["medgemma"], ["http://a:11434", "http://b:11434"])
+    assert asyncio.run(warmer.warm_all()) is True
+
+    assert len(fake.calls) == 2
+    assert all(c["messages"] == [] and c["keep_alive"] == "45m" for c in fake.calls)
+    # Same window as real traffic, so the next request does not restart the runner
+    assert all(c["options"] == {"num_ctx": llm_budget.most_used_ctx()} for c in fake.calls)
+    cold = telemetry.cold_loads()
+    assert len(cold) == 1 and cold[0]["caller"] == "warmer" and cold[0]["model"] == "medgemma"
+
+
+def test_every_request_sends_keep_alive(monkeypatch):
+    fake = LoadingClient()
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: fake)
+    monkeypatch.setenv("OLLAMA_KEEP_ALIVE", "600")
+
+    asyncio.run(ollama_client.achat("m", [{"role": "user", "content": "keep"}]))
+    asyncio.run(ollama_client.achat("m", [{"role": "user", "content": "override"}], keep_alive="5m"))
+
+    assert [c["keep_alive"] for c in fake.calls] == [600, "5m"]
@@ -0,0 +1,99 @@
+import asyncio
+
+import app.services.llm_cache as llm_cache
+import app.services.summarizer_service as summarizer_service
+from app.services.ollama_admission import AdmissionController
+
+SECTIONS = summarizer_service.CLINICIAN_REPORT_SECTIONS
+DOCUMENT = "Hemoglobin 13.8 g/dL (ref 13.0-17.0). LDL 190 mg/dL (ref <130)."
+
+
+def _fake_achat(calls, delays):
+    async def fake_achat(model, messages, options=None, caller=None, **kwargs):
+        index = next(i for i, (heading, _, _) in enumerate(SECTIONS) if heading in messages[-1]["content"])
+        calls.append((caller, messages))
+        await asyncio.sleep(delays[index])
+        return {"message": {"content": f"## {SECTIONS[index][0]}\nSection {index + 1} text"}}
+    return fake_achat
+
+
+def test_sections_run_concurrently_and_stream_as_they_complete(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+    calls = []
+    # Last section finishes first, first section last
+    delays = [0.07, 0.06, 0.05, 0.04, 0.03, 0.02, 0.01]
+    monkeypatch.setattr(summarizer_service, "achat", _fake_achat(calls, delays))
+
+    async def collect():
+        return [s async for s in summarizer_service.astream_detailed_report_sections(DOCUMENT)]
+
+    snapshots = asyncio.run(collect())
+
+    assert len(calls) == len(SECTIONS)
+    assert {caller for caller, _ in calls} == {"clinician_section"}
+    # Every prompt shares the system prompt and document prefix
+    assert len({messages[0]["content"] for _, messages in calls}) == 1
+    prefix = calls[0][1][1]["content"].split("---END MEDICAL DOCUMENT---")[0]
+    assert all(messages[1]["content"].startswith(prefix) for _, messages in calls)
+
+    assert len(snapshots) == len(SECTIONS)
+    assert "Section 7 text" in snapshots[0] and "Section 1 text" not in snapshots[0]
+    assert "DISCLAIMER" not in snapshots[-2]
+    final = snapshots[-1]
+    positions = [final.index(f"Section {i + 1} text") for i in range(len(SECTIONS))]
+    assert positions == sorted(positions)
+    assert final.rstrip("━\n").endswith("Consult appropriate specialists as needed.")
+
+
+def test_failed_section_does_not_fail_report(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+
+    async def flaky_achat(model, messages, options=None, caller=None, **kwargs):
+        if SECTIONS[3][0] in messages[-1]["content"]:
+            raise RuntimeError("backend down")
+        return {"message": {"content": "Findings within range."}}
+
+    monkeypatch.setattr(summarizer_service, "achat", flaky_achat)
+
+    report = asyncio.run(summarizer_service.agenerate_detailed_report_sections(DOCUMENT))
+
+    assert report.count("Findings within range.") == len(SECTIONS) - 1
+    assert f"## {SECTIONS[3][0]}\n_This section could not be generated" in report
+    assert all(f"## {heading}" in report for heading, _, _ in SECTIONS)
+
+
+def test_closing_the_stream_frees_the_other_sections_slots(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+    ctl = AdmissionController(len(SECTIONS))
+    delays = [10.0] * len(SECTIONS)
+    delays[-1] = 0.01
+
+    async def held_achat(model, messages, options=None, caller=None, **kwargs):
+        async with ctl.slot("report"):
+            return await _fake_achat([], delays)(model, messages)
+
+    monkeypatch.setattr(summarizer_service, "achat", held_achat)
+
+    async def first_section_then_disconnect():
+        stream = summarizer_service.astream_detailed_report_sections(DOCUMENT)
+        first = await stream.__anext__()
+        await stream.aclose()
+        # No loop iteration in between: the siblings are already finished
+        return first, ctl.stats()["active"]
+
+    first, active = asyncio.run(first_section_then_disconnect())
+
+    assert "Section 7 text" in first
+    assert active == 0
+
+
+def test_report_mode_selects_sectioned_generation(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+    calls = []
+    monkeypatch.setattr(summarizer_service, "achat", _fake_achat(calls, [0] * len(SECTIONS)))
+
+    monkeypatch.setenv("CLINICIAN_REPORT_MODE", "sections")
+    report = asyncio.run(summarizer_service.agenerate_detailed_report_from_text(DOCUMENT))
+
+    assert len(calls) == len(SECTIONS)
+    assert report.startswith(summarizer_service.CLINICIAN_REPORT_HEADER)
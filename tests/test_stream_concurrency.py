@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import app.services.chat_service as chat_service
+import app.services.ollama_admission as ollama_admission
+import app.services.ollama_client as ollama_client
+import app.services.ollama_health as ollama_health
+
+
+class SlowStreamingClient:
+    """Fake AsyncClient streaming sentence tokens with a fixed inter-token delay."""
+
+    def __init__(self, tokens=5, delay=0.02):
+        self.tokens = tokens
+        self.delay = delay
+
+    async def chat(self, model, messages, options=None, stream=False, **kwargs):
+        async def _gen():
+            for i in range(self.tokens):
+                await asyncio.sleep(self.delay)
+                yield {"message": {"content": f"Token {i}."}}
+
+        return _gen()
+
+
+def test_concurrent_streams_interleave(monkeypatch):
+    fake = SlowStreamingClient(tokens=5, delay=0.02)
+    monkeypatch.setattr(ollama_client, "get_async_client", lambda host=None: fake)
+    monkeypatch.setattr(ollama_admission, "_controller", ollama_admission.AdmissionController(8))
+    monkeypatch.setattr(ollama_health, "_breaker", ollama_health.CircuitBreaker())
+
+    n_streams = 8
+    events = []
+
+    async def _consume(idx):
+        async for piece in chat_service.generate_chat_response_streaming(f"Explain my report {idx}"):
+            events.append(idx)
+
+    async def _heartbeat(stop):
+        ticks = 0
+        while not stop.is_set():
+            ticks += 1
+            await asyncio.sleep(0.005)
+        return ticks
+
+    async def _main():
+        stop = asyncio.Event()
+        hb = asyncio.create_task(_heartbeat(stop))
+        start = time.monotonic()
+        await asyncio.gather(*(_consume(i) for i in range(n_streams)))
+        elapsed = time.monotonic() - start
+        stop.set()
+        return elapsed, await hb
+
+    elapsed, ticks = asyncio.run(_main())
+
+    assert len(events) == n_streams * 5
+    # Streams interleave: the first stream must not finish before the others start
+    first_stream_last = max(i for i, e in enumerate(events) if e == 0)
+    assert set(events[:n_streams]) == set(range(n_streams))
+    assert first_stream_last > n_streams
+    # Wall time stays close to one stream (5 * 20ms), not n_streams of them
+    assert elapsed < 0.1 * n_streams / 2
+    # The event loop kept servicing unrelated work while tokens were arriving
+    assert ticks >= 5
@@ -0,0 +1,108 @@
+import asyncio
+
+import app.services.llm_cache as llm_cache
+import app.services.summarizer_service as summarizer_service
+from app.services.lab_extractor import extract_lab_values, format_lab_table
+
+DOCUMENT = "Hemoglobin 11.2 g/dL (ref 13.0-17.0)\nLDL Cholesterol 190 mg/dL (ref < 130)\n"
+
+
+def _fake_stream(tokens, pulled):
+    async def fake_stream(model, messages, options=None, caller=None, **kwargs):
+        for token in tokens:
+            pulled.append(token)
+            yield {"message": {"content": token}}
+    return fake_stream
+
+
+def test_patient_summary_tokens_arrive_before_generation_ends(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+    pulled = []
+    tokens = ["Your ", "hemoglobin ", "is ", "a little low."]
+    monkeypatch.setattr(summarizer_service, "achat_stream", _fake_stream(tokens, pulled))
+
+    async def collect():
+        seen = []
+        async for token in summarizer_service.astream_patient_summary_from_text(DOCUMENT):
+            # Each token is handed on as soon as the model produced it
+            seen.append((token, len(pulled)))
+        return seen
+
+    seen = asyncio.run(collect())
+
+    assert seen == [(token, i + 1) for i, token in enumerate(tokens)]
+
+
+def test_streamed_and_awaited_summaries_share_the_cache(monkeypatch, tmp_path):
+    cache = llm_cache.ResponseCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: cache)
+    pulled = []
+    monkeypatch.setattr(summarizer_service, "achat_stream", _fake_stream(["You have ", "anaemia."], pulled))
+
+    async def fail_achat(*args, **kwargs):
+        raise AssertionError("expected a cache hit")
+
+    monkeypatch.setattr(summarizer_service, "achat", fail_achat)
+
+    async def run():
+        streamed = "".join([t async for t in summarizer_service.astream_patient_summary_from_text(DOCUMENT)])
+        awaited = await summarizer_service.agenerate_patient_summary_from_text(DOCUMENT)
+        return streamed, awaited
+
+    streamed, awaited = asyncio.run(run())
+
+    assert streamed == awaited
+    assert streamed.startswith("You have anaemia.") and "[Disclaimer]" in streamed
+
+
+def test_clinician_stream_inserts_lab_table_under_key_results(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+    tokens = ["1. REPORT OVERVIEW\nCBC.\n", "2. KEY LAB", "ORATORY/RESULTS", "\nSee table", ".\n3. NEXT"]
+    monkeypatch.setattr(summarizer_service, "achat_stream", _fake_stream(tokens, []))
+
+    async def collect():
+        return [t async for t in summarizer_service.astream_detailed_report_from_text(DOCUMENT)]
+
+    report = "".join(asyncio.run(collect()))
+
+    table = format_lab_table(extract_lab_values(DOCUMENT))
+    assert f"2. KEY LABORATORY/RESULTS\n{table}\n\nSee table.\n3. NEXT" in report
+    assert report.count("| Test |") == 1
+
+
+def test_key_results_in_prose_is_not_taken_for_the_heading(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+    tokens = ["## 1️⃣ EXECUTIVE SUMMARY\nThe key results show ", "mild anaemia.\n",
+              "## 2️⃣ KEY LABORATORY/DIAGNOSTIC RESULTS\n", "See table.\n"]
+    monkeypatch.setattr(summarizer_service, "achat_stream", _fake_stream(tokens, []))
+
+    async def collect():
+        return [t async for t in summarizer_service.astream_detailed_report_from_text(DOCUMENT)]
+
+    streamed = "".join(asyncio.run(collect()))
+    table = format_lab_table(extract_lab_values(DOCUMENT))
+    inserted = summarizer_service._insert_lab_table("".join(tokens), table)
+
+    for report in (streamed, inserted):
+        assert "The key results show mild anaemia.\n## 2️⃣" in report
+        assert f"## 2️⃣ KEY LABORATORY/DIAGNOSTIC RESULTS\n{table}\n" in report
+    assert summarizer_service._KEY_RESULTS_HEADING.search("**2. Key Results:**")
+
+
+def test_stream_falls_back_to_short_summary_before_first_token(monkeypatch):
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda: None)
+
+    async def broken_stream(*args, **kwargs):
+        raise ConnectionError("ollama unavailable")
+        yield  # pragma: no cover
+
+    async def fake_achat(model, messages, options=None, caller=None, **kwargs):
+        return {"message": {"content": "Short summary."}}
+
+    monkeypatch.setattr(summarizer_service, "achat_stream", broken_stream)
+    monkeypatch.setattr(summarizer_service, "achat", fake_achat)
+
+    async def collect():
+        return [t async for t in summarizer_service.astream_patient_summary_from_text(DOCUMENT)]
+
+    assert asyncio.run(collect()) == ["Short summary."]